@@ -1,4 +1,6 @@
-from flask import Flask
+import time
+
+from flask import Flask, Response, before_render_template, g, template_rendered
 
 from config import Config
 
@@ -26,6 +28,7 @@ def create_app():
     from routes.github_activity import bp as github_bp
     from routes.pediatrica import bp as pediatrica_bp
     from routes.github_repos import bp as github_repos_bp
+    from routes.admin import bp as admin_bp
 
     app.register_blueprint(overview_bp)
     app.register_blueprint(cron_bp)
@@ -46,12 +49,43 @@ def create_app():
     app.register_blueprint(github_bp)
     app.register_blueprint(pediatrica_bp)
     app.register_blueprint(github_repos_bp)
+    app.register_blueprint(admin_bp)
 
     @app.context_processor
     def inject_sync_age():
         from db import get_data_freshness
         return {"sync_age": get_data_freshness()}
 
+    import timing
+    timing.init_app(app)
+
+    @app.after_request
+    def report_memo(response):
+        from memo import memo_stats
+        stats = memo_stats()
+        if stats["executed"] or stats["deduplicated"]:
+            response.headers["X-Request-Memo"] = (
+                f"executed={stats['executed']}, deduplicated={stats['deduplicated']}"
+            )
+        return response
+
+    def start_render(sender, template, context, **extra):
+        g._render_start = time.perf_counter()
+
+    def end_render(sender, template, context, **extra):
+        from metrics import observe_template
+        start = g.pop("_render_start", None)
+        if start is not None:
+            observe_template(template.name, time.perf_counter() - start)
+
+    before_render_template.connect(start_render, app, weak=False)
+    template_rendered.connect(end_render, app, weak=False)
+
+    @app.route("/metrics")
+    def metrics():
+        from metrics import render
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
     @app.route("/health")
     def health():
         return {"status": "ok"}
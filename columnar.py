@@ -0,0 +1,141 @@
+"""Binary columnar encoding of chart payloads (MEDIA_TYPE).
+
+The chart endpoints answer with nested dicts of parallel lists
+(``{"labels": [...], "values": [...]}``). Sent as JSON every number is
+printed, parsed and boxed again in the browser; a long cron duration
+history is mostly that. A client that sends ``Accept: MEDIA_TYPE`` gets the
+same payload with every list of numbers, strings or timestamps packed into
+a little-endian column it can view as a typed array without parsing:
+
+    "CLC1" | uint32 header length | header JSON | columns, each 8-byte aligned
+
+The header is ``{"meta": payload minus the packed lists, "columns": [{"path",
+"type", "offset", "length", ...}]}``, padded so the columns start 8-byte
+aligned; offsets count from there. Column types:
+
+* ``f64`` -- Float64Array; None is NaN (a gap to Chart.js).
+* ``i32`` -- Int32Array, for lists of ints that fit.
+* ``dict`` -- Int32Array of codes into the header's ``strings``; -1 is None.
+* ``ts`` -- Float64Array of epoch seconds for SQLite ``YYYY-MM-DD[ HH:MM:SS]``
+  text, which the decoder formats back (``format`` is "date" or "datetime").
+
+Anything else (scalars, empty lists, lists of dicts or bools) stays in
+``meta``. static/js/columnar.js decodes it back to the JSON shape with
+typed arrays in place of numeric lists; decode() here is its reference.
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+MEDIA_TYPE = "application/vnd.clutch.columns"
+MAGIC = b"CLC1"
+_EPOCH = datetime(1970, 1, 1)
+_INT32 = (-2**31, 2**31 - 1)
+_FORMATS = {10: ("date", "%Y-%m-%d"), 19: ("datetime", "%Y-%m-%d %H:%M:%S")}
+
+
+def _timestamps(values):
+    """Epoch seconds and format for SQLite date/datetime text, else None."""
+    width = len(values[0])
+    if width not in _FORMATS:
+        return None
+    seconds = []
+    for v in values:
+        # Exactly the text the decoder prints back: fromisoformat alone also
+        # takes a "T" separator, offsets and ISO week dates
+        if len(v) != width or v[4] != "-" or v[7] != "-" or width == 19 and v[10] != " ":
+            return None
+        try:
+            t = datetime.fromisoformat(v)
+        except ValueError:
+            return None
+        if t.tzinfo is not None:
+            return None
+        seconds.append((t - _EPOCH).total_seconds())
+    return _FORMATS[width][0], seconds
+
+
+def _column(values):
+    """``(type, array, extra header)`` for a packable list, else None."""
+    if not values:
+        return None
+    types = set(map(type, values))
+    if types <= {str, type(None)}:
+        if type(None) not in types:
+            ts = _timestamps(values)
+            if ts is not None:
+                return "ts", array("d", ts[1]), {"format": ts[0]}
+        strings = list(dict.fromkeys(v for v in values if v is not None))
+        index = {s: i for i, s in enumerate(strings)}
+        codes = array("i", [-1 if v is None else index[v] for v in values])
+        return "dict", codes, {"strings": strings}
+    # bool is its own type here, so True/False lists stay JSON
+    if types == {int} and _INT32[0] <= min(values) and max(values) <= _INT32[1]:
+        return "i32", array("i", values), {}
+    if types <= {int, float, type(None)}:
+        if type(None) in types:
+            values = [math.nan if v is None else v for v in values]
+        return "f64", array("d", values), {}
+    return None
+
+
+def encode(payload):
+    """Pack ``payload`` (a dict as the JSON endpoints return) into MEDIA_TYPE bytes."""
+    columns, buffers = [], []
+
+    def strip(node, path):
+        if isinstance(node, dict):
+            return {k: strip(v, path + [k]) for k, v in node.items()}
+        if isinstance(node, list):
+            packed = _column(node)
+            if packed is not None:
+                kind, values, extra = packed
+                columns.append({"path": path, "type": kind, "length": len(values), **extra})
+                if sys.byteorder == "big":
+                    values.byteswap()
+                buffers.append(values.tobytes())
+                return None
+        return node
+
+    meta = strip(payload, [])
+    data, offset = bytearray(), 0
+    for col, buf in zip(columns, buffers):
+        col["offset"] = offset
+        data += buf + b"\0" * (_align(len(buf)) - len(buf))
+        offset = len(data)
+    header = json.dumps({"meta": meta, "columns": columns}, separators=(",", ":")).encode()
+    header += b" " * (_align(8 + len(header)) - 8 - len(header))
+    return MAGIC + struct.pack("<I", len(header)) + header + bytes(data)
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def decode(data):
+    """Unpack MEDIA_TYPE bytes to the JSON-shaped payload (lists, NaN as None)."""
+    if data[:4] != MAGIC:
+        raise ValueError("not a columnar payload")
+    (length,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8:8 + length])
+    payload = header["meta"]
+    for col in header["columns"]:
+        code = "d" if col["type"] in ("f64", "ts") else "i"
+        values = list(struct.unpack_from(f"<{col['length']}{code}", data,
+                                         8 + length + col["offset"]))
+        if col["type"] == "f64":
+            values = [None if math.isnan(v) else v for v in values]
+        elif col["type"] == "dict":
+            values = [None if v < 0 else col["strings"][v] for v in values]
+        elif col["type"] == "ts":
+            fmt = dict(_FORMATS.values())[col["format"]]
+            values = [(_EPOCH + timedelta(seconds=v)).strftime(fmt) for v in values]
+        node = payload
+        for key in col["path"][:-1]:
+            node = node[key]
+        node[col["path"][-1]] = values
+    return payload
@@ -1,10 +1,66 @@
 import os
+import tempfile
 
 
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "clutch-dashboard-dev-key")
     DB_BASE_PATH = os.environ.get("DB_BASE_PATH", "/app/data")
 
+    # Keep one read-only connection per database open per worker thread
+    DB_POOL = os.environ.get("DB_POOL", "1") != "0"
+    DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 256 * 1024 * 1024))
+    DB_CACHE_KB = int(os.environ.get("DB_CACHE_KB", 16 * 1024))
+
+    # DB file versions are tracked in memory (inotify where available); the
+    # directory is also rescanned this often, which catches NFS/SMB changes
+    WATCH_POLL = float(os.environ.get("WATCH_POLL", 5))
+
+    # Locally indexed copies of the synced DBs (see sidecar.INDEXES)
+    SIDECAR = os.environ.get("SIDECAR", "1") != "0"
+    SIDECAR_DIR = os.environ.get(
+        "SIDECAR_DIR", os.path.join(tempfile.gettempdir(), "clutch-dashboard-sidecars")
+    )
+
+    # Incrementally maintained aggregates of usage_log and cron_runs (see rollups.py)
+    ROLLUPS = os.environ.get("ROLLUPS", "1") != "0"
+    ROLLUP_DIR = os.environ.get(
+        "ROLLUP_DIR", os.path.join(tempfile.gettempdir(), "clutch-dashboard-rollups")
+    )
+
+    # Per-worker query result cache; 0 disables it
+    QUERY_CACHE_BYTES = int(os.environ.get("QUERY_CACHE_BYTES", 32 * 1024 * 1024))
+    # Queries relative to 'now' are only reused within this many seconds
+    QUERY_CACHE_NOW_BUCKET = int(os.environ.get("QUERY_CACHE_NOW_BUCKET", 60))
+
+    # Time-series charts are downsampled to at most this many points
+    # unless a request asks otherwise with ?points=N (0 for all of them,
+    # at least 3 otherwise)
+    CHART_POINTS = int(os.environ.get("CHART_POINTS", 500))
+
+    # Overview tiles are evaluated concurrently; a tile slower than its
+    # deadline (seconds) renders its last good value instead
+    TILE_WORKERS = int(os.environ.get("TILE_WORKERS", 6))
+    TILE_DEADLINE = float(os.environ.get("TILE_DEADLINE", 2.0))
+    # Background-refreshed page snapshots: rebuild on DB change or after TTL
+    SNAPSHOT_TTL = float(os.environ.get("SNAPSHOT_TTL", 60))
+    SNAPSHOT_POLL = float(os.environ.get("SNAPSHOT_POLL", 5))
+
+    # Each gunicorn worker flushes its /metrics counters here for the others
+    METRICS_DIR = os.environ.get(
+        "METRICS_DIR", os.path.join(tempfile.gettempdir(), "clutch-dashboard-metrics")
+    )
+    METRICS_FLUSH = float(os.environ.get("METRICS_FLUSH", 2))
+
+    # Statements slower than this (ms) are logged with their query plan; 0 disables
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", 200))
+
+    # Fraction of requests that get a Server-Timing breakdown
+    TIMING_SAMPLE = float(os.environ.get("TIMING_SAMPLE", 1.0))
+    # Also log each breakdown as a JSON line on stderr (clutch.access); off by
+    # default since gunicorn already writes an access log
+    ACCESS_LOG = os.environ.get("ACCESS_LOG", "0") != "0"
+
     DATABASES = {
         "cron_log": "cron_log.db",
         "usage_tracking": "usage_tracking.db",
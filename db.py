@@ -1,58 +1,626 @@
-import os
+import logging
 import sqlite3
+import sys
+import threading
 import time
+from collections import OrderedDict, deque
 
+import metrics
+import rows as row_shapes
 from config import Config
+from memo import request_memo
+from sidecar import sidecars
+from watcher import watcher
+
+log = logging.getLogger(__name__)
+
+# Per-thread pool of open read-only connections: db_name -> (version, conn).
+# Gunicorn sync workers are single-threaded, so in practice this is one
+# connection per database per worker.
+_pool = threading.local()
+
+
+def snapshot_version(db_name):
+    """Return (inode, mtime_ns, size) of a DB file, or None if it is missing.
+
+    The NAS sync replaces files wholesale, so any change to this tuple means a
+    new snapshot and any pooled connection to the old one must be reopened.
+    Read from the watcher's in-memory table, not the filesystem. For a DB with
+    a sidecar this is the version of the data actually served, which lags
+    the synced file while a new sidecar builds.
+    """
+    return sidecars.resolve(db_name, watcher.version(db_name))[0]
+
+
+def _connect(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro&nolock=1&immutable=1", uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(Config.DB_CACHE_KB)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def _pooled():
+    conns = getattr(_pool, "conns", None)
+    if conns is None:
+        conns = _pool.conns = {}
+    return conns
 
 
 def get_db(db_name):
-    """Open a read-only SQLite connection. Returns None if the DB file is missing."""
-    path = Config.db_path(db_name)
-    if not os.path.exists(path):
+    """Return a read-only SQLite connection. Returns None if the DB file is missing.
+
+    With ``Config.DB_POOL`` enabled the connection is owned by the pool and must
+    not be closed by the caller; it is reopened automatically when the file's
+    snapshot version changes.
+    """
+    return _get_db(db_name, snapshot_version(db_name))
+
+
+def _get_db(db_name, version):
+    path = sidecars.file_for(db_name, version)
+    if not Config.DB_POOL:
+        if version is None:
+            return None
+        return _connect(path)
+
+    # The same version moves from the synced file to its sidecar once built
+    stamp = (version, path)
+    conns = _pooled()
+    entry = conns.get(db_name)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    if entry is not None:
+        entry[1].close()
+        del conns[db_name]
+    if version is None:
         return None
-    conn = sqlite3.connect(f"file:{path}?mode=ro&nolock=1&immutable=1", uri=True)
+    conn = _connect(path)
+    conns[db_name] = (stamp, conn)
+    return conn
+
+
+def _attach_limit():
+    global _ATTACH_LIMIT
+    if _ATTACH_LIMIT is None:
+        probe = sqlite3.connect(":memory:")
+        _ATTACH_LIMIT = probe.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        probe.close()
+    return _ATTACH_LIMIT
+
+
+_ATTACH_LIMIT = None
+
+
+def get_federated_db(db_names):
+    """Return one connection with every present DB in ``db_names`` ATTACHed.
+
+    Each database is attached read-only under its Config.DATABASES name, so
+    statements qualify tables as ``crm.contacts``. Missing files are skipped
+    and None is returned when nothing is present. SQLite caps attachments at
+    SQLITE_LIMIT_ATTACHED (10 by default); use query_federated to spread
+    larger sets across several connections.
+    """
+    return _get_federated_db(tuple((n, snapshot_version(n)) for n in db_names))
+
+
+def _get_federated_db(versions):
+    present = [name for name, version in versions if version is not None]
+    if not present:
+        return None
+    key = tuple(name for name, _ in versions)
+    paths = {name: sidecars.file_for(name, version) for name, version in versions}
+    stamp = (versions, tuple(paths.values()))
+    if Config.DB_POOL:
+        conns = _pooled()
+        entry = conns.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        if entry is not None:
+            entry[1].close()
+            del conns[key]
+
+    conn = sqlite3.connect(":memory:", uri=True)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA temp_store = MEMORY")
+    for name in present:
+        path = paths[name]
+        conn.execute(
+            f'ATTACH DATABASE ? AS "{name}"',
+            (f"file:{path}?mode=ro&nolock=1&immutable=1",),
+        )
+        conn.execute(f'PRAGMA "{name}".mmap_size = {int(Config.DB_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA "{name}".cache_size = -{int(Config.DB_CACHE_KB)}')
+    if Config.DB_POOL:
+        conns[key] = (stamp, conn)
     return conn
 
 
-def query_db(db_name, sql, params=(), one=False):
-    """Run a read-only query and return results as dicts. Returns [] on missing DB."""
-    conn = get_db(db_name)
-    if conn is None:
-        return {} if one else []
+def _release(conn):
+    if not Config.DB_POOL:
+        conn.close()
+
+
+def close_pool():
+    """Close every pooled connection held by the calling thread."""
+    conns = _pooled()
+    for _, conn in conns.values():
+        conn.close()
+    conns.clear()
+
+
+def _sizeof(value):
+    """Rough deep size of a cached result, good enough for the byte budget."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if isinstance(value, (tuple, row_shapes._Record)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    if isinstance(value, row_shapes.Columns):
+        return sys.getsizeof(value) + sum(_sizeof(c) for c in value.data)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU of query results bounded by an approximate byte budget.
+
+    Entries never need explicit invalidation: keys include the snapshot
+    version of the DB file, so a new sync simply stops matching old entries
+    and they age out of the LRU.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        size = _sizeof(value) + sys.getsizeof(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def drop(self, db_name):
+        """Remove every entry computed from ``db_name``."""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[1] == db_name or (isinstance(key[1], tuple) and db_name in key[1])
+            ]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache = ResultCache(Config.QUERY_CACHE_BYTES)
+# Entries for an old snapshot can never match again; free them right away
+# instead of waiting for the LRU to push them out.
+watcher.subscribe(lambda db_name, old, new: _cache.drop(db_name))
+
+
+def cache_stats():
+    """Hit/miss counters for this worker's query result cache."""
+    return _cache.stats()
+
+
+def snapshot_cached(db_name, key, compute):
+    """Return ``compute()``, reused for as long as ``db_name`` keeps its snapshot.
+
+    For values derived in Python from query results: they share the result
+    cache's byte budget and are dropped with the snapshot they came from.
+    ``key`` must identify everything else ``compute`` depends on, time
+    window bounds included. The value is shared between callers, so treat
+    it as read-only.
+    """
+    version = snapshot_version(db_name)
+    if Config.QUERY_CACHE_BYTES <= 0 or version is None:
+        return compute()
+    cache_key = ("derived", db_name, key, version)
+    hit, value = _cache.get(cache_key)
+    if hit:
+        return value
+    value = compute()
+    _cache.put(cache_key, value)
+    return value
+
+
+def _jsonable(params):
+    if isinstance(params, dict):
+        return {k: _jsonable(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_jsonable(v) for v in params]
+    if params is None or isinstance(params, (int, float, str)):
+        return params
+    return repr(params)
+
+
+def _full_scans(plan):
+    # "SCAN usage_log" reads every row; "SEARCH ... USING INDEX" and scans of
+    # a covering index or a subquery's result do not
+    return [
+        detail for detail in plan
+        if detail.startswith("SCAN ") and "INDEX" not in detail
+        and "SUBQUERY" not in detail.upper() and "CONSTANT ROW" not in detail
+    ]
+
+
+class SlowQueryLog:
+    """Bounded log of statements slower than Config.SLOW_QUERY_MS.
+
+    The first time a statement (by database and SQL text) goes slow its
+    EXPLAIN QUERY PLAN is captured on the same connection, so table scans
+    show up next to the timings. Kept per worker, like the result cache.
+    """
+
+    def __init__(self, size):
+        self._entries = deque(maxlen=size)
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn, db_name, sql, params, rows, seconds):
+        ms = seconds * 1000
+        if Config.SLOW_QUERY_MS <= 0 or ms < Config.SLOW_QUERY_MS:
+            return
+        key = (db_name, sql)
+        with self._lock:
+            first = key not in self._plans
+        if first:
+            try:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            except sqlite3.Error as exc:
+                plan = [f"EXPLAIN failed: {exc}"]
+            with self._lock:
+                self._plans[key] = plan
+            log.warning("slow query on %s (%.0f ms): %s\n  plan: %s",
+                        db_name, ms, " ".join(sql.split()), "; ".join(plan))
+        with self._lock:
+            self._entries.append({
+                "db": db_name,
+                "sql": sql,
+                "params": _jsonable(params),
+                "rows": rows,
+                "ms": round(ms, 2),
+                "at": time.time(),
+            })
+
+    def entries(self):
+        """Return the log newest first, each entry with its captured plan."""
+        with self._lock:
+            entries = list(self._entries)
+            plans = dict(self._plans)
+        out = []
+        for entry in reversed(entries):
+            plan = plans.get((entry["db"], entry["sql"]), [])
+            out.append(dict(entry, plan=plan, full_scans=_full_scans(plan)))
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+
+_slow = SlowQueryLog(Config.SLOW_QUERY_LOG_SIZE)
+
+
+def slow_queries():
+    """Recent slow statements on this worker, newest first."""
+    return _slow.entries()
+
+
+def _cache_key(kind, db_name, sql, params, version):
+    # Results of queries relative to 'now' drift even within one snapshot, so
+    # they are only reused inside the same time bucket.
+    bucket = None
+    if "'now'" in sql and Config.QUERY_CACHE_NOW_BUCKET > 0:
+        bucket = int(time.time() // Config.QUERY_CACHE_NOW_BUCKET)
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    return (kind, db_name, sql, tuple(params), version, bucket)
+
+
+def _cacheable(sql):
+    return Config.QUERY_CACHE_BYTES > 0 and (
+        "'now'" not in sql or Config.QUERY_CACHE_NOW_BUCKET > 0
+    )
+
+
+# query_batch modes returning compact rows (rows.py) instead of dicts
+ROW_MODES = ("record", "tuple", "columns")
+
+
+def _empty(mode, default):
+    if mode == "scalar":
+        return default
+    if mode == "columns":
+        return row_shapes.Columns((), [])
+    return {} if mode == "one" else []
+
+
+def _shape(mode, value, default, copy):
+    """Turn a fetched or cached value into what the caller asked for.
+
+    Callers are free to mutate the rows they get back, so cached dicts are
+    copied on the way out (``copy``). Compact shapes are shared read-only.
+    """
+    if mode == "scalar":
+        return value if value is not None else default
+    if mode == "one":
+        if not value:
+            return {}
+        return dict(value[0]) if copy else value[0]
+    if mode in ROW_MODES:
+        return value
+    return [dict(r) for r in value] if copy else value
+
+
+def query_batch(db_name, statements):
+    """Run several statements against one database on a single connection.
+
+    ``statements`` is a list of ``(key, sql, params, mode)`` tuples, with an
+    optional fifth ``default`` for scalars. ``mode`` is "all" (list of dicts,
+    like query_db), "one" (a single dict, like query_db(one=True)),
+    "scalar" (like query_scalar) or a compact shape from rows.py, "record",
+    "tuple" or "columns" (like query_db(shape=...)). Returns ``{key: result}``; a missing DB
+    gives every key the same empty result the single-query helpers return.
+    """
+    version = snapshot_version(db_name)
+    results = {}
+    conn = None
+    func = None
     try:
-        cur = conn.execute(sql, params)
-        rows = [dict(r) for r in cur.fetchall()]
-        return rows[0] if one and rows else ({} if one else rows)
+        for stmt in statements:
+            key, sql, params, mode = stmt[:4]
+            default = stmt[4] if len(stmt) > 4 else 0
+            if version is None:
+                results[key] = _empty(mode, default)
+                continue
+
+            cache_key = None
+            if _cacheable(sql):
+                kind = mode if mode == "scalar" or mode in ROW_MODES else "rows"
+                cache_key = _cache_key(kind, db_name, sql, params, version)
+                hit, value = _cache.get(cache_key)
+                if hit:
+                    results[key] = _shape(mode, value, default, copy=True)
+                    continue
+
+            if conn is None:
+                conn = _get_db(db_name, version)
+                if conn is None:
+                    version = None
+                    results[key] = _empty(mode, default)
+                    continue
+            if func is None:
+                func = metrics.caller_name()
+            start = time.perf_counter()
+            try:
+                cur = conn.execute(sql, params)
+                if mode == "scalar":
+                    row = cur.fetchone()
+                    value = row[0] if row else None
+                elif mode in ROW_MODES:
+                    cur.row_factory = None
+                    value = row_shapes.build(
+                        mode, tuple(d[0] for d in cur.description), cur.fetchall())
+                else:
+                    value = [dict(r) for r in cur.fetchall()]
+            except sqlite3.Error:
+                metrics.query_error(db_name, func)
+                raise
+            elapsed = time.perf_counter() - start
+            rows = 1 if mode == "scalar" else len(value)
+            metrics.observe_query(db_name, func, elapsed, rows)
+            _slow.record(conn, db_name, sql, params, rows, elapsed)
+            if cache_key is not None:
+                _cache.put(cache_key, value)
+            results[key] = _shape(mode, value, default, copy=cache_key is not None)
     finally:
-        conn.close()
+        if conn is not None:
+            _release(conn)
+    return results
+
+
+def _copy_rows(value):
+    if isinstance(value, list):
+        return [dict(r) if isinstance(r, dict) else r for r in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+@request_memo(copy_result=_copy_rows)
+def query_db(db_name, sql, params=(), one=False, shape="dict"):
+    """Run a read-only query and return results as dicts. Returns [] on missing DB.
 
+    ``shape`` "record", "tuple" or "columns" returns compact, read-only rows
+    with the same attribute and key access instead (see rows.py).
+    """
+    if shape != "dict":
+        if one or shape not in ROW_MODES:
+            raise ValueError(f"shape must be one of {', '.join(ROW_MODES)} without one=True")
+        return query_batch(db_name, [(None, sql, params, shape)])[None]
+    mode = "one" if one else "all"
+    return query_batch(db_name, [(None, sql, params, mode)])[None]
 
+
+@request_memo(copy_result=_copy_rows)
 def query_scalar(db_name, sql, params=(), default=0):
     """Run a query returning a single scalar value."""
-    conn = get_db(db_name)
-    if conn is None:
-        return default
+    return query_batch(db_name, [(None, sql, params, "scalar", default)])[None]
+
+
+def query_iter(db_name, sql, params=(), arraysize=500, shape="dict"):
+    """Yield the rows of a read-only query as dicts, ``arraysize`` at a time.
+
+    For unbounded tables rendered with stream_template: only one batch of
+    rows is alive at once, instead of the whole result as query_db builds
+    it. Nothing is cached or memoised. The generator reads from its own
+    connection, so a new snapshot replacing the pooled one mid-render can't
+    close it; the connection is released when the generator finishes or is
+    closed. Yields nothing on a missing DB. ``shape`` "record" or "tuple"
+    yields compact rows as query_db(shape=...) does.
+    """
+    if shape not in ("dict", "record", "tuple"):
+        raise ValueError("query_iter shape must be dict, record or tuple")
+    # Resolved now, not on first next(): by then the caller is the template
+    version = snapshot_version(db_name)
+    if version is None:
+        return iter(())
+    return _iter_rows(db_name, version, metrics.caller_name(), sql, params, arraysize, shape)
+
+
+def _iter_rows(db_name, version, func, sql, params, arraysize, shape):
+    conn = _connect(sidecars.file_for(db_name, version))
+    rows = 0
+    elapsed = 0.0
     try:
-        cur = conn.execute(sql, params)
-        row = cur.fetchone()
-        return row[0] if row and row[0] is not None else default
+        start = time.perf_counter()
+        try:
+            cur = conn.execute(sql, params)
+            cur.arraysize = arraysize
+            if shape == "dict":
+                make = dict
+            else:
+                cur.row_factory = None
+                make = row_shapes.row_maker(shape, tuple(d[0] for d in cur.description))
+            batch = cur.fetchmany()
+        except sqlite3.Error:
+            metrics.query_error(db_name, func)
+            raise
+        elapsed += time.perf_counter() - start
+        while batch:
+            rows += len(batch)
+            for r in batch:
+                yield make(r)
+            start = time.perf_counter()
+            batch = cur.fetchmany()
+            elapsed += time.perf_counter() - start
+        metrics.observe_query(db_name, func, elapsed, rows)
+        _slow.record(conn, db_name, sql, params, rows, elapsed)
     finally:
         conn.close()
 
 
+def query_federated(columns, default=0):
+    """Evaluate scalar subqueries from many databases in as few statements as possible.
+
+    ``columns`` maps an output name to ``(db_name, sql)`` where ``sql`` is a
+    scalar SELECT with tables qualified by their database name. Columns whose
+    database is missing, or that evaluate to NULL, come back as ``default``
+    -- the same degradation query_scalar gives a missing DB.
+    """
+    return query_federated_scans(
+        [(db_name, f'SELECT ({sql}) AS "{name}"', (name,))
+         for name, (db_name, sql) in columns.items()],
+        default,
+    )
+
+
+def query_federated_scans(scans, default=0, params=None):
+    """Cross-join single-row SELECTs from many databases into few statements.
+
+    ``scans`` is a list of ``(db_name, sql, names)`` where ``sql`` returns
+    exactly one row (an aggregate without GROUP BY) with the columns in
+    ``names``, and qualifies its tables by database name. Scans are grouped
+    onto federated connections, at most SQLITE_LIMIT_ATTACHED databases
+    each, and run as one ``SELECT * FROM (...), (...)`` per connection.
+    Returns ``{name: value}`` with ``default`` for missing DBs and NULLs.
+    ``params`` maps named parameters (``:name``) used by any of the scans;
+    each statement is bound, and cached, with only the ones it uses.
+    """
+    params = params or {}
+    by_db = {}
+    for db_name, sql, names in scans:
+        by_db.setdefault(db_name, []).append((sql, names))
+    result = {name: default for _, _, names in scans for name in names}
+
+    versions = {db_name: snapshot_version(db_name) for db_name in by_db}
+    present = [db_name for db_name in by_db if versions[db_name] is not None]
+    limit = _attach_limit()
+    for i in range(0, len(present), limit):
+        shard = tuple(present[i:i + limit])
+        shard_versions = tuple((db_name, versions[db_name]) for db_name in shard)
+        sql = "SELECT * FROM " + ",\n     ".join(
+            f"({scan_sql})" for db_name in shard for scan_sql, _ in by_db[db_name]
+        )
+
+        bound = {name: value for name, value in params.items() if f":{name}" in sql}
+
+        key = None
+        hit = False
+        if _cacheable(sql):
+            key = _cache_key("federated", shard, sql, bound, shard_versions)
+            hit, row = _cache.get(key)
+        if not hit:
+            func = metrics.caller_name()
+            conn = _get_federated_db(shard_versions)
+            start = time.perf_counter()
+            try:
+                row = dict(conn.execute(sql, bound).fetchone())
+                elapsed = time.perf_counter() - start
+                _slow.record(conn, "federated", sql, bound, 1, elapsed)
+            except sqlite3.Error:
+                metrics.query_error("federated", func)
+                raise
+            finally:
+                _release(conn)
+            metrics.observe_query("federated", func, elapsed, 1)
+            if key is not None:
+                _cache.put(key, row)
+
+        for name, value in row.items():
+            if value is not None:
+                result[name] = value
+    return result
+
+
 def get_data_freshness():
     """Return minutes since newest DB file in data dir was modified."""
-    data_dir = Config.DB_BASE_PATH
-    if not os.path.exists(data_dir):
-        return None
-    mtimes = []
-    for f in os.listdir(data_dir):
-        if f.endswith(".db"):
-            try:
-                mtimes.append(os.path.getmtime(os.path.join(data_dir, f)))
-            except OSError:
-                pass
-    if not mtimes:
+    newest = watcher.newest_mtime()
+    if newest is None:
         return None
-    return int((time.time() - max(mtimes)) / 60)
+    return int((time.time() - newest) / 60)
@@ -4,3 +4,9 @@ timeout = 30
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+
+def on_starting(server):
+    # Worker metric files from a previous run would be summed into /metrics
+    from metrics import reset_worker_files
+    reset_worker_files()
@@ -0,0 +1,58 @@
+"""Request-scoped memoisation of queries and remote calls.
+
+Several helpers build on the same primitives within one render (kb_stats and
+total_stats issue the same counts; every /infra section refetches nodes and
+pods). Functions wrapped with request_memo run once per distinct argument
+tuple per request and the result is reused for the rest of it. The memo
+lives on flask.g, so it is dropped with the request and does nothing outside
+one (tile and snapshot threads, scripts).
+"""
+
+import copy
+import functools
+
+from flask import g, has_request_context
+
+
+def memo_stats():
+    """Return ``{"executed": n, "deduplicated": m}`` for the current request."""
+    if not has_request_context():
+        return {"executed": 0, "deduplicated": 0}
+    return dict(g.get("_memo_stats") or {"executed": 0, "deduplicated": 0})
+
+
+def request_memo(fn=None, *, copy_result=copy.deepcopy):
+    """Decorator: reuse ``fn``'s result for identical calls in one request.
+
+    Callers may mutate what they get back, so every memoised hit returns
+    ``copy_result(value)``. Calls with unhashable arguments go straight
+    through.
+    """
+    if fn is None:
+        return functools.partial(request_memo, copy_result=copy_result)
+
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not has_request_context():
+            return fn(*args, **kwargs)
+        if "_memo" not in g:
+            g._memo = {}
+            g._memo_stats = {"executed": 0, "deduplicated": 0}
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hit = key in g._memo
+        except TypeError:
+            g._memo_stats["executed"] += 1
+            return fn(*args, **kwargs)
+        if hit:
+            g._memo_stats["deduplicated"] += 1
+            return copy_result(g._memo[key])
+        g._memo_stats["executed"] += 1
+        value = fn(*args, **kwargs)
+        g._memo[key] = value
+        return copy_result(value)
+
+    wrapper.uncached = fn
+    return wrapper
@@ -0,0 +1,263 @@
+"""Prometheus metrics for the dashboard itself, aggregated across workers.
+
+Every gunicorn worker records into its own in-process registry and a
+background thread flushes it to ``<METRICS_DIR>/<pid>-<start>.json`` every
+Config.METRICS_FLUSH seconds. /metrics is served by whichever worker gets the
+scrape, so it sums its live registry with every other worker's file. Files of
+workers that have exited are kept so counters never go backwards; the
+directory is cleared when the gunicorn master starts (see gunicorn.conf.py).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+from timing import attribute
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help, label names)
+METRICS = {
+    "dashboard_query_duration_seconds": (
+        "histogram", "SQLite statement latency.", ("db", "func")),
+    "dashboard_query_rows_total": (
+        "counter", "Rows returned by SQLite statements.", ("db", "func")),
+    "dashboard_query_errors_total": (
+        "counter", "SQLite statements that raised.", ("db", "func")),
+    "dashboard_upstream_duration_seconds": (
+        "histogram", "Outbound HTTP request latency.", ("upstream", "func")),
+    "dashboard_upstream_response_bytes_total": (
+        "counter", "Outbound HTTP response payload bytes.", ("upstream", "func")),
+    "dashboard_upstream_errors_total": (
+        "counter", "Outbound HTTP requests that failed.", ("upstream", "func")),
+    "dashboard_template_render_duration_seconds": (
+        "histogram", "Jinja template render latency.", ("template",)),
+}
+
+# Frames in these modules are plumbing, not the query function to label with
+_PLUMBING = {__name__, "db", "memo", "rollups", "contextlib", "functools", "queries.registry"}
+
+
+class Registry:
+    """Counters and histograms of one worker, keyed by (metric, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._dirty = False
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self._dirty = True
+        _ensure_flusher()
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                # per-bucket counts (not cumulative), then sum and count
+                hist = self.histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    hist[i] += 1
+                    break
+            hist[-2] += value
+            hist[-1] += 1
+            self._dirty = True
+        _ensure_flusher()
+
+    def dump(self, clean=False):
+        with self._lock:
+            if clean:
+                self._dirty = False
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "histograms": [[n, list(l), list(h)] for (n, l), h in self.histograms.items()],
+            }
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+
+registry = Registry()
+_worker_file = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def caller_name():
+    """Name the query function that led here, e.g. ``crm.crm_page``."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        name = frame.f_code.co_name
+        if module not in _PLUMBING and not name.startswith("_") and name != "<lambda>":
+            return f"{module.rsplit('.', 1)[-1]}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def observe_query(db_name, func, seconds, rows):
+    labels = (db_name, func)
+    attribute(f"sqlite-{db_name}", seconds)
+    registry.observe("dashboard_query_duration_seconds", labels, seconds)
+    registry.inc("dashboard_query_rows_total", labels, rows)
+
+
+def query_error(db_name, func):
+    registry.inc("dashboard_query_errors_total", (db_name, func))
+
+
+class _Call:
+    bytes = 0
+
+
+@contextmanager
+def track_upstream(upstream):
+    """Time an outbound request; set ``.bytes`` on the yielded object.
+
+    Exceptions are counted as errors and re-raised, so the helper's own
+    error handling is unchanged.
+    """
+    labels = (upstream, caller_name())
+    call = _Call()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        registry.inc("dashboard_upstream_errors_total", labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        attribute(upstream, elapsed)
+        registry.observe("dashboard_upstream_duration_seconds", labels, elapsed)
+        if call.bytes:
+            registry.inc("dashboard_upstream_response_bytes_total", labels, call.bytes)
+
+
+def observe_template(template, seconds):
+    attribute("template", seconds)
+    registry.observe("dashboard_template_render_duration_seconds", (template,), seconds)
+
+
+def _flush():
+    data = registry.dump(clean=True)
+    tmp = f"{_worker_file}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, _worker_file)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(Config.METRICS_FLUSH)
+        if registry.dirty:
+            try:
+                _flush()
+            except OSError:
+                pass
+
+
+def _ensure_flusher():
+    global _worker_file, _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        try:
+            os.makedirs(Config.METRICS_DIR, exist_ok=True)
+        except OSError:
+            pass
+        # pid plus start time, so a recycled pid never overwrites a dead worker
+        _worker_file = os.path.join(Config.METRICS_DIR, f"{os.getpid()}-{time.time_ns()}.json")
+        _flusher_pid = os.getpid()
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def reset_worker_files():
+    """Remove every worker file; called once when the gunicorn master starts."""
+    try:
+        names = os.listdir(Config.METRICS_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith(".json"):
+            try:
+                os.remove(os.path.join(Config.METRICS_DIR, name))
+            except OSError:
+                pass
+
+
+def _merge(counters, histograms, data):
+    for name, labels, value in data["counters"]:
+        key = (name, tuple(labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, hist in data["histograms"]:
+        key = (name, tuple(labels))
+        total = histograms.get(key)
+        if total is None:
+            histograms[key] = list(hist)
+        else:
+            for i, v in enumerate(hist):
+                total[i] += v
+
+
+def _label_str(names, values, extra=""):
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    parts = [f'{n}="{esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}"
+
+
+def render():
+    """Return every worker's metrics summed, in Prometheus text format."""
+    counters, histograms = {}, {}
+    _merge(counters, histograms, registry.dump())
+    try:
+        names = os.listdir(Config.METRICS_DIR)
+    except OSError:
+        names = []
+    own = os.path.basename(_worker_file) if _worker_file else None
+    for name in names:
+        if not name.endswith(".json") or name == own:
+            continue
+        try:
+            with open(os.path.join(Config.METRICS_DIR, name)) as f:
+                _merge(counters, histograms, json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    lines = []
+    for metric, (kind, help_text, label_names) in METRICS.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        if kind == "counter":
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f"{metric}{_label_str(label_names, labels)} {value}")
+            continue
+        for (name, labels), hist in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist):
+                cumulative += count
+                le = _label_str(label_names, labels, f'le="{bound}"')
+                lines.append(f"{metric}_bucket{le} {cumulative}")
+            le = _label_str(label_names, labels, 'le="+Inf"')
+            lines.append(f"{metric}_bucket{le} {hist[-1]}")
+            lines.append(f"{metric}_sum{_label_str(label_names, labels)} {hist[-2]}")
+            lines.append(f"{metric}_count{_label_str(label_names, labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
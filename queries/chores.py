@@ -1,4 +1,6 @@
 from db import query_scalar, query_db
+from queries.registry import value
+from queries.timewindow import day, week_start
 
 
 def kid_count():
@@ -16,9 +18,9 @@ def todays_assignments():
         FROM assignments a
         JOIN kids k ON a.kid_id = k.id
         JOIN chores c ON a.chore_id = c.id
-        WHERE a.assigned_date = date('now')
+        WHERE a.assigned_date = ?
         ORDER BY k.name, c.name
-    """)
+    """, (day()[0],))
 
 
 def weekly_completion_rates():
@@ -30,18 +32,15 @@ def weekly_completion_rates():
                      / COUNT(*) * 100, 1) AS pct
         FROM assignments a
         JOIN kids k ON a.kid_id = k.id
-        WHERE a.assigned_date >= date('now', 'weekday 1', '-7 days')
-          AND a.assigned_date <= date('now')
+        WHERE a.assigned_date >= ?
+          AND a.assigned_date <= ?
         GROUP BY k.id
         ORDER BY k.name
-    """)
+    """, (week_start(), day()[0]))
 
 
 def pending_count_today():
-    return query_scalar("chore_schedule", """
-        SELECT COUNT(*) FROM assignments
-        WHERE status = 'pending' AND assigned_date = date('now')
-    """)
+    return value("chores.pending_today")
 
 
 def recent_completions(limit=10):
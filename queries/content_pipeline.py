@@ -1,4 +1,5 @@
 from db import query_db, query_scalar
+from queries.timewindow import since_day
 
 
 def ideas_by_status():
@@ -26,10 +27,10 @@ def publishing_pace_weekly(weeks=8):
             COUNT(*) as count
         FROM content_ideas
         WHERE status = 'published'
-          AND updated_at >= date('now', '-{} days')
+          AND updated_at >= ?
         GROUP BY week
         ORDER BY week
-    """.format(weeks * 7))
+    """, (since_day(weeks * 7),))
 
 
 def post_type_distribution():
@@ -0,0 +1,137 @@
+"""Daily spend forecasts per model and per skill, fitted in one NumPy pass.
+
+Every series (each model or skill, plus the total) gets the same linear
+model over the last HISTORY_DAYS complete days: an intercept, a linear
+trend and a dummy per weekday. The design matrix depends only on the
+calendar, so all series are solved together as one least-squares problem
+with a column per series, ``lstsq(X, Y)``, rather than a fit per series.
+
+Bands are 95% prediction intervals from each series' residual variance and
+the leverage of the forecast days. The history comes from the daily usage
+rollup (usage_cube), and the fitted result is kept per snapshot of
+usage_tracking and per UTC day, so a forecast is computed once per sync.
+"""
+
+import copy
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from db import snapshot_cached
+from queries.cost_tracking import usage_cube
+from queries.timewindow import DATE, utcnow
+
+HISTORY_DAYS = 56
+MAX_HORIZON = 90
+Z95 = 1.96
+
+
+def _design(days, first_weekday, offset=0):
+    """Rows ``[1, t, weekday dummies (Tuesday..Sunday)]`` for ``days`` days."""
+    t = np.arange(offset, offset + days)
+    weekday = (first_weekday + t) % 7
+    x = np.zeros((days, 8))
+    x[:, 0] = 1.0
+    x[:, 1] = t / HISTORY_DAYS
+    x[np.arange(days)[weekday > 0], 1 + weekday[weekday > 0]] = 1.0
+    return x
+
+
+def fit(history, first_weekday, horizon):
+    """Forecast every column of ``history`` (days x series) ``horizon`` days on.
+
+    Returns a dict of arrays: ``mean``, ``lower`` and ``upper`` (horizon x
+    series, clipped at zero), ``total``/``total_lower``/``total_upper`` for
+    the sum over the horizon and ``trend`` (change per day).
+    """
+    days, _ = history.shape
+    x = _design(days, first_weekday)
+    xf = _design(horizon, first_weekday, offset=days)
+
+    coef, _, rank, _ = np.linalg.lstsq(x, history, rcond=None)
+    resid = history - x @ coef
+    dof = max(days - rank, 1)
+    sigma = np.sqrt((resid ** 2).sum(axis=0) / dof)
+
+    cov = np.linalg.pinv(x.T @ x)
+    leverage = np.einsum("ij,jk,ik->i", xf, cov, xf)
+    mean = xf @ coef
+    spread = Z95 * np.sqrt(1.0 + leverage)[:, None] * sigma[None, :]
+
+    # The horizon sum has variance sigma^2 * (H + v' C v), v the summed rows
+    v = xf.sum(axis=0)
+    total = mean.sum(axis=0)
+    total_spread = Z95 * sigma * np.sqrt(horizon + v @ cov @ v)
+    return {
+        "mean": np.clip(mean, 0, None),
+        "lower": np.clip(mean - spread, 0, None),
+        "upper": np.clip(mean + spread, 0, None),
+        "total": np.clip(total, 0, None),
+        "total_lower": np.clip(total - total_spread, 0, None),
+        "total_upper": np.clip(total + total_spread, 0, None),
+        "trend": coef[1] / HISTORY_DAYS,
+    }
+
+
+def _history(by, today):
+    """``(names, days x series matrix, first day)`` of daily cost, zero-filled, total last."""
+    start = datetime(today.year, today.month, today.day) - timedelta(days=HISTORY_DAYS)
+    rows = usage_cube(start, start + timedelta(days=HISTORY_DAYS), "day", by=by)
+    index = {(start + timedelta(days=i)).strftime(DATE): i for i in range(HISTORY_DAYS)}
+    names = sorted({r[by] or "unknown" for r in rows})
+    column = {name: i for i, name in enumerate(names)}
+    history = np.zeros((HISTORY_DAYS, len(names) + 1))
+    for r in rows:
+        history[index[r["period"][:10]], column[r[by] or "unknown"]] += r["cost"] or 0.0
+    history[:, -1] = history[:, :-1].sum(axis=1)
+    return names + ["total"], history, start
+
+
+def _compute(by, horizon, today):
+    names, history, start = _history(by, today)
+    result = fit(history, start.weekday(), horizon)
+
+    series = []
+    for i, name in enumerate(names):
+        series.append({
+            "name": name,
+            "history_total": round(float(history[:, i].sum()), 4),
+            "trend": round(float(result["trend"][i]), 6),
+            "daily": [round(v, 4) for v in result["mean"][:, i].tolist()],
+            "lower": [round(v, 4) for v in result["lower"][:, i].tolist()],
+            "upper": [round(v, 4) for v in result["upper"][:, i].tolist()],
+            "total": round(float(result["total"][i]), 2),
+            "total_lower": round(float(result["total_lower"][i]), 2),
+            "total_upper": round(float(result["total_upper"][i]), 2),
+        })
+    total = series.pop()
+    series.sort(key=lambda s: -s["total"])
+    first = datetime(today.year, today.month, today.day)
+    return {
+        "by": by,
+        "horizon": horizon,
+        "history_start": start.strftime(DATE),
+        "days": [(first + timedelta(days=i)).strftime(DATE) for i in range(horizon)],
+        "series": series,
+        "total": total,
+    }
+
+
+def spend_forecast(by="model", horizon=30):
+    """Forecast daily spend per ``by`` ("model" or "skill") from today on.
+
+    Returns ``{"by", "horizon", "history_start", "days", "series",
+    "total"}``; each series (and ``total``) carries its ``name``,
+    ``daily``/``lower``/``upper`` lists aligned with ``days``, the horizon
+    sum ``total`` with its ``total_lower``/``total_upper`` band,
+    ``history_total`` and the fitted ``trend`` in dollars per day. Series
+    are ordered by forecast.
+    """
+    if by not in ("model", "skill"):
+        raise ValueError("by must be model or skill")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON} days")
+    today = utcnow().date()
+    forecast = snapshot_cached("usage_tracking", ("spend_forecast", today, by, horizon),
+                               lambda: _compute(by, horizon, today))
+    return copy.deepcopy(forecast)
@@ -1,52 +1,178 @@
+from datetime import datetime, timedelta
+
 from db import query_db, query_scalar
+from queries.downsample import series
+from queries.timewindow import DATE, DATETIME, month, since_day
+from rollups import LEVELS, rollups
 
+# Every window here starts on a day boundary, so the daily rollup answers it
+# exactly; the raw SQL is the fallback while the rollup catches up.
 
-def daily_spend(days=30):
-    """Daily spend for the last N days."""
-    return query_db("usage_tracking", """
-        SELECT date(timestamp) as day, SUM(cost_usd) as total_cost
-        FROM usage_log
-        WHERE date(timestamp) >= date('now', '-{} days')
-        GROUP BY date(timestamp)
-        ORDER BY day
-    """.format(days))
+
+def daily_spend(days=30, points=None):
+    """Daily spend for the last N days.
+
+    With ``points``, downsampled to that many days with the spend range of
+    the days left out (see queries.downsample), cached per snapshot.
+    """
+    start = since_day(days)
+
+    def fetch():
+        rows = rollups.query("usage", """
+            SELECT bucket as day, SUM(cost) as total_cost
+            FROM usage_day
+            WHERE bucket >= ?
+            GROUP BY bucket
+            ORDER BY day
+        """, (start,))
+        if rows is not None:
+            return rows
+        return query_db("usage_tracking", """
+            SELECT date(timestamp) as day, SUM(cost_usd) as total_cost
+            FROM usage_log
+            WHERE timestamp >= ?
+            GROUP BY date(timestamp)
+            ORDER BY day
+        """, (start,))
+
+    if points is None:
+        return fetch()
+    return series("usage_tracking", ("daily_spend", start), fetch, "day", "total_cost", points)
 
 
 def model_breakdown(days=30):
     """Spend breakdown by model."""
+    rows = rollups.query("usage", """
+        SELECT NULLIF(model, '') as model, SUM(cost) as total_cost, SUM(calls) as call_count
+        FROM usage_day
+        WHERE bucket >= ?
+        GROUP BY model
+        ORDER BY total_cost DESC
+    """, (since_day(days),))
+    if rows is not None:
+        return rows
     return query_db("usage_tracking", """
         SELECT model, SUM(cost_usd) as total_cost, COUNT(*) as call_count
         FROM usage_log
-        WHERE date(timestamp) >= date('now', '-{} days')
+        WHERE timestamp >= ?
         GROUP BY model
         ORDER BY total_cost DESC
-    """.format(days))
+    """, (since_day(days),))
 
 
 def skill_breakdown(days=30):
     """Spend breakdown by skill."""
+    rows = rollups.query("usage", """
+        SELECT NULLIF(skill, '') as skill, SUM(cost) as total_cost, SUM(calls) as call_count
+        FROM usage_day
+        WHERE bucket >= ?
+        GROUP BY skill
+        ORDER BY total_cost DESC
+    """, (since_day(days),))
+    if rows is not None:
+        return rows
     return query_db("usage_tracking", """
         SELECT skill, SUM(cost_usd) as total_cost, COUNT(*) as call_count
         FROM usage_log
-        WHERE date(timestamp) >= date('now', '-{} days')
+        WHERE timestamp >= ?
         GROUP BY skill
         ORDER BY total_cost DESC
-    """.format(days))
+    """, (since_day(days),))
 
 
 def monthly_projection():
     """Project monthly spend based on last 7 days average."""
-    avg_daily = query_scalar("usage_tracking", """
-        SELECT AVG(daily_total) FROM (
-            SELECT SUM(cost_usd) as daily_total
-            FROM usage_log
-            WHERE date(timestamp) >= date('now', '-7 days')
-            GROUP BY date(timestamp)
+    row = rollups.query("usage", """
+        SELECT AVG(daily_total) as avg_daily FROM (
+            SELECT SUM(cost) as daily_total
+            FROM usage_day
+            WHERE bucket >= ?
+            GROUP BY bucket
         )
-    """, default=0.0)
+    """, (since_day(7),), one=True)
+    if row is not None:
+        avg_daily = row["avg_daily"] or 0.0
+    else:
+        avg_daily = query_scalar("usage_tracking", """
+            SELECT AVG(daily_total) FROM (
+                SELECT SUM(cost_usd) as daily_total
+                FROM usage_log
+                WHERE timestamp >= ?
+                GROUP BY date(timestamp)
+            )
+        """, (since_day(7),), default=0.0)
     return round(avg_daily * 30, 2)
 
 
+def cost_summary(days=30, points=None):
+    """Daily, model and skill spend for the last N days, month to date and projection.
+
+    One scan produces per-(day, model, skill) totals covering every window
+    the cost page shows; the breakdowns are grouped from those few rows in
+    the same statement, like GROUPING SETS, instead of a query per chart.
+    ``points`` downsamples the daily series as daily_spend(points=) does.
+    """
+    start, week = since_day(days), since_day(7)
+    month_start, month_end = month()
+    params = {"lowest": min(start, week, month_start), "start": start, "week": week,
+              "month_start": month_start, "month_end": month_end}
+    rows = rollups.query("usage", _SUMMARY.format(cells="""
+        SELECT bucket as day, NULLIF(model, '') as model, NULLIF(skill, '') as skill,
+               cost, calls
+        FROM usage_day
+        WHERE bucket >= :lowest
+    """), params)
+    if rows is None:
+        rows = query_db("usage_tracking", _SUMMARY.format(cells="""
+            SELECT date(timestamp) as day, model, skill,
+                   SUM(cost_usd) as cost, COUNT(*) as calls
+            FROM usage_log
+            WHERE timestamp >= :lowest
+            GROUP BY date(timestamp), model, skill
+        """), params)
+
+    sets = {"day": [], "model": [], "skill": [], "week": [], "month": []}
+    for r in rows:
+        sets[r["grouping"]].append(r)
+    week_totals = [r["total_cost"] for r in sets["week"]]
+    avg_daily = sum(week_totals) / len(week_totals) if week_totals else 0.0
+
+    def breakdown(name):
+        ranked = sorted(sets[name], key=lambda r: -r["total_cost"])
+        return [{name: r["key"], "total_cost": r["total_cost"], "call_count": r["call_count"]}
+                for r in ranked]
+
+    daily = [{"day": r["key"], "total_cost": r["total_cost"]}
+             for r in sorted(sets["day"], key=lambda r: r["key"])]
+    if points is not None:
+        daily = series("usage_tracking", ("cost_summary.daily", start), lambda: daily,
+                       "day", "total_cost", points)
+    return {
+        "daily": daily,
+        "models": breakdown("model"),
+        "skills": breakdown("skill"),
+        # No month row at all when usage_tracking.db is missing
+        "month_total": (sets["month"][0]["total_cost"] if sets["month"] else None) or 0.0,
+        "projection": round(avg_daily * 30, 2),
+    }
+
+
+_SUMMARY = """
+    WITH cells AS MATERIALIZED ({cells})
+    SELECT 'day' as grouping, day as key, SUM(cost) as total_cost, SUM(calls) as call_count
+    FROM cells WHERE day >= :start GROUP BY day
+    UNION ALL
+    SELECT 'model', model, SUM(cost), SUM(calls) FROM cells WHERE day >= :start GROUP BY model
+    UNION ALL
+    SELECT 'skill', skill, SUM(cost), SUM(calls) FROM cells WHERE day >= :start GROUP BY skill
+    UNION ALL
+    SELECT 'week', day, SUM(cost), NULL FROM cells WHERE day >= :week GROUP BY day
+    UNION ALL
+    SELECT 'month', NULL, SUM(cost), NULL FROM cells
+    WHERE day >= :month_start AND day < :month_end
+"""
+
+
 def active_alerts():
     """Unresolved cost alerts."""
     return query_db("usage_tracking", """
@@ -59,7 +185,115 @@ def active_alerts():
 
 def total_spend_month():
     """Total spend this calendar month."""
+    row = rollups.query("usage", """
+        SELECT COALESCE(SUM(cost), 0) as total FROM usage_day
+        WHERE bucket >= ? AND bucket < ?
+    """, month(), one=True)
+    if row is not None:
+        return row["total"]
     return query_scalar("usage_tracking", """
         SELECT COALESCE(SUM(cost_usd), 0) FROM usage_log
-        WHERE strftime('%Y-%m', timestamp) = strftime('%Y-%m', 'now')
-    """, default=0.0)
+        WHERE timestamp >= ? AND timestamp < ?
+    """, month(), default=0.0)
+
+
+# Cube queries: any hour-aligned range at any granularity, from the usage
+# rollup's levels. A range is covered by the coarsest whole buckets that fit
+# -- months (or weeks) in the middle, days and hours only at the ragged
+# edges -- so a year costs about as many rows as a day.
+GRANULARITIES = ("hour", "day", "week", "month")
+CUBE_MEASURES = ("cost", "calls", "input_tokens", "output_tokens")
+
+
+def _floor(level, t):
+    if level == "hour":
+        return t.replace(minute=0, second=0, microsecond=0)
+    day = datetime(t.year, t.month, t.day)
+    if level == "day":
+        return day
+    if level == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _ceil(level, t):
+    floor = _floor(level, t)
+    if floor == t:
+        return t
+    if level == "hour":
+        return floor + timedelta(hours=1)
+    if level == "day":
+        return floor + timedelta(days=1)
+    if level == "week":
+        return floor + timedelta(days=7)
+    return (floor + timedelta(days=32)).replace(day=1)
+
+
+def _cover(start, end, chain):
+    """``[(level, lo, hi)]`` covering [start, end) with the coarsest buckets that fit."""
+    if start >= end:
+        return []
+    *finer, level = chain
+    if not finer:
+        return [(level, start, end)]
+    lo, hi = _ceil(level, start), _floor(level, end)
+    if lo >= hi:
+        return _cover(start, end, finer)
+    return _cover(start, lo, finer) + [(level, lo, hi)] + _cover(hi, end, finer)
+
+
+def usage_cube(start, end, granularity="day", model=None, skill=None, by=None):
+    """Usage measures per ``granularity`` period over [start, end).
+
+    ``start`` and ``end`` are datetimes, widened to whole hours. ``model``
+    and ``skill`` filter; ``by`` ("model" or "skill") splits each period.
+    Returns ``[{"period", [by], "cost", "calls", "input_tokens",
+    "output_tokens"}]`` ordered by period. Periods are labelled by their
+    first hour, day, Monday or month day.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if by not in (None, "model", "skill"):
+        raise ValueError("by must be model or skill")
+    start, end = _floor("hour", start), _ceil("hour", end)
+    chain = ["hour", "day", granularity][:GRANULARITIES.index(granularity) + 1]
+    period = LEVELS[granularity]
+    group = f", {by}" if by else ""
+    sums = ", ".join(f"SUM({m}) as {m}" for m in CUBE_MEASURES)
+    params = {"model": model, "skill": skill}
+    filters = "".join(f" AND {dim} = :{dim}" for dim in ("model", "skill") if params[dim])
+
+    pieces = []
+    for i, (level, lo, hi) in enumerate(_cover(start, end, chain)):
+        fmt = DATETIME if level == "hour" else DATE
+        params[f"lo{i}"], params[f"hi{i}"] = lo.strftime(fmt), hi.strftime(fmt)
+        pieces.append(
+            f"SELECT {period.format(t='bucket')} as period, NULLIF(model, '') as model, "
+            f"NULLIF(skill, '') as skill, {', '.join(CUBE_MEASURES)} FROM usage_{level} "
+            f"WHERE bucket >= :lo{i} AND bucket < :hi{i}{filters}"
+        )
+    if not pieces:
+        return []
+    rows = rollups.query("usage", f"""
+        SELECT period{group}, {sums}
+        FROM ({" UNION ALL ".join(pieces)})
+        GROUP BY period{group}
+        ORDER BY period{group}
+    """, params)
+    if rows is not None:
+        return rows
+
+    # Token columns are optional in usage_log
+    columns = {r["name"] for r in query_db(
+        "usage_tracking", "SELECT name FROM pragma_table_info('usage_log')")}
+    tokens = ", ".join(f"SUM({c}) as {c}" if c in columns else f"NULL as {c}"
+                       for c in ("input_tokens", "output_tokens"))
+    return query_db("usage_tracking", f"""
+        SELECT {period.format(t='timestamp')} as period{group},
+               SUM(cost_usd) as cost, COUNT(*) as calls, {tokens}
+        FROM usage_log
+        WHERE timestamp >= :start AND timestamp < :end{filters}
+        GROUP BY period{group}
+        ORDER BY period{group}
+    """, {"start": start.strftime(DATETIME), "end": end.strftime(DATETIME),
+          **{dim: params[dim] for dim in ("model", "skill") if params[dim]}})
@@ -1,39 +1,108 @@
+from datetime import datetime, timedelta
+
+import sketches
 from db import query_db, query_scalar
+from queries.downsample import series
+from queries.timewindow import DATE, DATETIME, since, since_day
+from rollups import rollups
+
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+# A job has regressed when its recent p95 is this many times the baseline's,
+# both windows having at least REGRESSION_MIN_RUNS successful runs
+REGRESSION_RATIO = 1.5
+REGRESSION_MIN_RUNS = 5
 
 
 def all_jobs_summary():
     """All jobs with last run info, 7-day success rate, and failure count."""
+    start = since(days=7)
+    # Whole days of the window come from the daily rollup and the whole hours
+    # before them from the hourly one; the partial hour it starts in is
+    # counted from the runs themselves. The last run of each job is kept up to
+    # date in cron_latest as runs are appended.
+    next_hour = (datetime.strptime(start, DATETIME).replace(minute=0, second=0)
+                 + timedelta(hours=1))
+    next_day = next_hour.date() + timedelta(days=1 if next_hour.hour else 0)
+    rows = rollups.query("cron", """
+        SELECT
+            w.job_name,
+            w.last_run,
+            l.status as last_status,
+            l.duration_seconds as last_duration,
+            w.runs_7d,
+            w.failures_7d,
+            ROUND((w.runs_7d - w.failures_7d) * 100.0 / w.runs_7d, 1) as success_rate_7d
+        FROM (
+            SELECT job_name, MAX(last_run) as last_run,
+                   SUM(runs) as runs_7d, SUM(failures) as failures_7d
+            FROM (
+                SELECT NULLIF(job_name, '') as job_name, MAX(last_started) as last_run,
+                       SUM(runs) as runs,
+                       SUM(CASE WHEN status = 'failure' THEN runs ELSE 0 END) as failures
+                FROM cron_hour
+                WHERE bucket >= :next_hour AND bucket < :next_day
+                GROUP BY job_name
+                UNION ALL
+                SELECT NULLIF(job_name, ''), MAX(last_started), SUM(runs),
+                       SUM(CASE WHEN status = 'failure' THEN runs ELSE 0 END)
+                FROM cron_day
+                WHERE bucket >= :next_day
+                GROUP BY job_name
+                UNION ALL
+                SELECT job_name, MAX(started_at), COUNT(*),
+                       SUM(CASE WHEN status = 'failure' THEN 1 ELSE 0 END)
+                FROM src.cron_runs
+                WHERE started_at >= :start AND started_at < :next_hour
+                GROUP BY job_name
+            )
+            GROUP BY job_name
+        ) w
+        LEFT JOIN cron_latest l ON l.job_name = COALESCE(w.job_name, '')
+        ORDER BY w.job_name
+    """, {"start": start, "next_hour": next_hour.strftime(DATETIME),
+          "next_day": next_day.strftime(DATE)})
+    if rows is not None:
+        return rows
+    # A job with runs in the window has its newest run in it too, so one pass
+    # over the window suffices. With a single MAX() aggregate SQLite takes the
+    # bare columns from the row holding the maximum (the first one on ties).
     return query_db("cron_log", """
         SELECT
             job_name,
             MAX(started_at) as last_run,
-            (SELECT status FROM cron_runs cr2
-             WHERE cr2.job_name = cr.job_name
-             ORDER BY started_at DESC LIMIT 1) as last_status,
-            (SELECT duration_seconds FROM cron_runs cr3
-             WHERE cr3.job_name = cr.job_name
-             ORDER BY started_at DESC LIMIT 1) as last_duration,
+            status as last_status,
+            duration_seconds as last_duration,
             COUNT(*) as runs_7d,
             SUM(CASE WHEN status = 'failure' THEN 1 ELSE 0 END) as failures_7d,
             ROUND(
                 (COUNT(*) - SUM(CASE WHEN status = 'failure' THEN 1 ELSE 0 END)) * 100.0 / COUNT(*),
                 1
             ) as success_rate_7d
-        FROM cron_runs cr
-        WHERE started_at >= datetime('now', '-7 days')
+        FROM cron_runs
+        WHERE started_at >= ?
         GROUP BY job_name
         ORDER BY job_name
-    """)
+    """, (start,))
 
 
 def stale_jobs(threshold_minutes=30):
     """Jobs that started but haven't completed in over N minutes."""
+    # The rollup tracks every run still 'running' in cron_open
+    rows = rollups.query("cron", """
+        SELECT NULLIF(job_name, '') as job_name, last_started as started_at,
+               duration as duration_seconds
+        FROM cron_open
+        WHERE last_started <= ?
+        ORDER BY last_started, rid
+    """, (since(minutes=threshold_minutes),))
+    if rows is not None:
+        return rows
     return query_db("cron_log", """
         SELECT job_name, started_at, duration_seconds FROM cron_runs
         WHERE status = 'running'
-          AND started_at <= datetime('now', '-{} minutes')
+          AND started_at <= ?
         ORDER BY started_at
-    """.format(threshold_minutes))
+    """, (since(minutes=threshold_minutes),))
 
 
 def job_runs(job_name, limit=50):
@@ -47,18 +116,95 @@ def job_runs(job_name, limit=50):
     """, (job_name, limit))
 
 
-def job_duration_history(job_name, days=14):
-    """Duration time series for Chart.js."""
-    return query_db("cron_log", """
-        SELECT started_at, duration_seconds
-        FROM cron_runs
-        WHERE job_name = ? AND status = 'success'
-          AND started_at >= datetime('now', '-{} days')
-        ORDER BY started_at
-    """.format(days), (job_name,))
+def duration_percentiles(job_name=None, recent_days=7, baseline_days=28):
+    """Duration percentiles of successful runs per job, recent vs. baseline.
+
+    ``recent`` is the last ``recent_days`` days, ``baseline`` the
+    ``baseline_days`` before them. Both are merged from the per-day sketches
+    in the cron rollup, so the cost doesn't grow with the number of runs;
+    percentiles are within sketches.ALPHA of the exact ones. Returns
+    ``{job_name: {"recent", "baseline", "change", "regressed"}}``, each
+    window ``{"runs", "p50", "p95", "p99"}`` or None without runs, and
+    ``change`` the ratio of the p95s.
+    """
+    params = {"recent": since_day(recent_days),
+              "baseline": since_day(recent_days + baseline_days), "job": job_name}
+    only_job = "AND job_name = :job" if job_name is not None else ""
+    rows = rollups.query("cron", f"""
+        SELECT NULLIF(job_name, '') as job_name, bucket >= :recent as recent, sketch
+        FROM cron_sketch
+        WHERE status = 'success' AND bucket >= :baseline {only_job}
+    """, params)
+    if rows is not None:
+        days = {}
+        for r in rows:
+            days.setdefault((r["job_name"], r["recent"]), []).append(
+                sketches.Sketch.from_bytes(r["sketch"]))
+        windows = {key: sketches.Sketch.merge(s) for key, s in days.items()}
+    else:
+        runs = query_db("cron_log", f"""
+            SELECT job_name, started_at >= :recent as recent, duration_seconds
+            FROM cron_runs
+            WHERE status = 'success' AND started_at >= :baseline
+              AND duration_seconds IS NOT NULL {only_job}
+        """, params)
+        values = {}
+        for r in runs:
+            values.setdefault((r["job_name"], r["recent"]), []).append(r["duration_seconds"])
+        windows = {key: sketches.Sketch.from_values(v) for key, v in values.items()}
+
+    def summary(sketch):
+        if sketch is None or not len(sketch):
+            return None
+        found = sketch.quantiles(list(PERCENTILES.values()))
+        return {"runs": len(sketch), **dict(zip(PERCENTILES, found))}
+
+    result = {}
+    for name in sorted({job for job, _ in windows}, key=lambda j: (j is None, j)):
+        recent, baseline = summary(windows.get((name, 1))), summary(windows.get((name, 0)))
+        change = None
+        if recent and baseline and baseline["p95"]:
+            change = recent["p95"] / baseline["p95"]
+        result[name] = {
+            "recent": recent,
+            "baseline": baseline,
+            "change": change,
+            "regressed": change is not None and change >= REGRESSION_RATIO
+            and recent["runs"] >= REGRESSION_MIN_RUNS
+            and baseline["runs"] >= REGRESSION_MIN_RUNS,
+        }
+    return result
+
+
+def job_duration_history(job_name, days=14, points=None):
+    """Duration time series for Chart.js.
+
+    With ``points``, downsampled to that many runs with the duration range
+    of the runs left out (see queries.downsample), cached per snapshot.
+    """
+    params = (job_name, since(days=days))
+
+    def fetch():
+        return query_db("cron_log", """
+            SELECT started_at, duration_seconds
+            FROM cron_runs
+            WHERE job_name = ? AND status = 'success'
+              AND started_at >= ?
+            ORDER BY started_at
+        """, params)
+
+    if points is None:
+        return fetch()
+    return series("cron_log", ("job_duration_history",) + params, fetch,
+                  "started_at", "duration_seconds", points)
 
 
 def total_jobs_count():
+    row = rollups.query("cron", """
+        SELECT COUNT(*) as jobs FROM cron_latest WHERE job_name != ''
+    """, one=True)
+    if row is not None:
+        return row["jobs"]
     return query_scalar("cron_log", """
         SELECT COUNT(DISTINCT job_name) FROM cron_runs
     """)
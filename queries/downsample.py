@@ -0,0 +1,139 @@
+"""Server-side downsampling of chart time series.
+
+A long series costs Chart.js far more to lay out than it can show: a
+5-minute cron job over 14 days is ~4,000 points on a chart a few hundred
+pixels wide. Largest-Triangle-Three-Buckets keeps the first and last point
+and, from each of ``points - 2`` equal-count buckets in between, the point
+forming the largest triangle with the point kept before it and the average
+of the next bucket. Unlike a stride or a bucket mean it keeps spikes, so the
+line looks the same at a fraction of the points. Each kept row also carries
+the min and max of its bucket (``<y>_min``/``<y>_max``), the envelope of
+what was dropped.
+
+The triangle areas are linear in the previous point, so the per-candidate
+terms are computed for the whole series in one NumPy pass; only the argmax
+per bucket walks the buckets in order. series() caches the reduced rows per
+DB snapshot, so each series is queried and reduced once per sync.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import Config
+from db import snapshot_cached
+
+
+MIN_POINTS = 3
+
+
+def chart_points(points=None):
+    """``points`` as asked for (``?points=N``), else CHART_POINTS; 0 means all.
+
+    A line needs its first and last point and one between them, so fewer
+    than MIN_POINTS is raised to MIN_POINTS.
+    """
+    points = Config.CHART_POINTS if points is None else points
+    return 0 if points <= 0 else max(points, MIN_POINTS)
+
+
+def _seconds(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    t = datetime.fromisoformat(value)
+    return (t if t.tzinfo else t.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def lttb(x, y, points):
+    """Indices LTTB keeps from ``x`` (ascending) and ``y``, with their buckets.
+
+    Returns ``(index, starts)``: the kept indices and where each one's bucket
+    begins, a bucket running to the next start, so
+    ``np.minimum.reduceat(y, starts)`` is the lower envelope. ``points`` of
+    ``len(x)`` or more keeps everything; fewer than MIN_POINTS keeps the
+    first point, and the last if there is room for it, each standing for
+    half the series.
+    """
+    n = len(x)
+    if points >= n:
+        everything = np.arange(n)
+        return everything, everything
+    if points < MIN_POINTS:
+        if points < 2:
+            return np.array([0]), np.array([0])
+        return np.array([0, n - 1]), np.array([0, n // 2])
+    x = np.asarray(x, dtype=float)
+    x = x - x[0]
+    y = np.asarray(y, dtype=float)
+
+    # Bucket 0 is the first point and the last bucket the last point; the
+    # n - 2 in between split as evenly as integer bounds allow
+    edges = np.arange(points - 1) * (n - 2) // (points - 2) + 1
+    starts = np.concatenate(([0], edges))
+    counts = np.diff(np.append(starts, n))
+    avg_x = np.add.reduceat(x, starts) / counts
+    avg_y = np.add.reduceat(y, starts) / counts
+
+    # Twice the area of (a, j, next bucket's average) is
+    # |x_a * b_j + y_a * c_j + k_j|, whichever a was kept before j's bucket
+    nxt = np.repeat(np.arange(1, points + 1), counts)[:n - 1]
+    nx, ny = avg_x[nxt], avg_y[nxt]
+    b, c, k = y[:n - 1] - ny, nx - x[:n - 1], x[:n - 1] * ny - nx * y[:n - 1]
+
+    index = np.empty(points, dtype=np.int64)
+    index[0], index[-1] = 0, n - 1
+    a = 0
+    for bucket in range(1, points - 1):
+        lo, hi = starts[bucket], starts[bucket + 1]
+        area = np.abs(x[a] * b[lo:hi] + y[a] * c[lo:hi] + k[lo:hi])
+        a = lo + int(area.argmax())
+        index[bucket] = a
+    return index, starts
+
+
+def downsample(rows, x, y, points):
+    """Keep at most ``points`` of ``rows`` (ordered by ``x``) by LTTB on ``y``.
+
+    ``x`` names a number or SQLite date/datetime text column. Returns new
+    dicts with ``<y>_min``/``<y>_max`` added, the range of ``y`` over the
+    rows each kept row stands for (just its own ``y`` when nothing was
+    dropped). Rows without a ``y`` are left out once the series is reduced.
+    ``points`` of 0 keeps every row.
+    """
+    lo_key, hi_key = f"{y}_min", f"{y}_max"
+    if not points or len(rows) <= points:
+        return [{**r, lo_key: r[y], hi_key: r[y]} for r in rows]
+    rows = [r for r in rows if r[y] is not None]
+    ys = np.fromiter((r[y] for r in rows), dtype=float, count=len(rows))
+    index, starts = lttb([_seconds(r[x]) for r in rows], ys, points)
+    if len(index) == len(rows):
+        return [{**r, lo_key: r[y], hi_key: r[y]} for r in rows]
+    low = np.minimum.reduceat(ys, starts).tolist()
+    high = np.maximum.reduceat(ys, starts).tolist()
+    return [{**rows[i], lo_key: lo, hi_key: hi}
+            for i, lo, hi in zip(index.tolist(), low, high)]
+
+
+def downsample_by(rows, key, x, y, points):
+    """downsample() each ``key`` group of ``rows`` on its own, in ``(x, key)`` order."""
+    groups = {}
+    for r in rows:
+        groups.setdefault(r[key], []).append(r)
+    kept = [r for group in groups.values() for r in downsample(group, x, y, points)]
+    kept.sort(key=lambda r: (r[x], r[key]))
+    return kept
+
+
+def series(db_name, key, fetch, x, y, points, by=None):
+    """``fetch()`` downsampled to ``points`` (per ``by`` group), once per snapshot.
+
+    ``key`` must identify the query and its parameters, window bounds
+    included. The rows are shared between requests: treat them as read-only.
+    """
+    def compute():
+        rows = fetch()
+        if by is None:
+            return downsample(rows, x, y, points)
+        return downsample_by(rows, by, x, y, points)
+
+    return snapshot_cached(db_name, (key, points), compute)
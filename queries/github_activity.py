@@ -1,137 +1,167 @@
-from db import query_db, query_scalar
+from db import query_batch, query_db
+from queries.downsample import chart_points, series
+from queries.registry import evaluate
+from queries.timewindow import since
+
+_RECENT_COMMITS = """
+    SELECT
+        ga.github_repo,
+        ga.title,
+        ga.author,
+        ga.event_date,
+        ga.url,
+        p.name as project_name,
+        p.id as project_id
+    FROM github_activity ga
+    LEFT JOIN projects p ON ga.project_id = p.id
+    WHERE ga.event_type = 'commit'
+    ORDER BY ga.event_date DESC
+    LIMIT ?
+"""
+
+_OPEN_PULL_REQUESTS = """
+    SELECT
+        ga.github_repo,
+        ga.title,
+        ga.author,
+        ga.event_date,
+        ga.branch,
+        ga.url,
+        p.name as project_name,
+        p.id as project_id
+    FROM github_activity ga
+    LEFT JOIN projects p ON ga.project_id = p.id
+    WHERE ga.event_type = 'pr_opened'
+    ORDER BY ga.event_date DESC
+"""
+
+_RECENT_MERGED_PRS = """
+    SELECT
+        ga.github_repo,
+        ga.title,
+        ga.author,
+        ga.event_date,
+        ga.branch,
+        ga.url,
+        p.name as project_name,
+        p.id as project_id
+    FROM github_activity ga
+    LEFT JOIN projects p ON ga.project_id = p.id
+    WHERE ga.event_type = 'pr_merged'
+    ORDER BY ga.event_date DESC
+    LIMIT ?
+"""
+
+_COMMITS_PER_REPO_WEEK = """
+    SELECT
+        github_repo,
+        COUNT(*) as commit_count,
+        p.name as project_name
+    FROM github_activity ga
+    LEFT JOIN projects p ON ga.project_id = p.id
+    WHERE ga.event_type = 'commit'
+    AND ga.event_date >= ?
+    GROUP BY ga.github_repo
+    ORDER BY commit_count DESC
+    LIMIT 15
+"""
+
+_DAILY_COMMIT_COUNTS = """
+    SELECT
+        date(event_date) as day,
+        COUNT(*) as commit_count
+    FROM github_activity
+    WHERE event_type = 'commit'
+    AND event_date >= ?
+    GROUP BY date(event_date)
+    ORDER BY day
+"""
+
+_REPO_SUMMARY = """
+    SELECT
+        ga.github_repo,
+        p.name as project_name,
+        p.id as project_id,
+        MAX(CASE WHEN ga.event_type = 'commit' THEN ga.event_date END) as last_commit,
+        SUM(CASE WHEN ga.event_type = 'commit' THEN 1 ELSE 0 END) as total_commits,
+        SUM(CASE WHEN ga.event_type = 'pr_opened' THEN 1 ELSE 0 END) as open_prs,
+        SUM(CASE WHEN ga.event_type = 'pr_merged' THEN 1 ELSE 0 END) as merged_prs,
+        SUM(CASE WHEN ga.event_type = 'commit'
+            AND ga.event_date >= ? THEN 1 ELSE 0 END) as commits_week
+    FROM github_activity ga
+    LEFT JOIN projects p ON ga.project_id = p.id
+    GROUP BY ga.github_repo
+    ORDER BY last_commit DESC
+"""
+
+# Keys of activity_stats() -> registry metric
+_STATS = {
+    "total_repos": "github.repos",
+    "commits_week": "github.commits_7d",
+    "open_prs": "github.open_prs",
+    "active_repos_week": "github.active_repos_7d",
+}
 
 
 def activity_stats():
     """Summary stats for the GitHub Activity page."""
-    total_repos = query_scalar("projecthub", """
-        SELECT COUNT(DISTINCT github_repo) FROM github_activity
-    """)
-    commits_week = query_scalar("projecthub", """
-        SELECT COUNT(*) FROM github_activity
-        WHERE event_type = 'commit'
-        AND event_date >= datetime('now', '-7 days')
-    """)
-    open_prs = query_scalar("projecthub", """
-        SELECT COUNT(*) FROM github_activity
-        WHERE event_type = 'pr_opened'
-    """)
-    active_repos_week = query_scalar("projecthub", """
-        SELECT COUNT(DISTINCT github_repo) FROM github_activity
-        WHERE event_type = 'commit'
-        AND event_date >= datetime('now', '-7 days')
-    """)
-    return {
-        "total_repos": total_repos,
-        "commits_week": commits_week,
-        "open_prs": open_prs,
-        "active_repos_week": active_repos_week,
-    }
+    m = evaluate(*_STATS.values())
+    return {key: m[name] for key, name in _STATS.items()}
 
 
 def recent_commits(limit=50):
     """Most recent commits across all repos."""
-    return query_db("projecthub", """
-        SELECT
-            ga.github_repo,
-            ga.title,
-            ga.author,
-            ga.event_date,
-            ga.url,
-            p.name as project_name,
-            p.id as project_id
-        FROM github_activity ga
-        LEFT JOIN projects p ON ga.project_id = p.id
-        WHERE ga.event_type = 'commit'
-        ORDER BY ga.event_date DESC
-        LIMIT ?
-    """, (limit,))
+    return query_db("projecthub", _RECENT_COMMITS, (limit,))
 
 
 def open_pull_requests():
     """All currently open PRs."""
-    return query_db("projecthub", """
-        SELECT
-            ga.github_repo,
-            ga.title,
-            ga.author,
-            ga.event_date,
-            ga.branch,
-            ga.url,
-            p.name as project_name,
-            p.id as project_id
-        FROM github_activity ga
-        LEFT JOIN projects p ON ga.project_id = p.id
-        WHERE ga.event_type = 'pr_opened'
-        ORDER BY ga.event_date DESC
-    """)
+    return query_db("projecthub", _OPEN_PULL_REQUESTS)
 
 
 def recent_merged_prs(limit=20):
     """Recently merged PRs."""
-    return query_db("projecthub", """
-        SELECT
-            ga.github_repo,
-            ga.title,
-            ga.author,
-            ga.event_date,
-            ga.branch,
-            ga.url,
-            p.name as project_name,
-            p.id as project_id
-        FROM github_activity ga
-        LEFT JOIN projects p ON ga.project_id = p.id
-        WHERE ga.event_type = 'pr_merged'
-        ORDER BY ga.event_date DESC
-        LIMIT ?
-    """, (limit,))
+    return query_db("projecthub", _RECENT_MERGED_PRS, (limit,))
 
 
 def commits_per_repo_week():
     """Commits per repo in the last 7 days, for the chart."""
-    return query_db("projecthub", """
-        SELECT
-            github_repo,
-            COUNT(*) as commit_count,
-            p.name as project_name
-        FROM github_activity ga
-        LEFT JOIN projects p ON ga.project_id = p.id
-        WHERE ga.event_type = 'commit'
-        AND ga.event_date >= datetime('now', '-7 days')
-        GROUP BY ga.github_repo
-        ORDER BY commit_count DESC
-        LIMIT 15
-    """)
-
-
-def daily_commit_counts(days=30):
-    """Commit counts per day for the last N days, for the activity chart."""
-    return query_db("projecthub", """
-        SELECT
-            date(event_date) as day,
-            COUNT(*) as commit_count
-        FROM github_activity
-        WHERE event_type = 'commit'
-        AND event_date >= datetime('now', ? || ' days')
-        GROUP BY date(event_date)
-        ORDER BY day
-    """, (f"-{days}",))
+    return query_db("projecthub", _COMMITS_PER_REPO_WEEK, (since(days=7),))
+
+
+def daily_commit_counts(days=30, points=None):
+    """Commit counts per day for the last N days, for the activity chart.
+
+    With ``points``, downsampled to that many days with the count range of
+    the days left out (see queries.downsample), cached per snapshot.
+    """
+    params = (since(days=days),)
+    if points is None:
+        return query_db("projecthub", _DAILY_COMMIT_COUNTS, params)
+    return series("projecthub", ("daily_commit_counts",) + params,
+                  lambda: query_db("projecthub", _DAILY_COMMIT_COUNTS, params),
+                  "day", "commit_count", points)
 
 
 def repo_summary():
     """Per-repo summary: last commit, total commits, open PRs."""
-    return query_db("projecthub", """
-        SELECT
-            ga.github_repo,
-            p.name as project_name,
-            p.id as project_id,
-            MAX(CASE WHEN ga.event_type = 'commit' THEN ga.event_date END) as last_commit,
-            SUM(CASE WHEN ga.event_type = 'commit' THEN 1 ELSE 0 END) as total_commits,
-            SUM(CASE WHEN ga.event_type = 'pr_opened' THEN 1 ELSE 0 END) as open_prs,
-            SUM(CASE WHEN ga.event_type = 'pr_merged' THEN 1 ELSE 0 END) as merged_prs,
-            SUM(CASE WHEN ga.event_type = 'commit'
-                AND ga.event_date >= datetime('now', '-7 days') THEN 1 ELSE 0 END) as commits_week
-        FROM github_activity ga
-        LEFT JOIN projects p ON ga.project_id = p.id
-        GROUP BY ga.github_repo
-        ORDER BY last_commit DESC
-    """)
+    return query_db("projecthub", _REPO_SUMMARY, (since(days=7),))
+
+
+def github_page(recent_limit=50, merged_limit=20, days=30, points=None):
+    """Everything the /github page renders, fetched as one batch on one connection.
+
+    The daily commits chart comes downsampled to ``points`` (chart_points)
+    from the per-snapshot series cache instead.
+    """
+    week = since(days=7)
+    results = query_batch("projecthub", [
+        ("recent", _RECENT_COMMITS, (recent_limit,), "all"),
+        ("open_prs", _OPEN_PULL_REQUESTS, (), "all"),
+        ("merged_prs", _RECENT_MERGED_PRS, (merged_limit,), "all"),
+        ("repos", _REPO_SUMMARY, (week,), "all"),
+        ("commits_by_repo", _COMMITS_PER_REPO_WEEK, (week,), "all"),
+    ])
+    results["daily_commits"] = daily_commit_counts(days, chart_points(points))
+    results["stats"] = activity_stats()
+    return results
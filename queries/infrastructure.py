@@ -4,6 +4,9 @@ import os
 import json
 import urllib.request
 
+from memo import request_memo
+from metrics import track_upstream
+from queries.k8s import k8s_get
 from queries.prometheus import (
     node_cpu_usage,
     node_memory_usage,
@@ -14,43 +17,17 @@ from queries.ollama import running_models, available_models, ollama_health
 
 GPU_EXPORTER_URL = os.environ.get("GPU_EXPORTER_URL", "http://192.168.1.50:9101")
 
-# Kubernetes API — in-cluster access via service account
-K8S_API = "https://kubernetes.default.svc"
-K8S_TOKEN_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/token"
-K8S_CA_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/ca.crt"
-
-
-def _k8s_get(path):
-    """Make an authenticated GET to the K8s API server."""
-    try:
-        with open(K8S_TOKEN_PATH) as f:
-            token = f.read().strip()
-    except FileNotFoundError:
-        return None
-
-    try:
-        url = f"{K8S_API}{path}"
-        req = urllib.request.Request(
-            url,
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-            },
-        )
-        import ssl
-        ctx = ssl.create_default_context(cafile=K8S_CA_PATH)
-        with urllib.request.urlopen(req, timeout=5, context=ctx) as resp:
-            return json.loads(resp.read())
-    except Exception:
-        return None
-
 
+@request_memo
 def _http_get_json(url, timeout=5):
     """Simple HTTP GET returning parsed JSON."""
     try:
-        req = urllib.request.Request(url, headers={"Accept": "application/json"})
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return json.loads(resp.read())
+        with track_upstream("gpu") as call:
+            req = urllib.request.Request(url, headers={"Accept": "application/json"})
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                body = resp.read()
+            call.bytes = len(body)
+            return json.loads(body)
     except Exception:
         return None
 
@@ -60,7 +37,7 @@ def get_system_health():
     alerts = []
 
     # 1. Longhorn volume health
-    volumes = _k8s_get("/apis/longhorn.io/v1beta2/volumes")
+    volumes = k8s_get("/apis/longhorn.io/v1beta2/volumes")
     if volumes:
         for vol in volumes.get("items", []):
             name = vol["metadata"]["name"]
@@ -90,7 +67,7 @@ def get_system_health():
                 })
 
     # 2. PVC health
-    pvcs = _k8s_get("/api/v1/persistentvolumeclaims")
+    pvcs = k8s_get("/api/v1/persistentvolumeclaims")
     if pvcs:
         for pvc in pvcs.get("items", []):
             phase = pvc.get("status", {}).get("phase", "Unknown")
@@ -105,7 +82,7 @@ def get_system_health():
                 })
 
     # 3. Pod health
-    pods = _k8s_get("/api/v1/pods")
+    pods = k8s_get("/api/v1/pods")
     if pods:
         for pod in pods.get("items", []):
             name = pod["metadata"]["name"]
@@ -151,7 +128,7 @@ def get_system_health():
                     })
 
     # 4. Node health
-    nodes = _k8s_get("/api/v1/nodes")
+    nodes = k8s_get("/api/v1/nodes")
     if nodes:
         for node in nodes.get("items", []):
             name = node["metadata"]["name"]
@@ -192,7 +169,7 @@ def get_system_health():
 
 def get_k8s_nodes():
     """Get K3s node status and resource info."""
-    data = _k8s_get("/api/v1/nodes")
+    data = k8s_get("/api/v1/nodes")
     if not data:
         return []
     nodes = []
@@ -220,7 +197,7 @@ def get_k8s_nodes():
 
 def get_k8s_pods():
     """Get all pods across all namespaces."""
-    data = _k8s_get("/api/v1/pods")
+    data = k8s_get("/api/v1/pods")
     if not data:
         return []
     pods = []
@@ -247,7 +224,7 @@ def get_k8s_pods():
 
 def get_k8s_services():
     """Get all services across all namespaces."""
-    data = _k8s_get("/api/v1/services")
+    data = k8s_get("/api/v1/services")
     if not data:
         return []
     services = []
@@ -273,7 +250,7 @@ def get_k8s_services():
 
 def get_k8s_namespaces():
     """Get all namespaces."""
-    data = _k8s_get("/api/v1/namespaces")
+    data = k8s_get("/api/v1/namespaces")
     if not data:
         return []
     return [
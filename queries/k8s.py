@@ -0,0 +1,196 @@
+"""Kubernetes API client for in-cluster access via the service account.
+
+One /infra render makes about eight API calls. Each used to reread the
+token, build an SSL context from the CA bundle and open a new TLS
+connection to the API server. K8sClient keeps all three:
+
+* the token is reread only when the file changes (the kubelet rotates
+  projected tokens by swapping the file in), or after a 401;
+* one SSL context is built, on first use;
+* connections are kept alive in a small pool shared by the request and
+  tile threads. A pooled connection the server has since closed is
+  dropped and the request retried on another.
+
+k8s_get() is what the query modules call.
+"""
+
+import http.client
+import json
+import os
+import ssl
+import threading
+import urllib.parse
+
+from memo import request_memo
+from metrics import track_upstream
+
+K8S_API = os.environ.get("K8S_API", "https://kubernetes.default.svc")
+K8S_TOKEN_PATH = os.environ.get(
+    "K8S_TOKEN_PATH", "/var/run/secrets/kubernetes.io/serviceaccount/token"
+)
+K8S_CA_PATH = os.environ.get(
+    "K8S_CA_PATH", "/var/run/secrets/kubernetes.io/serviceaccount/ca.crt"
+)
+# Idle keep-alive connections kept per worker; more can be open at once
+K8S_POOL_SIZE = int(os.environ.get("K8S_POOL_SIZE", 8))
+TIMEOUT = 5
+
+
+class K8sError(Exception):
+    """The API server answered with a status other than 200."""
+
+    def __init__(self, status, path):
+        super().__init__(f"{status} for {path}")
+        self.status = status
+
+
+class _Token:
+    """The service-account token, reread when the file is replaced or changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self, reload=False):
+        st = os.stat(self.path)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if reload or stamp != self._stamp:
+                with open(self.path) as f:
+                    self._value = f.read().strip()
+                self._stamp = stamp
+            return self._value
+
+
+class _Pool:
+    """Idle keep-alive HTTPS connections to one host, shared across threads."""
+
+    def __init__(self, host, port, context, size):
+        self.host = host
+        self.port = port
+        self.context = context
+        self.size = size
+        self.opened = 0
+        self._idle = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return ``(connection, reused)``."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the idle sockets belong to the parent
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        conn = http.client.HTTPSConnection(self.host, self.port, timeout=TIMEOUT,
+                                           context=self.context())
+        return conn, False
+
+    def put(self, conn):
+        with self._lock:
+            if len(self._idle) < self.size and self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class K8sClient:
+    """Authenticated GETs against one API server."""
+
+    def __init__(self, api=K8S_API, token_path=K8S_TOKEN_PATH, ca_path=K8S_CA_PATH,
+                 pool_size=K8S_POOL_SIZE):
+        url = urllib.parse.urlsplit(api)
+        self._prefix = url.path.rstrip("/")
+        self._ca_path = ca_path
+        self._context = None
+        self._context_lock = threading.Lock()
+        self._token = _Token(token_path)
+        self.pool = _Pool(url.hostname, url.port or 443, self._ssl_context, pool_size)
+
+    def _ssl_context(self):
+        with self._context_lock:
+            if self._context is None:
+                self._context = ssl.create_default_context(cafile=self._ca_path)
+            return self._context
+
+    def token(self):
+        """The current token; raises OSError when there is none (not in a cluster)."""
+        return self._token.get()
+
+    def get(self, path, token=None):
+        """GET ``path`` and return the response body; raises K8sError on a non-200."""
+        token = token or self.token()
+        status, body = self._request(path, token)
+        if status == 401:
+            # Rotated in place without the file changing as we look at it
+            status, body = self._request(path, self._token.get(reload=True))
+        if status != 200:
+            raise K8sError(status, path)
+        return body
+
+    def _request(self, path, token):
+        headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+        while True:
+            conn, reused = self.pool.get()
+            try:
+                conn.request("GET", self._prefix + path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except ConnectionError:
+                conn.close()
+                if reused:
+                    continue  # closed by the server while idle
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self.pool.put(conn)
+            return resp.status, body
+
+    def close(self):
+        self.pool.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client():
+    """The worker's shared K8sClient."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = K8sClient()
+        return _client
+
+
+@request_memo
+def k8s_get(path):
+    """Make an authenticated GET to the K8s API server; parsed JSON, or None."""
+    api = client()
+    try:
+        token = api.token()
+    except OSError:
+        return None
+
+    try:
+        with track_upstream("k8s") as call:
+            body = api.get(path, token)
+            call.bytes = len(body)
+            return json.loads(body)
+    except Exception:
+        return None
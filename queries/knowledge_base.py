@@ -1,4 +1,4 @@
-from db import query_db, query_scalar
+from db import query_db, query_iter, query_scalar
 
 
 def sources_by_type():
@@ -34,14 +34,14 @@ def source_titles_by_type(source_type, limit=50):
 
 
 def all_sources_summary():
-    """All sources with title and type for browsing."""
-    return query_db("knowledge_base", """
+    """All sources with title and type for browsing, streamed (query_iter) as compact tuple rows."""
+    return query_iter("knowledge_base", """
         SELECT id, title, source_type, url,
                SUBSTR(summary, 1, 200) as summary_short,
                created_at
         FROM sources
         ORDER BY created_at DESC
-    """)
+    """, shape="tuple")
 
 
 def total_stats():
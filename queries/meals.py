@@ -1,4 +1,5 @@
 from db import query_scalar, query_db
+from queries.timewindow import iso_weekday
 
 
 def recipe_count():
@@ -51,10 +52,9 @@ def todays_dinner():
         LEFT JOIN recipes r ON pm.recipe_id = r.id
         WHERE pm.plan_id = ?
           AND pm.meal_type = 'dinner'
-          AND pm.day_of_week = CASE CAST(strftime('%w', 'now') AS INTEGER)
-              WHEN 0 THEN 7 ELSE CAST(strftime('%w', 'now') AS INTEGER) END
+          AND pm.day_of_week = ?
         LIMIT 1
-    """, (plan["id"],), one=True)
+    """, (plan["id"], iso_weekday()), one=True)
     return row if row else None
 
 
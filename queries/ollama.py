@@ -4,16 +4,21 @@ import os
 import urllib.request
 import json
 
+from metrics import track_upstream
+
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://192.168.1.50:11434")
 
 
 def _get(path):
     """Make a GET request to the Ollama API."""
     try:
-        url = f"{OLLAMA_URL}{path}"
-        req = urllib.request.Request(url, headers={"Accept": "application/json"})
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            return json.loads(resp.read())
+        with track_upstream("ollama") as call:
+            url = f"{OLLAMA_URL}{path}"
+            req = urllib.request.Request(url, headers={"Accept": "application/json"})
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                body = resp.read()
+            call.bytes = len(body)
+            return json.loads(body)
     except Exception:
         return None
 
@@ -1,32 +1,29 @@
-from db import query_scalar, query_db
+from db import query_db
+from queries.cost_forecast import spend_forecast
+from queries.registry import evaluate
+from queries.timewindow import iso_weekday
 
 
-def cron_success_rate_24h():
-    total = query_scalar("cron_log", """
-        SELECT COUNT(*) FROM cron_runs
-        WHERE started_at >= datetime('now', '-24 hours')
-    """)
+def cron_success_rate_24h(metrics=None):
+    m = metrics or evaluate("cron.runs_24h", "cron.failures_24h")
+    total, failed = m["cron.runs_24h"], m["cron.failures_24h"]
     if total == 0:
         return {"rate": 0, "total": 0, "failed": 0}
-    failed = query_scalar("cron_log", """
-        SELECT COUNT(*) FROM cron_runs
-        WHERE started_at >= datetime('now', '-24 hours') AND status = 'failure'
-    """)
     rate = round(((total - failed) / total) * 100, 1)
     return {"rate": rate, "total": total, "failed": failed}
 
 
-def todays_cost():
-    cost = query_scalar("usage_tracking", """
-        SELECT COALESCE(SUM(cost_usd), 0) FROM usage_log
-        WHERE date(timestamp) = date('now')
-    """, default=0.0)
-    alerts = query_db("usage_tracking", """
-        SELECT * FROM cost_alerts
-        WHERE acknowledged = 0
-        ORDER BY created_at DESC LIMIT 3
-    """)
-    return {"cost": round(cost, 4), "active_alerts": len(alerts)}
+def todays_cost(metrics=None):
+    m = metrics or evaluate("cost.today", "cost.open_alerts")
+    forecast = spend_forecast("model", 30)["total"]
+    # The tile has only ever shown up to the three newest alerts
+    return {
+        "cost": round(m["cost.today"], 4),
+        "active_alerts": min(m["cost.open_alerts"], 3),
+        "forecast_30d": forecast["total"],
+        "forecast_low": forecast["total_lower"],
+        "forecast_high": forecast["total_upper"],
+    }
 
 
 def content_pipeline_counts():
@@ -38,10 +35,9 @@ def content_pipeline_counts():
     return counts
 
 
-def kb_stats():
-    sources = query_scalar("knowledge_base", "SELECT COUNT(*) FROM sources")
-    chunks = query_scalar("knowledge_base", "SELECT COUNT(*) FROM chunks")
-    return {"sources": sources, "chunks": chunks, "flagged": 0}
+def kb_stats(metrics=None):
+    m = metrics or evaluate("kb.sources", "kb.chunks")
+    return {"sources": m["kb.sources"], "chunks": m["kb.chunks"], "flagged": 0}
 
 
 def latest_briefing():
@@ -53,45 +49,24 @@ def latest_briefing():
     return row
 
 
-def high_match_jobs():
-    count = query_scalar("job_market", """
-        SELECT COUNT(*) FROM job_scores
-        WHERE match_score >= 80 AND date(created_at) >= date('now', '-7 days')
-    """)
-    applied = query_scalar("job_market", """
-        SELECT COUNT(*) FROM job_scores
-        WHERE alert_status = 'applied'
-    """)
-    return {"count": count, "applied": applied}
+def high_match_jobs(metrics=None):
+    m = metrics or evaluate("jobs.high_match_7d", "jobs.applied")
+    return {"count": m["jobs.high_match_7d"], "applied": m["jobs.applied"]}
 
 
-def youtube_trending():
-    count = query_scalar("youtube_channels", """
-        SELECT COUNT(DISTINCT phrase) FROM phrases
-        WHERE date(created_at) >= date('now', '-7 days')
-    """)
-    return count
+def youtube_trending(metrics=None):
+    m = metrics or evaluate("youtube.phrases_7d")
+    return m["youtube.phrases_7d"]
 
 
-def twitter_trending():
-    count = query_scalar("twitter_trends", """
-        SELECT COUNT(*) FROM themes WHERE status = 'trending'
-    """)
-    cross = query_scalar("twitter_trends", """
-        SELECT COUNT(*) FROM cross_source_themes WHERE correlation_score >= 0.3
-    """)
-    return {"trending": count, "cross_source": cross}
+def twitter_trending(metrics=None):
+    m = metrics or evaluate("twitter.trending_themes", "twitter.cross_source")
+    return {"trending": m["twitter.trending_themes"], "cross_source": m["twitter.cross_source"]}
 
 
-def chores_today():
-    pending = query_scalar("chore_schedule", """
-        SELECT COUNT(*) FROM assignments
-        WHERE assigned_date = date('now') AND status = 'pending'
-    """)
-    done = query_scalar("chore_schedule", """
-        SELECT COUNT(*) FROM assignments
-        WHERE assigned_date = date('now') AND status = 'done'
-    """)
+def chores_today(metrics=None):
+    m = metrics or evaluate("chores.pending_today", "chores.done_today")
+    pending, done = m["chores.pending_today"], m["chores.done_today"]
     return {"pending": pending, "done": done, "total": pending + done}
 
 
@@ -110,43 +85,42 @@ def meal_plan_status():
             LEFT JOIN recipes r ON pm.recipe_id = r.id
             WHERE pm.plan_id = ?
               AND pm.meal_type = 'dinner'
-              AND pm.day_of_week = CASE CAST(strftime('%w', 'now') AS INTEGER)
-                  WHEN 0 THEN 7 ELSE CAST(strftime('%w', 'now') AS INTEGER) END
+              AND pm.day_of_week = ?
             LIMIT 1
-        """, (row["id"],), one=True)
+        """, (row["id"], iso_weekday()), one=True)
         if dinner_row:
             dinner = dinner_row.get("meal_name")
     return {"status": row.get("status") if row else None, "dinner": dinner}
 
 
-def active_projects():
-    count = query_scalar("projecthub", """
-        SELECT COUNT(*) FROM projects WHERE status = 'active'
-    """)
-    overdue = query_scalar("projecthub", """
-        SELECT COUNT(*) FROM milestones
-        WHERE target_date < date('now') AND completed_date IS NULL
-    """)
-    return {"active": count, "overdue": overdue}
+def active_projects(metrics=None):
+    m = metrics or evaluate("projects.active", "projects.overdue_milestones")
+    return {"active": m["projects.active"], "overdue": m["projects.overdue_milestones"]}
 
 
-def crm_summary():
-    contacts = query_scalar("crm", "SELECT COUNT(*) FROM contacts")
-    high_value = query_scalar("crm", """
-        SELECT COUNT(*) FROM relationship_scores WHERE total_score >= 70
-    """)
-    stale = query_scalar("crm", """
-        SELECT COUNT(*) FROM relationship_scores
-        WHERE (total_score >= 70 AND days_since_contact >= 14)
-           OR (total_score >= 50 AND days_since_contact >= 30)
-    """)
-    pipeline_value = query_scalar("crm", """
-        SELECT COALESCE(SUM(amount), 0) FROM deals
-        WHERE deal_stage NOT IN ('closedwon', 'closedlost')
-    """, default=0.0)
+def crm_summary(metrics=None):
+    m = metrics or evaluate("crm.contacts", "crm.high_value", "crm.stale", "crm.pipeline_value")
     return {
-        "contacts": contacts,
-        "high_value": high_value,
-        "stale": stale,
-        "pipeline_value": pipeline_value,
+        "contacts": m["crm.contacts"],
+        "high_value": m["crm.high_value"],
+        "stale": m["crm.stale"],
+        "pipeline_value": m["crm.pipeline_value"],
     }
+
+
+# Template variable -> (tile function, placeholder rendered until its first value)
+TILES = {
+    "cron": (cron_success_rate_24h, {"rate": 0, "total": 0, "failed": 0}),
+    "cost": (todays_cost, {"cost": 0, "active_alerts": 0, "forecast_30d": 0,
+                           "forecast_low": 0, "forecast_high": 0}),
+    "content": (content_pipeline_counts, {}),
+    "kb": (kb_stats, {"sources": 0, "chunks": 0, "flagged": 0}),
+    "briefing": (latest_briefing, {}),
+    "jobs": (high_match_jobs, {"count": 0, "applied": 0}),
+    "youtube": (youtube_trending, 0),
+    "twitter": (twitter_trending, {"trending": 0, "cross_source": 0}),
+    "chores": (chores_today, {"pending": 0, "done": 0, "total": 0}),
+    "meal": (meal_plan_status, {"status": None, "dinner": None}),
+    "projects": (active_projects, {"active": 0, "overdue": 0}),
+    "crm": (crm_summary, {"contacts": 0, "high_value": 0, "stale": 0, "pipeline_value": 0}),
+}
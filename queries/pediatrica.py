@@ -4,10 +4,9 @@ import json
 import urllib.request
 from datetime import datetime, timezone
 
-# In-cluster K8s API access (same pattern as infrastructure.py)
-K8S_API = "https://kubernetes.default.svc"
-K8S_TOKEN_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/token"
-K8S_CA_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/ca.crt"
+from memo import request_memo
+from metrics import track_upstream
+from queries.k8s import k8s_get
 
 # Pediatrica app endpoint (in-cluster service discovery)
 PEDIATRICA_STATUS_URL = (
@@ -18,38 +17,16 @@ PEDIATRICA_STATUS_FALLBACK = (
 )
 
 
-def _k8s_get(path):
-    """Make an authenticated GET to the K8s API server."""
-    try:
-        with open(K8S_TOKEN_PATH) as f:
-            token = f.read().strip()
-    except FileNotFoundError:
-        return None
-
-    try:
-        import ssl
-
-        url = f"{K8S_API}{path}"
-        req = urllib.request.Request(
-            url,
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json",
-            },
-        )
-        ctx = ssl.create_default_context(cafile=K8S_CA_PATH)
-        with urllib.request.urlopen(req, timeout=5, context=ctx) as resp:
-            return json.loads(resp.read())
-    except Exception:
-        return None
-
-
+@request_memo
 def _http_get_json(url, timeout=5):
     """Simple HTTP GET returning parsed JSON."""
     try:
-        req = urllib.request.Request(url, headers={"Accept": "application/json"})
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return json.loads(resp.read())
+        with track_upstream("pediatrica") as call:
+            req = urllib.request.Request(url, headers={"Accept": "application/json"})
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                body = resp.read()
+            call.bytes = len(body)
+            return json.loads(body)
     except Exception:
         return None
 
@@ -64,7 +41,7 @@ def get_pipeline_status():
 
 def get_deployed_pods():
     """Get Pediatrica pods from K8s API."""
-    data = _k8s_get("/api/v1/namespaces/pediatrica/pods")
+    data = k8s_get("/api/v1/namespaces/pediatrica/pods")
     if not data:
         return []
 
@@ -1,4 +1,5 @@
 from db import query_db, query_scalar
+from queries.timewindow import day, since_day
 
 
 def all_projects():
@@ -58,12 +59,12 @@ def summary_stats():
     """)
     hours_week = query_scalar("projecthub", """
         SELECT COALESCE(SUM(hours), 0) FROM time_entries
-        WHERE date(date) >= date('now', '-7 days')
-    """, default=0.0)
+        WHERE date >= ?
+    """, (since_day(7),), default=0.0)
     overdue = query_scalar("projecthub", """
         SELECT COUNT(*) FROM milestones
-        WHERE target_date < date('now') AND completed_date IS NULL
-    """)
+        WHERE target_date < ? AND completed_date IS NULL
+    """, (day()[0],))
     commits_week = query_scalar("projecthub", """
         SELECT COALESCE(SUM(commits_this_week), 0) FROM projects
         WHERE archived_at IS NULL
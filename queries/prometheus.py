@@ -5,16 +5,23 @@ import urllib.request
 import urllib.parse
 import json
 
+from memo import request_memo
+from metrics import track_upstream
+
 PROMETHEUS_URL = os.environ.get("PROMETHEUS_URL", "http://prometheus-server.monitoring.svc.cluster.local:9090")
 
 
+@request_memo
 def _query(promql):
     """Execute an instant PromQL query and return the result."""
     try:
-        url = f"{PROMETHEUS_URL}/api/v1/query?query={urllib.parse.quote(promql)}"
-        req = urllib.request.Request(url, headers={"Accept": "application/json"})
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read())
+        with track_upstream("prometheus") as call:
+            url = f"{PROMETHEUS_URL}/api/v1/query?query={urllib.parse.quote(promql)}"
+            req = urllib.request.Request(url, headers={"Accept": "application/json"})
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                body = resp.read()
+            call.bytes = len(body)
+            data = json.loads(body)
             if data.get("status") == "success":
                 return data.get("data", {}).get("result", [])
     except Exception:
@@ -0,0 +1,152 @@
+"""Declarative registry of count/sum metrics, compiled into one scan per table.
+
+Each metric is a (database, table, filter, aggregate) tuple. evaluate() groups
+the requested metrics by table and compiles each group into a single
+conditional-aggregation scan:
+
+    SELECT SUM(CASE WHEN <filter a> THEN 1 ELSE 0 END) AS "a",
+           SUM(CASE WHEN <filter b> THEN amount END) AS "b"
+    FROM crm.deals
+
+so asking for five counts over relationship_scores reads it once, not five
+times. All scans for a request run together on federated connections.
+
+Time filters compare bare columns with the named parameters from
+_window_params() (see queries.timewindow), never with 'now'.
+"""
+
+from db import query_federated_scans
+from queries.timewindow import day, since, since_day
+
+COUNT = ("count", None)
+
+
+def SUM(column):
+    return ("sum", column)
+
+
+def COUNT_DISTINCT(column):
+    return ("count_distinct", column)
+
+
+_LAST_24H = "started_at >= :since_24h"
+_COMMIT_7D = "event_type = 'commit' AND event_date >= :since_7d"
+_TODAY = "{col} >= :today AND {col} < :tomorrow"
+
+# name: (database, table, filter or None, aggregate)
+METRICS = {
+    "cron.runs_24h": ("cron_log", "cron_runs", _LAST_24H, COUNT),
+    "cron.failures_24h": ("cron_log", "cron_runs",
+                          f"{_LAST_24H} AND status = 'failure'", COUNT),
+
+    "cost.today": ("usage_tracking", "usage_log",
+                   _TODAY.format(col="timestamp"), SUM("cost_usd")),
+    "cost.open_alerts": ("usage_tracking", "cost_alerts", "acknowledged = 0", COUNT),
+
+    "kb.sources": ("knowledge_base", "sources", None, COUNT),
+    "kb.chunks": ("knowledge_base", "chunks", None, COUNT),
+
+    "jobs.high_match_7d": ("job_market", "job_scores",
+                           "match_score >= 80 AND created_at >= :day_7",
+                           COUNT),
+    "jobs.applied": ("job_market", "job_scores", "alert_status = 'applied'", COUNT),
+
+    "youtube.phrases_7d": ("youtube_channels", "phrases",
+                           "created_at >= :day_7",
+                           COUNT_DISTINCT("phrase")),
+
+    "twitter.active_accounts": ("twitter_trends", "accounts", "active = 1", COUNT),
+    "twitter.tweets": ("twitter_trends", "tweets", None, COUNT),
+    "twitter.tweets_today": ("twitter_trends", "tweets",
+                             "created_at >= :today", COUNT),
+    "twitter.trending_themes": ("twitter_trends", "themes", "status = 'trending'", COUNT),
+    "twitter.cross_source": ("twitter_trends", "cross_source_themes",
+                             "correlation_score >= 0.3", COUNT),
+
+    "chores.pending_today": ("chore_schedule", "assignments",
+                             "assigned_date = :today AND status = 'pending'", COUNT),
+    "chores.done_today": ("chore_schedule", "assignments",
+                          "assigned_date = :today AND status = 'done'", COUNT),
+
+    "projects.active": ("projecthub", "projects", "status = 'active'", COUNT),
+    "projects.overdue_milestones": ("projecthub", "milestones",
+                                    "target_date < :today AND completed_date IS NULL",
+                                    COUNT),
+
+    "github.repos": ("projecthub", "github_activity", None, COUNT_DISTINCT("github_repo")),
+    "github.commits_7d": ("projecthub", "github_activity", _COMMIT_7D, COUNT),
+    "github.open_prs": ("projecthub", "github_activity", "event_type = 'pr_opened'", COUNT),
+    "github.active_repos_7d": ("projecthub", "github_activity", _COMMIT_7D,
+                               COUNT_DISTINCT("github_repo")),
+
+    "crm.contacts": ("crm", "contacts", None, COUNT),
+    "crm.companies": ("crm", "companies", None, COUNT),
+    "crm.deals": ("crm", "deals", None, COUNT),
+    "crm.pipeline_value": ("crm", "deals",
+                           "deal_stage NOT IN ('closedwon', 'closedlost')", SUM("amount")),
+    "crm.high_value": ("crm", "relationship_scores", "total_score >= 70", COUNT),
+    "crm.stale": ("crm", "relationship_scores",
+                  "(total_score >= 70 AND days_since_contact >= 14)"
+                  " OR (total_score >= 50 AND days_since_contact >= 30)",
+                  COUNT),
+    "crm.pending_drafts": ("crm", "follow_up_drafts", "draft_status = 'pending'", COUNT),
+}
+
+
+def _compile(filter_sql, aggregate):
+    kind, column = aggregate
+    if kind == "count":
+        if filter_sql is None:
+            return "COUNT(*)"
+        return f"SUM(CASE WHEN {filter_sql} THEN 1 ELSE 0 END)"
+    if kind == "sum":
+        if filter_sql is None:
+            return f"SUM({column})"
+        return f"SUM(CASE WHEN {filter_sql} THEN {column} END)"
+    if kind == "count_distinct":
+        if filter_sql is None:
+            return f"COUNT(DISTINCT {column})"
+        return f"COUNT(DISTINCT CASE WHEN {filter_sql} THEN {column} END)"
+    raise ValueError(f"unknown aggregate: {kind}")
+
+
+def compile_scans(names):
+    """Compile metrics into ``(db_name, sql, names)`` scans, one per table."""
+    tables = {}
+    for name in names:
+        db_name, table, filter_sql, aggregate = METRICS[name]
+        tables.setdefault((db_name, table), []).append(
+            (name, filter_sql, _compile(filter_sql, aggregate))
+        )
+    scans = []
+    for (db_name, table), columns in tables.items():
+        select = ",\n       ".join(f'{expr} AS "{name}"' for name, _, expr in columns)
+        sql = f"SELECT {select}\n  FROM {db_name}.{table}"
+        filters = [f for _, f, _ in columns]
+        if None not in filters:
+            # Rows no metric counts can be skipped, which lets a filter on an
+            # indexed column become a range search instead of a full scan
+            sql += "\n WHERE " + " OR ".join(f"({f})" for f in dict.fromkeys(filters))
+        scans.append((db_name, sql, tuple(name for name, _, _ in columns)))
+    return scans
+
+
+def _window_params():
+    today, tomorrow = day()
+    return {
+        "today": today,
+        "tomorrow": tomorrow,
+        "day_7": since_day(7),
+        "since_24h": since(hours=24),
+        "since_7d": since(days=7),
+    }
+
+
+def evaluate(*names):
+    """Return ``{name: value}`` for the given metrics, 0 for missing DBs."""
+    return query_federated_scans(compile_scans(names), params=_window_params())
+
+
+def value(name):
+    """Evaluate a single metric."""
+    return evaluate(name)[name]
@@ -0,0 +1,78 @@
+"""Half-open UTC time windows, computed in Python and bound as parameters.
+
+A filter like ``date(timestamp) >= date('now', '-30 days')`` wraps the
+column in a function, so no index on it can be used, and splicing ``days``
+into the SQL makes every window a different statement. The helpers here
+return the bounds as strings in SQLite's own formats (``YYYY-MM-DD`` and
+``YYYY-MM-DD HH:MM:SS``, UTC like SQLite's 'now'), so the same filter is
+written against the bare column:
+
+    WHERE timestamp >= ?                       -- since_day(30)
+    WHERE timestamp >= ? AND timestamp < ?     -- *day()
+
+For the ISO-8601 text timestamps the databases store, comparing the bare
+column with a date string is exactly equivalent to comparing its date().
+
+``now`` defaults to the current time floored to QUERY_CACHE_NOW_BUCKET
+seconds, so the bounds (and therefore result cache keys) only move once per
+bucket -- the same staleness the cache already allowed for 'now' queries.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+
+DATE = "%Y-%m-%d"
+DATETIME = "%Y-%m-%d %H:%M:%S"
+
+
+def utcnow():
+    """Current naive UTC time, floored to the result cache's 'now' bucket."""
+    ts = int(time.time())
+    if Config.QUERY_CACHE_NOW_BUCKET > 0:
+        ts -= ts % Config.QUERY_CACHE_NOW_BUCKET
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+def since(now=None, **delta):
+    """Lower bound like ``datetime('now', '-N <unit>')``; ``delta`` as for timedelta."""
+    return ((now or utcnow()) - timedelta(**delta)).strftime(DATETIME)
+
+
+def since_day(days, now=None):
+    """Start of the day ``days`` ago, like ``date('now', '-N days')``."""
+    return ((now or utcnow()) - timedelta(days=days)).strftime(DATE)
+
+
+def day(now=None):
+    """``(start, end)`` of today: ``col >= start AND col < end`` is ``date(col) = date('now')``."""
+    today = (now or utcnow()).date()
+    return today.strftime(DATE), (today + timedelta(days=1)).strftime(DATE)
+
+
+def month(now=None):
+    """``(start, end)`` of the current calendar month.
+
+    ``col >= start AND col < end`` is
+    ``strftime('%Y-%m', col) = strftime('%Y-%m', 'now')``.
+    """
+    first = (now or utcnow()).date().replace(day=1)
+    following = (first + timedelta(days=32)).replace(day=1)
+    return first.strftime(DATE), following.strftime(DATE)
+
+
+def week_start(now=None):
+    """``date('now', 'weekday 1', '-7 days')``.
+
+    'weekday 1' moves forward to the next Monday (or stays on one), so on a
+    Monday this is the previous Monday.
+    """
+    today = (now or utcnow()).date()
+    next_monday = today + timedelta(days=(0 - today.weekday()) % 7)
+    return (next_monday - timedelta(days=7)).strftime(DATE)
+
+
+def iso_weekday(now=None):
+    """Monday=1 .. Sunday=7, the ``CASE strftime('%w', 'now') ...`` idiom."""
+    return (now or utcnow()).isoweekday()
@@ -1,117 +1,165 @@
-from db import query_db, query_scalar
+from db import query_batch, query_db, query_iter
+from queries.downsample import chart_points, series
+from queries.registry import evaluate, value
+from queries.timewindow import since_day
+
+_THEMES_BY_STATUS = """
+    SELECT status, COUNT(*) as count
+    FROM themes
+    GROUP BY status
+    ORDER BY CASE status
+        WHEN 'trending' THEN 1
+        WHEN 'active' THEN 2
+        WHEN 'emerging' THEN 3
+        WHEN 'declining' THEN 4
+        WHEN 'stale' THEN 5
+    END
+"""
+
+_TRENDING_THEMES = """
+    SELECT name, description, mention_count, unique_accounts,
+           velocity, acceleration, status, first_seen_date, updated_at
+    FROM themes
+    ORDER BY CASE status
+        WHEN 'trending' THEN 1
+        WHEN 'active' THEN 2
+        WHEN 'emerging' THEN 3
+        WHEN 'declining' THEN 4
+        WHEN 'stale' THEN 5
+    END, velocity DESC
+"""
+
+_FLAGGED_TWEETS = """
+    SELECT t.text, t.content_angle, t.likes, t.retweets,
+           t.domain_tags, t.posted_at, t.tweet_url, t.created_at,
+           a.handle, a.category
+    FROM tweets t
+    JOIN accounts a ON t.account_id = a.id
+    WHERE t.content_flag = 1
+    ORDER BY t.created_at DESC
+    LIMIT ?
+"""
+
+_CROSS_SOURCE_THEMES = """
+    SELECT theme_name, twitter_count, youtube_count, kb_count,
+           source_types, correlation_score, first_detected, last_updated
+    FROM cross_source_themes
+    ORDER BY correlation_score DESC
+"""
+
+_ACCOUNTS = """
+    SELECT handle, display_name, category, domain_tags, active,
+           last_scan_date, total_tweets_tracked
+    FROM accounts
+    ORDER BY category, handle
+"""
+
+_ACCOUNTS_BY_CATEGORY = """
+    SELECT category, COUNT(*) as count,
+           SUM(total_tweets_tracked) as total_tweets
+    FROM accounts
+    WHERE active = 1
+    GROUP BY category
+    ORDER BY count DESC
+"""
+
+_THEME_VELOCITY_HISTORY = """
+    SELECT th.date, t.name, th.velocity, th.mention_count
+    FROM theme_history th
+    JOIN themes t ON th.theme_id = t.id
+    WHERE t.status IN ('trending', 'active')
+    AND th.date >= ?
+    ORDER BY th.date, t.name
+"""
 
 
 def account_count():
-    return query_scalar("twitter_trends", "SELECT COUNT(*) FROM accounts WHERE active = 1")
+    return value("twitter.active_accounts")
 
 
 def tweet_count():
-    return query_scalar("twitter_trends", "SELECT COUNT(*) FROM tweets")
+    return value("twitter.tweets")
 
 
 def tweets_today():
-    return query_scalar("twitter_trends", """
-        SELECT COUNT(*) FROM tweets WHERE date(created_at) >= date('now')
-    """)
+    return value("twitter.tweets_today")
 
 
 def trending_theme_count():
-    return query_scalar("twitter_trends", """
-        SELECT COUNT(*) FROM themes WHERE status = 'trending'
-    """)
+    return value("twitter.trending_themes")
 
 
 def cross_source_count():
-    return query_scalar("twitter_trends", """
-        SELECT COUNT(*) FROM cross_source_themes WHERE correlation_score >= 0.3
-    """)
+    return value("twitter.cross_source")
 
 
 def themes_by_status():
     """Theme counts grouped by status."""
-    return query_db("twitter_trends", """
-        SELECT status, COUNT(*) as count
-        FROM themes
-        GROUP BY status
-        ORDER BY CASE status
-            WHEN 'trending' THEN 1
-            WHEN 'active' THEN 2
-            WHEN 'emerging' THEN 3
-            WHEN 'declining' THEN 4
-            WHEN 'stale' THEN 5
-        END
-    """)
+    return query_db("twitter_trends", _THEMES_BY_STATUS)
 
 
 def trending_themes():
-    """All themes ordered by velocity."""
-    return query_db("twitter_trends", """
-        SELECT name, description, mention_count, unique_accounts,
-               velocity, acceleration, status, first_seen_date, updated_at
-        FROM themes
-        ORDER BY CASE status
-            WHEN 'trending' THEN 1
-            WHEN 'active' THEN 2
-            WHEN 'emerging' THEN 3
-            WHEN 'declining' THEN 4
-            WHEN 'stale' THEN 5
-        END, velocity DESC
-    """)
+    """All themes ordered by velocity, as compact tuple rows."""
+    return query_db("twitter_trends", _TRENDING_THEMES, shape="tuple")
 
 
 def flagged_tweets(limit=30):
     """Content-flagged tweets with account info."""
-    return query_db("twitter_trends", """
-        SELECT t.text, t.content_angle, t.likes, t.retweets,
-               t.domain_tags, t.posted_at, t.tweet_url, t.created_at,
-               a.handle, a.category
-        FROM tweets t
-        JOIN accounts a ON t.account_id = a.id
-        WHERE t.content_flag = 1
-        ORDER BY t.created_at DESC
-        LIMIT ?
-    """, (limit,))
+    return query_db("twitter_trends", _FLAGGED_TWEETS, (limit,))
 
 
 def cross_source_themes():
     """Cross-source convergences."""
-    return query_db("twitter_trends", """
-        SELECT theme_name, twitter_count, youtube_count, kb_count,
-               source_types, correlation_score, first_detected, last_updated
-        FROM cross_source_themes
-        ORDER BY correlation_score DESC
-    """)
+    return query_db("twitter_trends", _CROSS_SOURCE_THEMES)
 
 
 def accounts():
-    """All tracked accounts."""
-    return query_db("twitter_trends", """
-        SELECT handle, display_name, category, domain_tags, active,
-               last_scan_date, total_tweets_tracked
-        FROM accounts
-        ORDER BY category, handle
-    """)
+    """All tracked accounts, streamed (query_iter) as compact tuple rows."""
+    return query_iter("twitter_trends", _ACCOUNTS, shape="tuple")
 
 
 def accounts_by_category():
     """Account counts per category."""
-    return query_db("twitter_trends", """
-        SELECT category, COUNT(*) as count,
-               SUM(total_tweets_tracked) as total_tweets
-        FROM accounts
-        WHERE active = 1
-        GROUP BY category
-        ORDER BY count DESC
-    """)
-
-
-def theme_velocity_history(limit=14):
-    """Daily velocity data for top themes (for Chart.js)."""
-    return query_db("twitter_trends", """
-        SELECT th.date, t.name, th.velocity, th.mention_count
-        FROM theme_history th
-        JOIN themes t ON th.theme_id = t.id
-        WHERE t.status IN ('trending', 'active')
-        AND th.date >= date('now', ? || ' days')
-        ORDER BY th.date, t.name
-    """, (str(-limit),))
+    return query_db("twitter_trends", _ACCOUNTS_BY_CATEGORY)
+
+
+def theme_velocity_history(limit=14, points=None):
+    """Daily velocity data for top themes (for Chart.js).
+
+    With ``points``, each theme is downsampled to that many days on its own,
+    with the velocity range of the days left out (see queries.downsample).
+    """
+    params = (since_day(limit),)
+    if points is None:
+        return query_db("twitter_trends", _THEME_VELOCITY_HISTORY, params)
+    return series("twitter_trends", ("theme_velocity_history",) + params,
+                  lambda: query_db("twitter_trends", _THEME_VELOCITY_HISTORY, params),
+                  "date", "velocity", points, by="name")
+
+
+# Template variable -> registry metric for the /twitter header counts
+_PAGE_METRICS = {
+    "account_total": "twitter.active_accounts",
+    "tweet_total": "twitter.tweets",
+    "tweets_today_count": "twitter.tweets_today",
+    "trending_count": "twitter.trending_themes",
+    "cross_source_total": "twitter.cross_source",
+}
+
+
+def twitter_page(flagged_limit=30, history_days=14, points=None):
+    """Everything the /twitter page renders: header counts from one registry
+    pass, tables as one batch on one connection, the accounts table streamed.
+    The velocity chart is downsampled to ``points`` per theme (chart_points)."""
+    m = evaluate(*_PAGE_METRICS.values())
+    page = {key: m[name] for key, name in _PAGE_METRICS.items()}
+    page.update(query_batch("twitter_trends", [
+        ("status_counts", _THEMES_BY_STATUS, (), "all"),
+        ("themes", _TRENDING_THEMES, (), "tuple"),
+        ("flagged", _FLAGGED_TWEETS, (flagged_limit,), "all"),
+        ("convergences", _CROSS_SOURCE_THEMES, (), "all"),
+        ("categories", _ACCOUNTS_BY_CATEGORY, (), "all"),
+    ]))
+    page["velocity_history"] = theme_velocity_history(history_days, chart_points(points))
+    page["accts"] = accounts()
+    return page
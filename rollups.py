@@ -0,0 +1,444 @@
+"""Incremental rollups of the log tables, kept in a local SQLite store.
+
+usage_log and cron_runs only grow, yet every cost page and the cron summary
+re-aggregated weeks of raw rows per render. For each rollup in ROLLUPS the
+dashboard keeps per-bucket aggregates (one table per level in LEVELS, e.g.
+``usage_hour`` and ``usage_day``) in Config.ROLLUP_DIR/rollups.db together
+with a watermark: the highest source rowid already folded in. When the
+watcher reports a new snapshot a background thread folds in only the rows
+past the watermark, so a sync costs time proportional to what was appended.
+
+Rows matching a rollup's ``open`` predicate (a cron run still 'running')
+can still change; their contributions are remembered and re-read on every
+sync until they settle. If the row at the watermark is gone or different,
+the source was rewritten rather than appended to and the rollup is rebuilt.
+A rollup may also keep a ``latest`` table: per key, the newest row by an
+ordering column (a job's last run), updated from the same delta, and a
+``sketch`` table: per bucket of one level and dimensions, a quantile sketch
+of a column (sketches.py) that only settled rows join.
+
+query() answers from the store only when it was synced from exactly the
+snapshot the rest of the dashboard is reading; otherwise it returns None and
+the caller falls back to its raw SQL, so results never go stale. The
+source snapshot is attached as ``src`` for statements that need to fill in
+a partial bucket at the edge of a window. Dimensions are stored with NULL
+as '' (part of the primary key); read them back with NULLIF.
+"""
+
+import fcntl
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import metrics
+import sketches
+from config import Config
+from db import snapshot_version
+from sidecar import sidecars
+from watcher import watcher
+
+log = logging.getLogger(__name__)
+
+# Bucket key of a time value {t} at each level. Keys sort like the times and
+# every level's bucket can be derived from an hour bucket. Weeks start on
+# Monday ('weekday 0' is the next Sunday, or today if it is one).
+LEVELS = {
+    "hour": "strftime('%Y-%m-%d %H:00:00', {t})",
+    "day": "date({t})",
+    "week": "date({t}, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', {t})",
+}
+
+# name: source table, dimensions and measures as (kind, source column);
+# kinds are "count", "sum" and "max" (max is never retracted)
+ROLLUPS = {
+    "usage": {
+        "db": "usage_tracking",
+        "table": "usage_log",
+        "time": "timestamp",
+        "dims": ("model", "skill"),
+        "measures": {
+            "calls": ("count", None),
+            "cost": ("sum", "cost_usd"),
+            "input_tokens": ("sum", "input_tokens"),
+            "output_tokens": ("sum", "output_tokens"),
+        },
+    },
+    "cron": {
+        "db": "cron_log",
+        "table": "cron_runs",
+        "time": "started_at",
+        "dims": ("job_name", "status"),
+        "measures": {
+            "runs": ("count", None),
+            "duration": ("sum", "duration_seconds"),
+            "last_started": ("max", "started_at"),
+        },
+        "open": "status = 'running'",
+        "latest": {"key": "job_name", "order": "started_at",
+                   "columns": ("status", "duration_seconds")},
+        "sketch": {"column": "duration_seconds", "level": "day"},
+    },
+}
+
+
+def _version_key(version):
+    return "-".join(str(v) for v in version)
+
+
+def _signature(spec):
+    # A changed definition invalidates what is stored for it
+    return repr((spec["table"], spec["time"], spec["dims"], sorted(spec["measures"].items()),
+                 spec.get("open"), spec.get("latest"), sorted(LEVELS.items()),
+                 spec.get("sketch") and (spec["sketch"], sketches.ALPHA, sketches.MIN_VALUE)))
+
+
+def _count_measure(spec):
+    return next(m for m, (kind, _) in spec["measures"].items() if kind == "count")
+
+
+def _combine(measure, kind):
+    new = f"excluded.{measure}"
+    if kind == "count":
+        return f"{measure} + {new}"
+    if kind == "sum":
+        return (f"CASE WHEN {measure} IS NULL THEN {new} WHEN {new} IS NULL THEN {measure} "
+                f"ELSE {measure} + {new} END")
+    return f"CASE WHEN {new} IS NULL OR {new} <= {measure} THEN {measure} ELSE {new} END"
+
+
+def _create(conn, name, spec):
+    dims = ", ".join(f"{d} TEXT NOT NULL" for d in spec["dims"])
+    measures = ", ".join(spec["measures"])
+    key = ", ".join(spec["dims"])
+    for level in LEVELS:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name}_{level} "
+                     f"(bucket TEXT NOT NULL, {dims}, {measures}, PRIMARY KEY (bucket, {key}))")
+    if spec.get("open"):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name}_open "
+                     f"(rid INTEGER PRIMARY KEY, bucket TEXT NOT NULL, {dims}, {measures})")
+    latest = spec.get("latest")
+    if latest:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name}_latest "
+                     f"({latest['key']} TEXT PRIMARY KEY, rid INTEGER, {latest['order']}, "
+                     f"{', '.join(latest['columns'])})")
+    if spec.get("sketch"):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name}_sketch (bucket TEXT NOT NULL, {dims}, "
+                     f"sketch BLOB NOT NULL, PRIMARY KEY (bucket, {key})) WITHOUT ROWID")
+
+
+def _drop(conn, name):
+    for level in LEVELS:
+        conn.execute(f"DROP TABLE IF EXISTS {name}_{level}")
+    conn.execute(f"DROP TABLE IF EXISTS {name}_open")
+    conn.execute(f"DROP TABLE IF EXISTS {name}_latest")
+    conn.execute(f"DROP TABLE IF EXISTS {name}_sketch")
+
+
+def _sync(conn, name, spec, version):
+    """Fold the attached ``src`` snapshot into rollup ``name``; return rows read."""
+    table, time_col = spec["table"], spec["time"]
+    columns = {row[1] for row in conn.execute(f"PRAGMA src.table_info({table})")}
+    if not columns:
+        raise sqlite3.OperationalError(f"no such table: {table}")
+    dims = spec["dims"]
+    measures = spec["measures"]
+
+    state = conn.execute(
+        "SELECT watermark, fingerprint, signature FROM rollup_state WHERE name = ?", (name,)
+    ).fetchone()
+    watermark, fingerprint, signature = state if state else (0, None, None)
+    if signature != _signature(spec):
+        _drop(conn, name)
+        watermark = 0
+    _create(conn, name, spec)
+
+    high = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM src.{table}").fetchone()[0]
+    if watermark:
+        row = conn.execute(f"SELECT {time_col} FROM src.{table} WHERE rowid = ?",
+                           (watermark,)).fetchone()
+        if high < watermark or row is None or str(row[0]) != fingerprint:
+            log.info("rollup %s: source rewritten below the watermark, rebuilding", name)
+            _drop(conn, name)
+            _create(conn, name, spec)
+            watermark = 0
+
+    def source(col):
+        return col if col in columns else "NULL"
+
+    dim_cols = ", ".join(dims)
+    dim_exprs = ", ".join(f"COALESCE({source(d)}, '')" for d in dims)
+    measure_cols = ", ".join(measures)
+    aggregates = ", ".join(
+        "COUNT(*)" if kind == "count" else f"{kind.upper()}({source(col)})"
+        for kind, col in measures.values()
+    )
+    per_row = ", ".join(
+        "1" if kind == "count" else source(col) for kind, col in measures.values()
+    )
+    group = ", ".join(str(i) for i in range(1, len(dims) + 2))
+    delta = "(rowid > :watermark AND rowid <= :high) OR rowid IN (SELECT rid FROM temp.settle)"
+    bound = {"watermark": watermark, "high": high}
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS settle (rid INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.settle")
+    if spec.get("open"):
+        # Take back what still-open rows contributed; they are re-read below
+        conn.execute(f"INSERT INTO temp.settle SELECT rid FROM {name}_open")
+        retract = [m for m, (kind, _) in measures.items() if kind != "max"]
+        for level, expr in LEVELS.items():
+            conn.execute(
+                f"INSERT INTO {name}_{level} (bucket, {dim_cols}, {', '.join(retract)}) "
+                f"SELECT COALESCE({expr.format(t='bucket')}, ''), {dim_cols}, "
+                f"{', '.join(f'-SUM({m})' for m in retract)} "
+                f"FROM {name}_open WHERE true GROUP BY {group} "
+                f"ON CONFLICT DO UPDATE SET "
+                f"{', '.join(f'{m} = {_combine(m, measures[m][0])}' for m in retract)}"
+            )
+        conn.execute(f"DELETE FROM {name}_open")
+
+    for level, expr in LEVELS.items():
+        conn.execute(
+            f"INSERT INTO {name}_{level} (bucket, {dim_cols}, {measure_cols}) "
+            f"SELECT COALESCE({expr.format(t=time_col)}, ''), {dim_exprs}, {aggregates} "
+            f"FROM src.{table} WHERE {delta} GROUP BY {group} "
+            f"ON CONFLICT DO UPDATE SET "
+            f"{', '.join(f'{m} = {_combine(m, kind)}' for m, (kind, _) in measures.items())}",
+            bound,
+        )
+    if spec.get("open"):
+        conn.execute(
+            f"INSERT INTO {name}_open (rid, bucket, {dim_cols}, {measure_cols}) "
+            f"SELECT rowid, COALESCE({LEVELS['hour'].format(t=time_col)}, ''), "
+            f"{dim_exprs}, {per_row} FROM src.{table} WHERE ({delta}) AND ({spec['open']})",
+            bound,
+        )
+    latest = spec.get("latest")
+    if latest:
+        # Newest row per key in the delta, kept if it is newer than the stored
+        # one; a settled open row replaces itself (same rid). Ties go to the
+        # first row written, as ORDER BY ... DESC LIMIT 1 gives on a table scan.
+        key, order = latest["key"], latest["order"]
+        kept = ", ".join(latest["columns"])
+        newer = (f"COALESCE(excluded.{order}, '') > COALESCE({name}_latest.{order}, '') OR "
+                 f"(COALESCE(excluded.{order}, '') = COALESCE({name}_latest.{order}, '') "
+                 f"AND excluded.rid <= {name}_latest.rid)")
+        conn.execute(
+            f"INSERT INTO {name}_latest ({key}, rid, {order}, {kept}) "
+            f"SELECT {key}, rid, {order}, {kept} FROM ("
+            f"  SELECT COALESCE({key}, '') AS {key}, rowid AS rid, {order}, {kept}, "
+            f"         ROW_NUMBER() OVER (PARTITION BY COALESCE({key}, '') "
+            f"                            ORDER BY {order} DESC, rowid) AS rn "
+            f"  FROM src.{table} WHERE {delta}"
+            f") WHERE rn = 1 "
+            f"ON CONFLICT ({key}) DO UPDATE SET rid = excluded.rid, "
+            f"{order} = excluded.{order}, "
+            f"{', '.join(f'{c} = excluded.{c}' for c in latest['columns'])} "
+            f"WHERE {newer}",
+            bound,
+        )
+
+    sketch = spec.get("sketch")
+    if sketch and sketch["column"] in columns:
+        # An open row's value can still change, so it joins the sketch only
+        # once settled (it is then in the delta through temp.settle) and
+        # never has to be taken back out
+        settled = f"NOT ({spec['open']})" if spec.get("open") else "true"
+        conn.execute(
+            f"INSERT INTO {name}_sketch (bucket, {dim_cols}, sketch) "
+            f"SELECT COALESCE({LEVELS[sketch['level']].format(t=time_col)}, ''), {dim_exprs}, "
+            f"dd_sketch({sketch['column']}) "
+            f"FROM src.{table} WHERE ({delta}) AND {settled} AND {sketch['column']} IS NOT NULL "
+            f"GROUP BY {group} "
+            f"ON CONFLICT DO UPDATE SET sketch = dd_merge(sketch, excluded.sketch)",
+            bound,
+        )
+
+    count = _count_measure(spec)
+    for level in LEVELS:
+        conn.execute(f"DELETE FROM {name}_{level} WHERE {count} <= 0")
+
+    applied = high - watermark + conn.execute("SELECT COUNT(*) FROM temp.settle").fetchone()[0]
+    row = conn.execute(f"SELECT {time_col} FROM src.{table} WHERE rowid = ?", (high,)).fetchone()
+    conn.execute(
+        "INSERT OR REPLACE INTO rollup_state "
+        "(name, version, watermark, fingerprint, signature, synced_at, applied) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (name, _version_key(version), high, str(row[0]) if row else None,
+         _signature(spec), time.time(), applied),
+    )
+    return applied
+
+
+class RollupManager:
+    """Keeps the store in step with the snapshots and answers reads from it."""
+
+    def __init__(self):
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._local = threading.local()
+        watcher.subscribe(self._on_change)
+
+    @property
+    def path(self):
+        return os.path.join(Config.ROLLUP_DIR, "rollups.db")
+
+    def _on_change(self, db_name, old, new):
+        for name, spec in ROLLUPS.items():
+            if spec["db"] == db_name and new is not None:
+                self._request(name)
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pending.clear()
+                self._queue = queue.Queue()
+                threading.Thread(target=self._loop, name="rollup-sync", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _request(self, name):
+        if not Config.ROLLUPS:
+            return
+        self._ensure_thread()
+        with self._lock:
+            if name in self._pending:
+                return
+            self._pending.add(name)
+        self._queue.put(name)
+
+    def _loop(self):
+        while True:
+            name = self._queue.get()
+            with self._lock:
+                self._pending.discard(name)
+            try:
+                self.sync(name)
+            except Exception:
+                log.exception("rollup %s sync failed; serving raw queries", name)
+
+    def _open_store(self):
+        conn = sqlite3.connect(f"file:{self.path}", uri=True, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rollup_state (name TEXT PRIMARY KEY, version TEXT, "
+            "watermark INTEGER, fingerprint TEXT, signature TEXT, synced_at REAL, applied INTEGER)"
+        )
+        return conn
+
+    def sync(self, name):
+        """Bring rollup ``name`` up to the served snapshot; return rows read, or None."""
+        spec = ROLLUPS[name]
+        version = snapshot_version(spec["db"])
+        if version is None:
+            return None
+        os.makedirs(Config.ROLLUP_DIR, exist_ok=True)
+        with open(os.path.join(Config.ROLLUP_DIR, "rollups.lock"), "w") as lock:
+            # One worker syncs; the others find the state current afterwards
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            conn = self._open_store()
+            sketches.register(conn)
+            try:
+                row = conn.execute("SELECT version FROM rollup_state WHERE name = ?",
+                                   (name,)).fetchone()
+                if row is not None and row[0] == _version_key(version):
+                    return 0
+                path = sidecars.file_for(spec["db"], version)
+                conn.execute("ATTACH DATABASE ? AS src",
+                             (f"file:{path}?mode=ro&nolock=1&immutable=1",))
+                start = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    applied = _sync(conn, name, spec, version)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                log.info("rollup %s synced %d rows in %.0f ms", name, applied,
+                         (time.perf_counter() - start) * 1000)
+                return applied
+            finally:
+                conn.close()
+
+    def _reader(self, name, path):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        entry = conns.get(name)
+        stamp = (self.path, path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        if entry is not None:
+            entry[1].close()
+            del conns[name]
+        if not os.path.exists(self.path):
+            return None
+        conn = sqlite3.connect(f"file:{self.path}", uri=True, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{path}?mode=ro&nolock=1&immutable=1",))
+        conns[name] = (stamp, conn)
+        return conn
+
+    def query(self, name, sql, params=(), one=False):
+        """Run ``sql`` against rollup ``name`` if it matches the served snapshot.
+
+        Returns a list of dicts (a dict with ``one``), or None when rollups
+        are disabled or behind -- the caller should then run its raw query.
+        """
+        if not Config.ROLLUPS:
+            return None
+        spec = ROLLUPS[name]
+        version = snapshot_version(spec["db"])
+        if version is None:
+            return None
+        conn = self._reader(name, sidecars.file_for(spec["db"], version))
+        if conn is None:
+            self._request(name)
+            return None
+        func = metrics.caller_name()
+        start = time.perf_counter()
+        try:
+            # The state and the buckets are read in one transaction
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute("SELECT version FROM rollup_state WHERE name = ?",
+                                   (name,)).fetchone()
+                if row is None or row[0] != _version_key(version):
+                    self._request(name)
+                    return None
+                rows = [dict(r) for r in conn.execute(sql, params)]
+            finally:
+                conn.execute("COMMIT")
+        except sqlite3.Error:
+            metrics.query_error("rollups", func)
+            raise
+        metrics.observe_query("rollups", func, time.perf_counter() - start, len(rows))
+        if one:
+            return rows[0] if rows else {}
+        return rows
+
+    def state(self):
+        """Return each rollup's sync state, for /admin."""
+        if not os.path.exists(self.path):
+            return {}
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT name, version, watermark, synced_at, applied FROM rollup_state"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            name: {"version": v, "watermark": w, "synced_at": s, "applied": a,
+                   "current": v == _version_key(snapshot_version(ROLLUPS[name]["db"]) or ())}
+            for name, v, w, s, a in rows if name in ROLLUPS
+        }
+
+
+rollups = RollupManager()
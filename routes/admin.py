@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify
+
+from db import cache_stats, slow_queries
+from rollups import rollups
+from watcher import watcher
+
+bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+@bp.route("/cache")
+def cache():
+    """Query result cache counters for the worker that served this request."""
+    return jsonify(cache_stats())
+
+
+@bp.route("/slow-queries")
+def slow_query_log():
+    """Statements over SLOW_QUERY_MS on this worker, with their query plans."""
+    return jsonify(slow_queries())
+
+
+@bp.route("/watcher")
+def data_watcher():
+    """Data directory versions as seen by this worker's watcher."""
+    return jsonify(watcher.state())
+
+
+@bp.route("/rollups")
+def rollup_state():
+    """Watermark and snapshot of each incremental rollup."""
+    return jsonify(rollups.state())
@@ -1,34 +1,74 @@
-from flask import Blueprint, jsonify
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, Response, jsonify, request
 
 from queries.cron_health import job_duration_history
-from queries.cost_tracking import daily_spend, model_breakdown, skill_breakdown
+from queries.cost_forecast import spend_forecast
+from queries.cost_tracking import (
+    CUBE_MEASURES,
+    cost_summary,
+    daily_spend,
+    model_breakdown,
+    skill_breakdown,
+    usage_cube,
+)
+from queries.downsample import chart_points
+from queries.timewindow import utcnow
 from queries.content_pipeline import publishing_pace_weekly
+from columnar import MEDIA_TYPE, encode
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 
 
+def _chart(payload):
+    """JSON, or the binary columnar format for clients that prefer it (Accept)."""
+    best = request.accept_mimetypes.best_match(("application/json", MEDIA_TYPE))
+    if best == MEDIA_TYPE:
+        resp = Response(encode(payload), mimetype=MEDIA_TYPE)
+    else:
+        resp = jsonify(payload)
+    resp.vary.add("Accept")
+    return resp
+
+
+def _points():
+    """``?points=N``: how far to downsample a time series (0 for every point)."""
+    return chart_points(request.args.get("points", type=int))
+
+
+def _series(rows, label, value, digits=None):
+    """Labels and values of a downsampled series, with ``min``/``max`` envelopes."""
+    def column(key):
+        values = [r[key] for r in rows]
+        if digits is None:
+            return values
+        return [None if v is None else round(v, digits) for v in values]
+
+    return {
+        "labels": [r[label] for r in rows],
+        "values": column(value),
+        "min": column(f"{value}_min"),
+        "max": column(f"{value}_max"),
+    }
+
+
 @bp.route("/cron/<job_name>/duration")
 def cron_duration(job_name):
-    data = job_duration_history(job_name)
-    return jsonify({
-        "labels": [r["started_at"] for r in data],
-        "values": [r["duration_seconds"] for r in data],
-    })
+    """Run durations over 14 days, downsampled to ``?points=N``."""
+    data = job_duration_history(job_name, points=_points())
+    return _chart(_series(data, "started_at", "duration_seconds"))
 
 
 @bp.route("/costs/daily")
 def costs_daily():
-    data = daily_spend()
-    return jsonify({
-        "labels": [r["day"] for r in data],
-        "values": [round(r["total_cost"], 4) for r in data],
-    })
+    """Daily spend over 30 days, downsampled to ``?points=N``."""
+    return _chart(_series(daily_spend(points=_points()), "day", "total_cost", 4))
 
 
 @bp.route("/costs/models")
 def costs_models():
     data = model_breakdown()
-    return jsonify({
+    return _chart({
         "labels": [r["model"] for r in data],
         "values": [round(r["total_cost"], 4) for r in data],
         "counts": [r["call_count"] for r in data],
@@ -38,17 +78,101 @@ def costs_models():
 @bp.route("/costs/skills")
 def costs_skills():
     data = skill_breakdown()
-    return jsonify({
+    return _chart({
         "labels": [r["skill"] for r in data],
         "values": [round(r["total_cost"], 4) for r in data],
         "counts": [r["call_count"] for r in data],
     })
 
 
+@bp.route("/costs/summary")
+def costs_summary():
+    """Everything the cost page charts, from one scan: ``?days=N`` (default 30).
+
+    The daily series is downsampled to ``?points=N``.
+    """
+    days = min(max(request.args.get("days", 30, type=int), 1), 3660)
+    data = cost_summary(days, points=_points())
+
+    def chart(rows, label):
+        return {
+            "labels": [r[label] for r in rows],
+            "values": [round(r["total_cost"], 4) for r in rows],
+            "counts": [r["call_count"] for r in rows],
+        }
+
+    return _chart({
+        "days": days,
+        "daily": _series(data["daily"], "day", "total_cost", 4),
+        "models": chart(data["models"], "model"),
+        "skills": chart(data["skills"], "skill"),
+        "month_to_date": round(data["month_total"], 4),
+        "projection": data["projection"],
+    })
+
+
+def _utc(value):
+    t = datetime.fromisoformat(value)
+    return t.astimezone(timezone.utc).replace(tzinfo=None) if t.tzinfo else t
+
+
+@bp.route("/costs/cube")
+def costs_cube():
+    """Usage measures for any range and granularity, from the rollups.
+
+    ``?start=&end=`` (ISO dates or datetimes, UTC; default the last 30
+    days), ``granularity=hour|day|week|month`` (default day), optional
+    ``model=``/``skill=`` filters and ``by=model|skill`` to split series.
+    """
+    args = request.args
+    try:
+        end = _utc(args["end"]) if args.get("end") else utcnow()
+        start = _utc(args["start"]) if args.get("start") else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO dates or datetimes"}), 400
+    granularity = args.get("granularity", "day")
+    if granularity == "hour" and end - start > timedelta(days=93):
+        return jsonify({"error": "hourly ranges are limited to 93 days"}), 400
+    by = args.get("by") or None
+    try:
+        rows = usage_cube(start, end, granularity, model=args.get("model") or None,
+                          skill=args.get("skill") or None, by=by)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    labels = sorted({r["period"] for r in rows})
+    index = {label: i for i, label in enumerate(labels)}
+    series = {}
+    for r in rows:
+        name = r[by] if by else "total"
+        values = series.setdefault(name, {m: [0] * len(labels) for m in CUBE_MEASURES})
+        for m in CUBE_MEASURES:
+            value = r[m] or 0
+            values[m][index[r["period"]]] = round(value, 4) if m == "cost" else value
+    return _chart({
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "labels": labels,
+        "series": series,
+    })
+
+
+@bp.route("/costs/forecast")
+def costs_forecast():
+    """Daily spend forecast with 95% bands: ``?by=model|skill&days=N`` (default model, 30)."""
+    try:
+        data = spend_forecast(request.args.get("by", "model"),
+                              request.args.get("days", 30, type=int))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return _chart(data)
+
+
 @bp.route("/content/pace")
 def content_pace():
     data = publishing_pace_weekly()
-    return jsonify({
+    return _chart({
         "labels": [r["week"] for r in data],
         "values": [r["count"] for r in data],
     })
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template
 
 from queries.cron_health import (
     all_jobs_summary,
+    duration_percentiles,
     stale_jobs,
     job_runs,
     total_jobs_count,
@@ -16,6 +17,7 @@ def cron_index():
         "cron_health.html",
         active_page="cron",
         jobs=all_jobs_summary(),
+        percentiles=duration_percentiles(),
         stale=stale_jobs(),
         total_jobs=total_jobs_count(),
     )
@@ -28,4 +30,5 @@ def cron_detail(job_name):
         active_page="cron",
         job_name=job_name,
         runs=job_runs(job_name),
+        percentiles=duration_percentiles(job_name).get(job_name),
     )
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template
+from flask import Blueprint
 
 from queries.knowledge_base import (
     sources_by_type,
@@ -7,13 +7,14 @@ from queries.knowledge_base import (
     total_stats,
     acquisition_recent,
 )
+from streaming import stream_page
 
 bp = Blueprint("knowledge_base", __name__)
 
 
 @bp.route("/kb")
 def kb_index():
-    return render_template(
+    return stream_page(
         "knowledge_base.html",
         active_page="kb",
         by_type=sources_by_type(),
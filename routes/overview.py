@@ -1,38 +1,38 @@
-from flask import Blueprint, render_template
-
-from queries.overview import (
-    cron_success_rate_24h,
-    todays_cost,
-    content_pipeline_counts,
-    kb_stats,
-    latest_briefing,
-    high_match_jobs,
-    youtube_trending,
-    twitter_trending,
-    chores_today,
-    meal_plan_status,
-    active_projects,
-    crm_summary,
-)
+import time
+from types import MappingProxyType
+
+from flask import Blueprint, make_response, render_template
+
+from queries.overview import TILES
+from snapshot import SnapshotRefresher
+from tiles import TileResult, TileRunner
 
 bp = Blueprint("overview", __name__)
 
+_tiles = TileRunner(TILES)
+
+
+def _build():
+    result = _tiles.run()
+    return TileResult(MappingProxyType(result.values), result.status, result.timings)
+
+
+# A tile that missed its deadline is retried on the next poll, not the next TTL
+_snapshot = SnapshotRefresher(_build, needs_refresh=lambda result: bool(result.stale))
+
 
 @bp.route("/")
 def index():
-    return render_template(
+    snap = _snapshot.current()
+    result = snap.value
+    resp = make_response(render_template(
         "overview.html",
         active_page="overview",
-        cron=cron_success_rate_24h(),
-        cost=todays_cost(),
-        content=content_pipeline_counts(),
-        kb=kb_stats(),
-        briefing=latest_briefing(),
-        jobs=high_match_jobs(),
-        youtube=youtube_trending(),
-        twitter=twitter_trending(),
-        chores=chores_today(),
-        meal=meal_plan_status(),
-        projects=active_projects(),
-        crm=crm_summary(),
+        stale_tiles=result.stale,
+        **result.values,
+    ))
+    age = time.time() - snap.built_at
+    resp.headers["Server-Timing"] = (
+        f'snapshot;dur=0;desc="age {age:.0f}s", {result.server_timing()}'
     )
+    return resp
@@ -0,0 +1,176 @@
+"""Compact row shapes for large query results.
+
+query_db turns every row into a dict, which for a wide table is most of
+the memory a result takes: a dict per row holds its own hash table of the
+column names. The shapes here share the column names per result instead
+and keep only the values per row:
+
+* "record" -- an instance of a ``__slots__`` class generated per column set;
+* "tuple"  -- a named-tuple subclass generated per column set;
+* "columns" -- a Columns object, one list per column, rows built on demand.
+
+Record and tuple rows answer ``row.name`` (what Jinja tries first),
+``row["name"]``, ``row.get("name")`` and ``keys()``, so ``dict(row)`` and
+the existing templates work unchanged. Column sets whose names aren't
+identifiers, repeat, or clash with that API fall back to dicts.
+
+Compact results are shared, not copied, by the result cache and the
+request memo: treat them as read-only.
+"""
+
+import collections
+import functools
+import keyword
+
+SHAPES = ("dict", "record", "tuple", "columns")
+_RESERVED = {"keys", "get", "items", "values"}
+
+
+def compact(columns):
+    """True if ``columns`` can name the fields of a record or tuple row."""
+    return len(set(columns)) == len(columns) and all(
+        c.isidentifier() and not keyword.iskeyword(c) and not c.startswith("_")
+        and c not in _RESERVED for c in columns
+    )
+
+
+class _Fields:
+    """Mapping-style access for rows whose values are attributes."""
+
+    __slots__ = ()
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return [getattr(self, f) for f in self._fields]
+
+    def items(self):
+        return [(f, getattr(self, f)) for f in self._fields]
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._fields else default
+
+    def __contains__(self, key):
+        return key in self._fields
+
+
+class _Record(_Fields):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            key = self._fields[key]
+        elif key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        return dict(self.items()) == (dict(other.items()) if hasattr(other, "items") else other)
+
+    def __repr__(self):
+        return f"Record({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+
+class _TupleRow(_Fields):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+
+@functools.lru_cache(maxsize=256)
+def record_type(columns):
+    """The ``__slots__`` class for rows with ``columns``, built once per column set."""
+    args = ", ".join(columns)
+    body = "".join(f"\n    self.{c} = {c}" for c in columns) or "\n    pass"
+    namespace = {"__slots__": columns, "_fields": columns}
+    # A generated __init__, as namedtuple does, beats a setattr loop per row
+    exec(f"def __init__(self, {args}):{body}", namespace)
+    return type("Record", (_Record,), namespace)
+
+
+@functools.lru_cache(maxsize=256)
+def tuple_type(columns):
+    """The named-tuple class for rows with ``columns``, built once per column set."""
+    base = collections.namedtuple("Row", columns)
+    return type("Row", (_TupleRow, base), {"__slots__": ()})
+
+
+class Columns:
+    """A result as one list per column; iterating yields tuple rows.
+
+    ``column(name)`` hands out a column list directly, which is what chart
+    payloads want. Rows are built on demand (as dicts if the names can't
+    be fields), so iterating twice builds them twice.
+    """
+
+    __slots__ = ("names", "data", "_row")
+
+    def __init__(self, names, data):
+        self.names = names
+        self.data = data
+        if compact(names):
+            self._row = tuple_type(names)._make
+        else:
+            self._row = lambda values: dict(zip(names, values))
+
+    def column(self, name):
+        return self.data[self.names.index(name)]
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return map(self._row, zip(*self.data))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(r) for r in zip(*(c[index] for c in self.data))]
+        return self._row(tuple(c[index] for c in self.data))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"Columns({', '.join(self.names)}; {len(self)} rows)"
+
+
+def build(shape, columns, tuples):
+    """Rows of ``shape`` from a cursor's column names and value tuples."""
+    if shape not in SHAPES:
+        raise ValueError(f"shape must be one of {', '.join(SHAPES)}")
+    if shape == "columns":
+        data = [list(c) for c in zip(*tuples)] if tuples else [[] for _ in columns]
+        return Columns(columns, data)
+    if shape == "dict" or not compact(columns):
+        return [dict(zip(columns, t)) for t in tuples]
+    if shape == "record":
+        cls = record_type(columns)
+        return [cls(*t) for t in tuples]
+    return list(map(tuple_type(columns)._make, tuples))
+
+
+def row_maker(shape, columns):
+    """A function turning one value tuple into a row, for streaming (no "columns")."""
+    if shape == "dict" or not compact(columns):
+        return lambda t: dict(zip(columns, t))
+    if shape == "record":
+        cls = record_type(columns)
+        return lambda t: cls(*t)
+    if shape == "tuple":
+        return tuple_type(columns)._make
+    raise ValueError("query_iter shape must be dict, record or tuple")
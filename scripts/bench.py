@@ -0,0 +1,1952 @@
+#!/usr/bin/env python3
+"""Local benchmarks for the dashboard against synthetic SQLite snapshots.
+
+Builds a throwaway copy of every database in Config.DATABASES with realistic
+schemas, points DB_BASE_PATH at it and times page renders through the Flask
+test client. Nothing here touches the NAS mount.
+
+Usage:
+    python scripts/bench.py connections [--scale N] [--requests N]
+    python scripts/bench.py cache [--scale N] [--requests N]
+    python scripts/bench.py pages [--scale N] [--requests N] [--no-cache] [PATH ...]
+    python scripts/bench.py empty
+    python scripts/bench.py sidecar [--scale N] [--requests N]
+    python scripts/bench.py windows [--scale N] [--rows N]
+    python scripts/bench.py rollups [--scale N] [--rows N] [--append N]
+    python scripts/bench.py cronjobs [--jobs N] [--days N ...] [--interval S]
+    python scripts/bench.py sketches [--jobs N] [--days N] [--interval S] [--append N]
+    python scripts/bench.py cube [--rows N] [--checks N]
+    python scripts/bench.py forecast [--series N] [--rows N]
+    python scripts/bench.py streaming [--rows N]
+    python scripts/bench.py shapes [--rows N]
+    python scripts/bench.py columnar [--interval S]
+    python scripts/bench.py downsample [--interval S] [--points N]
+    python scripts/bench.py k8s [--items N] [--requests N]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMAS = {
+    "cron_log": """
+        CREATE TABLE cron_runs (
+            id INTEGER PRIMARY KEY, job_name TEXT, started_at TEXT, status TEXT,
+            duration_seconds REAL, error_message TEXT
+        );
+    """,
+    "usage_tracking": """
+        CREATE TABLE usage_log (
+            id INTEGER PRIMARY KEY, timestamp TEXT, model TEXT, skill TEXT,
+            cost_usd REAL, input_tokens INTEGER, output_tokens INTEGER
+        );
+        CREATE TABLE cost_alerts (
+            id INTEGER PRIMARY KEY, alert_type TEXT, threshold_usd REAL,
+            current_value_usd REAL, triggered_at TEXT, acknowledged INTEGER,
+            created_at TEXT
+        );
+    """,
+    "content_ideas": """
+        CREATE TABLE content_ideas (
+            id INTEGER PRIMARY KEY, title TEXT, status TEXT, post_type TEXT,
+            source_type TEXT, created_at TEXT, updated_at TEXT, duplicate_of INTEGER
+        );
+        CREATE TABLE project_registry (
+            id INTEGER PRIMARY KEY, name TEXT, github_repo TEXT, live_url TEXT,
+            domains TEXT, demonstrates TEXT, stack TEXT, last_commit_sha TEXT,
+            last_commit_date TEXT, total_showcases INTEGER, updated_at TEXT
+        );
+        CREATE TABLE project_milestones (id INTEGER PRIMARY KEY, project_id INTEGER);
+    """,
+    "knowledge_base": """
+        CREATE TABLE sources (
+            id INTEGER PRIMARY KEY, title TEXT, source_type TEXT, url TEXT,
+            summary TEXT, created_at TEXT
+        );
+        CREATE TABLE chunks (id INTEGER PRIMARY KEY, source_id INTEGER, content TEXT);
+        CREATE TABLE acquisition_metadata (
+            id INTEGER PRIMARY KEY, source_id INTEGER, scan_source TEXT,
+            discovery_date TEXT, created_at TEXT
+        );
+    """,
+    "job_market": """
+        CREATE TABLE job_scores (
+            id INTEGER PRIMARY KEY, job_title TEXT, company TEXT, location TEXT,
+            work_type TEXT, experience_level TEXT, match_score INTEGER,
+            skill_match INTEGER, experience_match INTEGER, opportunity_quality INTEGER,
+            portfolio_alignment INTEGER, related_projects TEXT, alert_status TEXT,
+            email_date TEXT, created_at TEXT
+        );
+        CREATE TABLE market_trends (
+            week_start TEXT, total_jobs_scanned INTEGER, new_jobs_this_week INTEGER,
+            avg_match_score REAL, high_matches INTEGER, medium_matches INTEGER,
+            top_skills TEXT, top_companies TEXT, top_locations TEXT,
+            avg_compensation_min REAL, avg_compensation_max REAL
+        );
+    """,
+    "youtube_channels": """
+        CREATE TABLE phrases (
+            id INTEGER PRIMARY KEY, phrase TEXT, category TEXT, occurrence_count INTEGER,
+            trending INTEGER, first_seen_channel TEXT, first_seen_date TEXT, created_at TEXT
+        );
+        CREATE TABLE channels (
+            id INTEGER PRIMARY KEY, name TEXT, category TEXT, domain_tags TEXT,
+            active INTEGER, last_scan_date TEXT, total_videos_tracked INTEGER
+        );
+        CREATE TABLE videos (
+            id INTEGER PRIMARY KEY, title TEXT, channel_name TEXT, upload_date TEXT,
+            view_count INTEGER, content_flag INTEGER, domain_tags TEXT,
+            video_url TEXT, created_at TEXT
+        );
+    """,
+    "briefings": """
+        CREATE TABLE briefings (
+            id INTEGER PRIMARY KEY, date TEXT, momentum_weekly INTEGER,
+            momentum_monthly INTEGER, theme TEXT, content TEXT, estimated_cost REAL,
+            created_at TEXT
+        );
+        CREATE TABLE signals (
+            id INTEGER PRIMARY KEY, briefing_id INTEGER, source TEXT,
+            signal_name TEXT, value TEXT, direction TEXT, category TEXT
+        );
+    """,
+    "projecthub": """
+        CREATE TABLE projects (
+            id INTEGER PRIMARY KEY, name TEXT, classification TEXT, status TEXT,
+            health_score INTEGER, progress_percentage INTEGER, tech_stack TEXT,
+            updated_at TEXT, description TEXT, last_commit_date TEXT,
+            open_pr_count INTEGER, commits_this_week INTEGER, archived_at TEXT
+        );
+        CREATE TABLE milestones (
+            id INTEGER PRIMARY KEY, project_id INTEGER, title TEXT,
+            target_date TEXT, completed_date TEXT, status TEXT
+        );
+        CREATE TABLE time_entries (
+            id INTEGER PRIMARY KEY, project_id INTEGER, description TEXT,
+            hours REAL, date TEXT
+        );
+        CREATE TABLE github_activity (
+            id INTEGER PRIMARY KEY, github_repo TEXT, project_id INTEGER,
+            event_type TEXT, title TEXT, author TEXT, event_date TEXT, url TEXT,
+            branch TEXT
+        );
+    """,
+    "twitter_trends": """
+        CREATE TABLE accounts (
+            id INTEGER PRIMARY KEY, handle TEXT, display_name TEXT, category TEXT,
+            domain_tags TEXT, active INTEGER, last_scan_date TEXT,
+            total_tweets_tracked INTEGER
+        );
+        CREATE TABLE tweets (
+            id INTEGER PRIMARY KEY, account_id INTEGER, text TEXT, content_angle TEXT,
+            likes INTEGER, retweets INTEGER, domain_tags TEXT, posted_at TEXT,
+            tweet_url TEXT, content_flag INTEGER, created_at TEXT
+        );
+        CREATE TABLE themes (
+            id INTEGER PRIMARY KEY, name TEXT, description TEXT, mention_count INTEGER,
+            unique_accounts INTEGER, velocity REAL, acceleration REAL, status TEXT,
+            first_seen_date TEXT, updated_at TEXT
+        );
+        CREATE TABLE cross_source_themes (
+            id INTEGER PRIMARY KEY, theme_name TEXT, twitter_count INTEGER,
+            youtube_count INTEGER, kb_count INTEGER, source_types TEXT,
+            correlation_score REAL, first_detected TEXT, last_updated TEXT
+        );
+        CREATE TABLE theme_history (
+            id INTEGER PRIMARY KEY, theme_id INTEGER, date TEXT, velocity REAL,
+            mention_count INTEGER
+        );
+    """,
+    "chore_schedule": """
+        CREATE TABLE kids (id INTEGER PRIMARY KEY, name TEXT, active INTEGER);
+        CREATE TABLE chores (
+            id INTEGER PRIMARY KEY, name TEXT, difficulty TEXT, active INTEGER
+        );
+        CREATE TABLE assignments (
+            id INTEGER PRIMARY KEY, kid_id INTEGER, chore_id INTEGER,
+            assigned_date TEXT, status TEXT, completed_at TEXT
+        );
+    """,
+    "meal_planning": """
+        CREATE TABLE recipes (
+            id INTEGER PRIMARY KEY, name TEXT, meal_type TEXT, rating INTEGER,
+            times_made INTEGER, prep_time_min INTEGER
+        );
+        CREATE TABLE meal_plans (id INTEGER PRIMARY KEY, week_start TEXT, status TEXT);
+        CREATE TABLE planned_meals (
+            id INTEGER PRIMARY KEY, plan_id INTEGER, recipe_id INTEGER,
+            freetext_meal TEXT, meal_type TEXT, day_of_week INTEGER, notes TEXT
+        );
+        CREATE TABLE preferences (id INTEGER PRIMARY KEY, active INTEGER);
+    """,
+    "crm": """
+        CREATE TABLE contacts (
+            id INTEGER PRIMARY KEY, firstname TEXT, lastname TEXT,
+            company_name TEXT, job_title TEXT, email TEXT
+        );
+        CREATE TABLE companies (
+            id INTEGER PRIMARY KEY, name TEXT, industry TEXT, num_employees INTEGER,
+            domain TEXT, research_summary TEXT, research_date TEXT
+        );
+        CREATE TABLE deals (
+            id INTEGER PRIMARY KEY, deal_name TEXT, deal_stage TEXT, amount REAL,
+            close_date TEXT, deal_type TEXT, contact_id INTEGER, company_id INTEGER
+        );
+        CREATE TABLE relationship_scores (
+            id INTEGER PRIMARY KEY, contact_id INTEGER, total_score INTEGER,
+            engagement INTEGER, strategic_fit INTEGER, opportunity_potential INTEGER,
+            network_value INTEGER, days_since_contact INTEGER, nudge_status TEXT
+        );
+        CREATE TABLE follow_up_drafts (
+            id INTEGER PRIMARY KEY, contact_id INTEGER, draft_subject TEXT,
+            draft_status TEXT, context_summary TEXT, created_at TEXT
+        );
+        CREATE TABLE sync_log (
+            id INTEGER PRIMARY KEY, sync_type TEXT, records_fetched INTEGER,
+            records_created INTEGER, records_updated INTEGER, status TEXT,
+            error_message TEXT, started_at TEXT, completed_at TEXT
+        );
+    """,
+    "github_repos": """
+        CREATE TABLE repos (
+            id INTEGER PRIMARY KEY, url TEXT, owner TEXT, name TEXT,
+            description TEXT, reason TEXT, tags TEXT, priority TEXT, status TEXT,
+            added_date TEXT, updated_at TEXT, created_at TEXT
+        );
+    """,
+}
+
+MODELS = ["claude-sonnet", "claude-haiku", "gpt-4o", "gpt-4o-mini", "llama3"]
+SKILLS = ["briefing", "crm", "content", "jobs", "twitter", "youtube", "kb", "chores"]
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _fill(name, conn, scale, rnd, now):
+    """Insert ``scale``-proportional synthetic rows into one database."""
+    ago = lambda **kw: _ts(now - timedelta(**kw))  # noqa: E731
+    if name == "cron_log":
+        rows = []
+        for i in range(scale * 20):
+            status = rnd.choices(["success", "failure", "running"], [90, 8, 2])[0]
+            rows.append((f"job_{i % 25}", ago(minutes=rnd.randint(0, 60 * 24 * 30)),
+                         status, rnd.uniform(1, 300), "boom" if status == "failure" else None))
+        conn.executemany("INSERT INTO cron_runs (job_name, started_at, status, "
+                         "duration_seconds, error_message) VALUES (?,?,?,?,?)", rows)
+    elif name == "usage_tracking":
+        conn.executemany(
+            "INSERT INTO usage_log (timestamp, model, skill, cost_usd, input_tokens, "
+            "output_tokens) VALUES (?,?,?,?,?,?)",
+            ((ago(minutes=rnd.randint(0, 60 * 24 * 45)), rnd.choice(MODELS),
+              rnd.choice(SKILLS), rnd.uniform(0.0001, 0.05), rnd.randint(100, 9000),
+              rnd.randint(50, 2000)) for _ in range(scale * 50)))
+        conn.executemany(
+            "INSERT INTO cost_alerts (alert_type, threshold_usd, current_value_usd, "
+            "triggered_at, acknowledged, created_at) VALUES (?,?,?,?,?,?)",
+            (("daily", 1.0, 1.5, ago(days=d), d % 2, ago(days=d)) for d in range(6)))
+    elif name == "content_ideas":
+        conn.executemany(
+            "INSERT INTO content_ideas (title, status, post_type, source_type, "
+            "created_at, updated_at, duplicate_of) VALUES (?,?,?,?,?,?,?)",
+            ((f"Idea {i}", rnd.choice(["pitched", "approved", "drafted", "published"]),
+              rnd.choice(["thread", "post", "article"]), "kb", ago(days=rnd.randint(0, 90)),
+              ago(days=rnd.randint(0, 60)), None if i % 10 else 1) for i in range(scale * 2)))
+        conn.executemany(
+            "INSERT INTO project_registry (name, github_repo, updated_at) VALUES (?,?,?)",
+            ((f"repo-{i}", f"me/repo-{i}", ago(days=i)) for i in range(20)))
+        conn.executemany("INSERT INTO project_milestones (project_id) VALUES (?)",
+                         ((rnd.randint(1, 20),) for _ in range(60)))
+    elif name == "knowledge_base":
+        conn.executemany(
+            "INSERT INTO sources (title, source_type, url, summary, created_at) VALUES (?,?,?,?,?)",
+            ((f"Source {i}", rnd.choice(["article", "video", "paper", "tweet"]),
+              f"https://example.com/{i}", "summary " * 40, ago(minutes=i))
+             for i in range(scale * 5)))
+        conn.executemany("INSERT INTO chunks (source_id, content) VALUES (?,?)",
+                         ((rnd.randint(1, scale * 5), "chunk") for _ in range(scale * 40)))
+        conn.executemany(
+            "INSERT INTO acquisition_metadata (source_id, scan_source, discovery_date, "
+            "created_at) VALUES (?,?,?,?)",
+            ((i + 1, "rss", ago(days=i), ago(days=i)) for i in range(50)))
+    elif name == "job_market":
+        conn.executemany(
+            "INSERT INTO job_scores (job_title, company, location, match_score, "
+            "alert_status, created_at) VALUES (?,?,?,?,?,?)",
+            ((f"Engineer {i}", f"Co {i % 40}", "Remote", rnd.randint(20, 100),
+              rnd.choice(["new", "sent", "applied"]), ago(days=rnd.randint(0, 30)))
+             for i in range(scale * 3)))
+        conn.executemany(
+            "INSERT INTO market_trends (week_start, total_jobs_scanned, top_skills) VALUES (?,?,?)",
+            ((ago(weeks=w)[:10], 100 + w, '[["python", 12], ["sql", 7]]') for w in range(12)))
+    elif name == "youtube_channels":
+        conn.executemany(
+            "INSERT INTO phrases (phrase, category, occurrence_count, trending, created_at) "
+            "VALUES (?,?,?,?,?)",
+            ((f"phrase {i}", rnd.choice(["ai", "energy"]), rnd.randint(1, 50), i % 7 == 0,
+              ago(days=rnd.randint(0, 20))) for i in range(scale * 2)))
+        conn.executemany("INSERT INTO channels (name, category, active) VALUES (?,?,1)",
+                         ((f"Channel {i}", "ai") for i in range(30)))
+        conn.executemany(
+            "INSERT INTO videos (title, channel_name, created_at) VALUES (?,?,?)",
+            ((f"Video {i}", f"Channel {i % 30}", ago(hours=i)) for i in range(scale)))
+    elif name == "briefings":
+        conn.executemany(
+            "INSERT INTO briefings (date, momentum_weekly, theme, content, created_at) "
+            "VALUES (?,?,?,?,?)",
+            ((ago(days=d)[:10], rnd.randint(20, 95), f"Theme {d}", "content", ago(days=d))
+             for d in range(60)))
+        conn.executemany(
+            "INSERT INTO signals (briefing_id, source, signal_name, value, direction, "
+            "category) VALUES (?,?,?,?,?,?)",
+            ((rnd.randint(1, 60), "src", f"sig {i}", "1", "up", rnd.choice(["ai", "jobs"]))
+             for i in range(600)))
+    elif name == "projecthub":
+        conn.executemany(
+            "INSERT INTO projects (name, status, updated_at, commits_this_week) VALUES (?,?,?,?)",
+            ((f"Project {i}", rnd.choice(["active", "on_hold", "completed"]), ago(days=i),
+              rnd.randint(0, 20)) for i in range(40)))
+        conn.executemany(
+            "INSERT INTO milestones (project_id, title, target_date, completed_date) "
+            "VALUES (?,?,?,?)",
+            ((rnd.randint(1, 40), f"M{i}", ago(days=rnd.randint(-30, 30))[:10],
+              None if i % 3 else ago(days=1)) for i in range(120)))
+        conn.executemany(
+            "INSERT INTO time_entries (project_id, description, hours, date) VALUES (?,?,?,?)",
+            ((rnd.randint(1, 40), "work", rnd.uniform(0.5, 4), ago(days=rnd.randint(0, 30))[:10])
+             for _ in range(300)))
+        conn.executemany(
+            "INSERT INTO github_activity (github_repo, project_id, event_type, title, "
+            "author, event_date, url) VALUES (?,?,?,?,?,?,?)",
+            ((f"me/repo-{i % 30}", i % 40 + 1,
+              rnd.choices(["commit", "pr_opened", "pr_merged"], [90, 4, 6])[0],
+              f"Change {i}", "me", ago(minutes=rnd.randint(0, 60 * 24 * 90)), "https://x")
+             for i in range(scale * 10)))
+    elif name == "twitter_trends":
+        conn.executemany(
+            "INSERT INTO accounts (handle, category, active, total_tweets_tracked) VALUES (?,?,?,?)",
+            ((f"user{i}", rnd.choice(["ai-leaders", "data-mlops"]), i % 9 != 0, rnd.randint(0, 900))
+             for i in range(scale)))
+        conn.executemany(
+            "INSERT INTO tweets (account_id, text, likes, retweets, content_flag, created_at) "
+            "VALUES (?,?,?,?,?,?)",
+            ((rnd.randint(1, scale), f"tweet {i}", rnd.randint(0, 500), rnd.randint(0, 90),
+              int(i % 20 == 0), ago(minutes=rnd.randint(0, 60 * 24 * 30)))
+             for i in range(scale * 20)))
+        conn.executemany(
+            "INSERT INTO themes (name, mention_count, unique_accounts, velocity, "
+            "acceleration, status) VALUES (?,?,?,?,?,?)",
+            ((f"theme {i}", rnd.randint(1, 90), rnd.randint(1, 30), rnd.uniform(0, 9),
+              rnd.uniform(-2, 2), rnd.choice(["trending", "active", "emerging", "stale"]))
+             for i in range(120)))
+        conn.executemany(
+            "INSERT INTO cross_source_themes (theme_name, twitter_count, youtube_count, "
+            "kb_count, correlation_score) VALUES (?,?,?,?,?)",
+            ((f"theme {i}", 3, 2, 1, rnd.random()) for i in range(40)))
+        conn.executemany(
+            "INSERT INTO theme_history (theme_id, date, velocity, mention_count) VALUES (?,?,?,?)",
+            ((t, ago(days=d)[:10], rnd.uniform(0, 9), rnd.randint(0, 40))
+             for t in range(1, 121) for d in range(30)))
+    elif name == "chore_schedule":
+        conn.executemany("INSERT INTO kids (name, active) VALUES (?, 1)", [("A",), ("B",), ("C",)])
+        conn.executemany("INSERT INTO chores (name, difficulty, active) VALUES (?,?,1)",
+                         ((f"Chore {i}", "easy") for i in range(12)))
+        conn.executemany(
+            "INSERT INTO assignments (kid_id, chore_id, assigned_date, status) VALUES (?,?,?,?)",
+            ((rnd.randint(1, 3), rnd.randint(1, 12), ago(days=d)[:10], rnd.choice(["pending", "done"]))
+             for d in range(60) for _ in range(6)))
+    elif name == "meal_planning":
+        conn.executemany("INSERT INTO recipes (name, meal_type, rating, times_made) VALUES (?,?,?,?)",
+                         ((f"Recipe {i}", "dinner", rnd.randint(1, 5), i) for i in range(60)))
+        conn.execute("INSERT INTO meal_plans (week_start, status) VALUES (?, 'active')",
+                     (ago(days=3)[:10],))
+        conn.executemany(
+            "INSERT INTO planned_meals (plan_id, recipe_id, meal_type, day_of_week) VALUES (1,?,?,?)",
+            ((rnd.randint(1, 60), mt, d) for d in range(1, 8) for mt in ("lunch", "dinner")))
+        conn.executemany("INSERT INTO preferences (active) VALUES (1)", [()] * 5)
+    elif name == "crm":
+        conn.executemany(
+            "INSERT INTO companies (name, industry, num_employees) VALUES (?,?,?)",
+            ((f"Company {i}", "energy", rnd.randint(5, 5000)) for i in range(scale // 5 + 1)))
+        conn.executemany(
+            "INSERT INTO contacts (firstname, lastname, company_name, job_title, email) "
+            "VALUES (?,?,?,?,?)",
+            ((f"First{i}", f"Last{i}", f"Company {i % (scale // 5 + 1)}", "VP",
+              f"c{i}@example.com") for i in range(scale)))
+        conn.executemany(
+            "INSERT INTO relationship_scores (contact_id, total_score, engagement, "
+            "strategic_fit, opportunity_potential, network_value, days_since_contact, "
+            "nudge_status) VALUES (?,?,?,?,?,?,?,?)",
+            ((i + 1, rnd.randint(0, 100), rnd.randint(0, 25), rnd.randint(0, 25),
+              rnd.randint(0, 25), rnd.randint(0, 25), rnd.randint(0, 90),
+              rnd.choice(["pending", "sent", None])) for i in range(scale)))
+        conn.executemany(
+            "INSERT INTO deals (deal_name, deal_stage, amount, contact_id, company_id) "
+            "VALUES (?,?,?,?,?)",
+            ((f"Deal {i}", rnd.choice(["appointmentscheduled", "closedwon", "closedlost"]),
+              rnd.uniform(1000, 90000), rnd.randint(1, scale), rnd.randint(1, scale // 5 + 1))
+             for i in range(scale // 4 + 1)))
+        conn.executemany(
+            "INSERT INTO follow_up_drafts (contact_id, draft_subject, draft_status, created_at) "
+            "VALUES (?,?,?,?)",
+            ((rnd.randint(1, scale), f"Hi {i}", rnd.choice(["pending", "sent"]), ago(days=i))
+             for i in range(40)))
+        conn.execute("INSERT INTO sync_log (sync_type, status, started_at) VALUES ('full', 'ok', ?)",
+                     (ago(hours=1),))
+    elif name == "github_repos":
+        conn.executemany(
+            "INSERT INTO repos (url, owner, name, status, created_at) VALUES (?,?,?,?,?)",
+            ((f"https://github.com/o/r{i}", "o", f"r{i}", rnd.choice(["new", "reviewed"]),
+              ago(days=i)) for i in range(100)))
+
+
+def build_fixture(base_path, scale=1000, seed=7):
+    """Create every configured database under ``base_path`` with synthetic data."""
+    from config import Config
+
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    for name, filename in Config.DATABASES.items():
+        path = os.path.join(base_path, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMAS[name])
+        _fill(name, conn, scale, rnd, now)
+        conn.commit()
+        conn.close()
+
+
+def make_client(base_path):
+    from config import Config
+
+    Config.DB_BASE_PATH = base_path
+    from app import create_app
+
+    return create_app().test_client()
+
+
+def time_page(client, path, requests):
+    """Return per-request wall times (ms) for ``requests`` GETs of ``path``."""
+    times = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        resp = client.get(path)
+        resp.get_data()  # streamed pages render while the body is read
+        times.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, (path, resp.status_code)
+    return times
+
+
+def report(label, times):
+    times = sorted(times)
+    p95 = times[int(len(times) * 0.95) - 1] if len(times) >= 20 else times[-1]
+    print(f"  {label:<28} median {statistics.median(times):8.2f} ms   "
+          f"p95 {p95:8.2f} ms   n={len(times)}")
+
+
+def bench_connections(args):
+    """Pooled vs. per-query connections on the overview and CRM pages."""
+    from config import Config
+    import db
+
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, args.scale)
+        client = make_client(base)
+        for path in ("/", "/crm"):
+            print(path)
+            for pooled in (False, True):
+                Config.DB_POOL = pooled
+                db.close_pool()
+                time_page(client, path, 3)
+                report("pooled" if pooled else "connect per query",
+                       time_page(client, path, args.requests))
+
+
+def bench_cache(args):
+    """Query result cache off vs. on across the main pages."""
+    from config import Config
+    import db
+
+    paths = ("/", "/crm", "/twitter", "/github", "/cron", "/kb")
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, args.scale)
+        client = make_client(base)
+        budget = Config.QUERY_CACHE_BYTES
+        for path in paths:
+            print(path)
+            for cached in (False, True):
+                Config.QUERY_CACHE_BYTES = budget if cached else 0
+                db._cache.clear()
+                time_page(client, path, 3)
+                report("cached" if cached else "uncached",
+                       time_page(client, path, args.requests))
+        print("cache:", db.cache_stats())
+
+
+def bench_pages(args):
+    """Per-page latency for the given paths (default: the heavy pages)."""
+    from config import Config
+
+    if args.no_cache:
+        Config.QUERY_CACHE_BYTES = 0
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, args.scale)
+        client = make_client(base)
+        for path in args.paths or ("/", "/crm", "/twitter", "/github"):
+            time_page(client, path, 3)
+            report(path, time_page(client, path, args.requests))
+
+
+# Values for URL parameters when every route is requested
+ROUTE_ARGS = {"job_name": "job_0", "briefing_id": 1, "project_id": 1}
+
+
+def bench_empty(args):
+    """Every GET route with no databases at all: each must render (200), with empty data."""
+    from config import Config
+    from queries import cost_tracking
+
+    with tempfile.TemporaryDirectory() as base:
+        client = make_client(base)
+        app = client.application
+        rules = sorted((r for r in app.url_map.iter_rules()
+                        if "GET" in r.methods and r.endpoint != "static"),
+                       key=lambda r: r.rule)
+        failures = 0
+        for rule in rules:
+            path = app.url_map.bind("localhost").build(
+                rule.endpoint, {name: ROUTE_ARGS[name] for name in rule.arguments})
+            start = time.perf_counter()
+            resp = client.get(path)
+            resp.get_data()
+            ms = (time.perf_counter() - start) * 1000
+            ok = resp.status_code == 200
+            failures += not ok
+            print(f"  {'ok  ' if ok else 'FAIL'} {resp.status_code} {path:<32} {ms:8.2f} ms")
+
+        expected = {"daily": [], "models": [], "skills": [], "month_total": 0.0,
+                    "projection": 0.0}
+        for rollups_on in (False, True):
+            Config.ROLLUPS = rollups_on
+            ok = cost_tracking.cost_summary(30) == expected
+            failures += not ok
+            print(f"  {'ok  ' if ok else 'FAIL'} cost_summary(30) is empty "
+                  f"(rollups {'on' if rollups_on else 'off'})")
+    if failures:
+        sys.exit(f"{failures} failed")
+
+
+def bench_sidecar(args):
+    """Synced files vs. indexed sidecar copies, with the result cache off."""
+    from config import Config
+    from sidecar import INDEXES, sidecars
+    import db
+
+    Config.QUERY_CACHE_BYTES = 0
+    paths = ("/cron", "/costs", "/github", "/twitter")
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as side:
+        Config.SIDECAR_DIR = side
+        build_fixture(base, args.scale)
+        client = make_client(base)
+        timings = {}
+        for enabled in (False, True):
+            Config.SIDECAR = enabled
+            if enabled:
+                for name in INDEXES:
+                    db.snapshot_version(name)
+                while len(sidecars._ready) < len(INDEXES):
+                    time.sleep(0.05)
+            for path in paths:
+                time_page(client, path, 3)
+                timings[path, enabled] = time_page(client, path, args.requests)
+        for path in paths:
+            print(path)
+            report("synced file", timings[path, False])
+            report("sidecar", timings[path, True])
+
+# Time-filtered queries as they were written before queries.timewindow, with
+# 'now' evaluated by SQLite. bench_windows runs each against the same
+# snapshot and the same instant as its replacement and requires identical
+# results. The last field calls the replacement on the package _queries()
+# returns.
+LEGACY_WINDOWS = [
+    ("cost_tracking.daily_spend", "usage_tracking", "all", """
+        SELECT date(timestamp) as day, SUM(cost_usd) as total_cost
+        FROM usage_log
+        WHERE date(timestamp) >= date('now', '-30 days')
+        GROUP BY date(timestamp)
+        ORDER BY day
+    """, lambda q: q.cost_tracking.daily_spend(30)),
+    ("cost_tracking.model_breakdown", "usage_tracking", "all", """
+        SELECT model, SUM(cost_usd) as total_cost, COUNT(*) as call_count
+        FROM usage_log
+        WHERE date(timestamp) >= date('now', '-30 days')
+        GROUP BY model
+        ORDER BY total_cost DESC
+    """, lambda q: q.cost_tracking.model_breakdown(30)),
+    ("cost_tracking.skill_breakdown", "usage_tracking", "all", """
+        SELECT skill, SUM(cost_usd) as total_cost, COUNT(*) as call_count
+        FROM usage_log
+        WHERE date(timestamp) >= date('now', '-30 days')
+        GROUP BY skill
+        ORDER BY total_cost DESC
+    """, lambda q: q.cost_tracking.skill_breakdown(30)),
+    ("cost_tracking.monthly_projection", "usage_tracking", "projection", """
+        SELECT AVG(daily_total) FROM (
+            SELECT SUM(cost_usd) as daily_total
+            FROM usage_log
+            WHERE date(timestamp) >= date('now', '-7 days')
+            GROUP BY date(timestamp)
+        )
+    """, lambda q: q.cost_tracking.monthly_projection()),
+    ("cost_tracking.total_spend_month", "usage_tracking", "scalar", """
+        SELECT COALESCE(SUM(cost_usd), 0) FROM usage_log
+        WHERE strftime('%Y-%m', timestamp) = strftime('%Y-%m', 'now')
+    """, lambda q: q.cost_tracking.total_spend_month()),
+    ("cron_health.all_jobs_summary", "cron_log", "all", """
+        SELECT
+            job_name,
+            MAX(started_at) as last_run,
+            (SELECT status FROM cron_runs cr2
+             WHERE cr2.job_name = cr.job_name
+             ORDER BY started_at DESC LIMIT 1) as last_status,
+            (SELECT duration_seconds FROM cron_runs cr3
+             WHERE cr3.job_name = cr.job_name
+             ORDER BY started_at DESC LIMIT 1) as last_duration,
+            COUNT(*) as runs_7d,
+            SUM(CASE WHEN status = 'failure' THEN 1 ELSE 0 END) as failures_7d,
+            ROUND(
+                (COUNT(*) - SUM(CASE WHEN status = 'failure' THEN 1 ELSE 0 END)) * 100.0 / COUNT(*),
+                1
+            ) as success_rate_7d
+        FROM cron_runs cr
+        WHERE started_at >= datetime('now', '-7 days')
+        GROUP BY job_name
+        ORDER BY job_name
+    """, lambda q: q.cron_health.all_jobs_summary()),
+    ("cron_health.stale_jobs", "cron_log", "all", """
+        SELECT job_name, started_at, duration_seconds FROM cron_runs
+        WHERE status = 'running'
+          AND started_at <= datetime('now', '-30 minutes')
+        ORDER BY started_at
+    """, lambda q: q.cron_health.stale_jobs(30)),
+    ("cron_health.job_duration_history", "cron_log", "all", """
+        SELECT started_at, duration_seconds
+        FROM cron_runs
+        WHERE job_name = 'job_3' AND status = 'success'
+          AND started_at >= datetime('now', '-14 days')
+        ORDER BY started_at
+    """, lambda q: q.cron_health.job_duration_history('job_3', 14)),
+    ("chores.todays_assignments", "chore_schedule", "all", """
+        SELECT k.name AS kid_name, c.name AS chore_name,
+               c.difficulty, a.status
+        FROM assignments a
+        JOIN kids k ON a.kid_id = k.id
+        JOIN chores c ON a.chore_id = c.id
+        WHERE a.assigned_date = date('now')
+        ORDER BY k.name, c.name
+    """, lambda q: q.chores.todays_assignments()),
+    ("chores.weekly_completion_rates", "chore_schedule", "all", """
+        SELECT k.name,
+               SUM(CASE WHEN a.status = 'done' THEN 1 ELSE 0 END) AS done,
+               COUNT(*) AS total,
+               ROUND(SUM(CASE WHEN a.status = 'done' THEN 1.0 ELSE 0 END)
+                     / COUNT(*) * 100, 1) AS pct
+        FROM assignments a
+        JOIN kids k ON a.kid_id = k.id
+        WHERE a.assigned_date >= date('now', 'weekday 1', '-7 days')
+          AND a.assigned_date <= date('now')
+        GROUP BY k.id
+        ORDER BY k.name
+    """, lambda q: q.chores.weekly_completion_rates()),
+    ("content_pipeline.publishing_pace_weekly", "content_ideas", "all", """
+        SELECT
+            strftime('%Y-W%W', updated_at) as week,
+            COUNT(*) as count
+        FROM content_ideas
+        WHERE status = 'published'
+          AND updated_at >= date('now', '-56 days')
+        GROUP BY week
+        ORDER BY week
+    """, lambda q: q.content_pipeline.publishing_pace_weekly(8)),
+    ("projects.summary_stats.hours_week", "projecthub", "round1", """
+        SELECT COALESCE(SUM(hours), 0) FROM time_entries
+        WHERE date(date) >= date('now', '-7 days')
+    """, lambda q: q.projects.summary_stats()['hours_week']),
+    ("projects.summary_stats.overdue", "projecthub", "scalar", """
+        SELECT COUNT(*) FROM milestones
+        WHERE target_date < date('now') AND completed_date IS NULL
+    """, lambda q: q.projects.summary_stats()['overdue']),
+    ("github_activity.commits_per_repo_week", "projecthub", "all", """
+        SELECT github_repo, COUNT(*) as commit_count, p.name as project_name
+        FROM github_activity ga
+        LEFT JOIN projects p ON ga.project_id = p.id
+        WHERE ga.event_type = 'commit'
+        AND ga.event_date >= datetime('now', '-7 days')
+        GROUP BY ga.github_repo
+        ORDER BY commit_count DESC
+        LIMIT 15
+    """, lambda q: q.github_activity.commits_per_repo_week()),
+    ("github_activity.daily_commit_counts", "projecthub", "all", """
+        SELECT date(event_date) as day, COUNT(*) as commit_count
+        FROM github_activity
+        WHERE event_type = 'commit'
+        AND event_date >= datetime('now', '-30 days')
+        GROUP BY date(event_date)
+        ORDER BY day
+    """, lambda q: q.github_activity.daily_commit_counts(30)),
+    ("twitter.theme_velocity_history", "twitter_trends", "all", """
+        SELECT th.date, t.name, th.velocity, th.mention_count
+        FROM theme_history th
+        JOIN themes t ON th.theme_id = t.id
+        WHERE t.status IN ('trending', 'active')
+        AND th.date >= date('now', '-14 days')
+        ORDER BY th.date, t.name
+    """, lambda q: q.twitter.theme_velocity_history(14)),
+]
+
+# Registry metrics with a time filter, as standalone legacy statements
+LEGACY_METRICS = {
+    "cron.runs_24h": ("cron_log", "SELECT COUNT(*) FROM cron_runs "
+                      "WHERE started_at >= datetime('now', '-24 hours')"),
+    "cron.failures_24h": ("cron_log", "SELECT COUNT(*) FROM cron_runs WHERE status = 'failure' "
+                          "AND started_at >= datetime('now', '-24 hours')"),
+    "cost.today": ("usage_tracking", "SELECT SUM(cost_usd) FROM usage_log "
+                   "WHERE date(timestamp) = date('now')"),
+    "jobs.high_match_7d": ("job_market", "SELECT COUNT(*) FROM job_scores WHERE match_score >= 80 "
+                           "AND date(created_at) >= date('now', '-7 days')"),
+    "youtube.phrases_7d": ("youtube_channels", "SELECT COUNT(DISTINCT phrase) FROM phrases "
+                           "WHERE date(created_at) >= date('now', '-7 days')"),
+    "twitter.tweets_today": ("twitter_trends", "SELECT COUNT(*) FROM tweets "
+                             "WHERE date(created_at) >= date('now')"),
+    "chores.pending_today": ("chore_schedule", "SELECT COUNT(*) FROM assignments "
+                             "WHERE assigned_date = date('now') AND status = 'pending'"),
+    "chores.done_today": ("chore_schedule", "SELECT COUNT(*) FROM assignments "
+                          "WHERE assigned_date = date('now') AND status = 'done'"),
+    "projects.overdue_milestones": ("projecthub", "SELECT COUNT(*) FROM milestones "
+                                    "WHERE target_date < date('now') AND completed_date IS NULL"),
+    "github.commits_7d": ("projecthub", "SELECT COUNT(*) FROM github_activity WHERE "
+                          "event_type = 'commit' AND event_date >= datetime('now', '-7 days')"),
+    "github.active_repos_7d": ("projecthub", "SELECT COUNT(DISTINCT github_repo) FROM "
+                               "github_activity WHERE event_type = 'commit' "
+                               "AND event_date >= datetime('now', '-7 days')"),
+}
+
+
+def _at(sql, now):
+    """Pin SQLite's 'now' to ``now`` so legacy SQL sees the same instant."""
+    return sql.replace("'now'", f"'{_ts(now)}'")
+
+
+def _same(a, b):
+    """Deep equality with floats compared to a relative 1e-9.
+
+    Float sums differ in the last bits when rows are visited in another
+    order, and for sums in the thousands that is more than any fixed number
+    of decimals.
+    """
+    if isinstance(a, float) or isinstance(b, float):
+        return (isinstance(a, (int, float)) and isinstance(b, (int, float))
+                and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def _boundary_rows(base, now):
+    """Add rows exactly on, and one second either side of, every window edge."""
+    day = now.replace(hour=0, minute=0, second=0)
+    edges = [day, day + timedelta(days=1), day.replace(day=1),
+             day - timedelta(days=7), day - timedelta(days=30),
+             now - timedelta(days=7), now - timedelta(days=14),
+             now - timedelta(hours=24), now - timedelta(minutes=30)]
+    stamps = [_ts(e + timedelta(seconds=d)) for e in edges for d in (-1, 0, 1)]
+    conn = sqlite3.connect(os.path.join(base, "usage_tracking.db"))
+    conn.executemany("INSERT INTO usage_log (timestamp, model, skill, cost_usd) VALUES (?,?,?,?)",
+                     ((ts, "edge", "edge", 1.0) for ts in stamps))
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(os.path.join(base, "cron_log.db"))
+    conn.executemany("INSERT INTO cron_runs (job_name, started_at, status, duration_seconds) "
+                     "VALUES (?,?,?,?)",
+                     (("job_3", ts, status, 1.0) for ts in stamps
+                      for status in ("success", "failure", "running")))
+    conn.commit()
+    conn.close()
+
+
+def _queries():
+    """The queries package, with every module the call tables here use loaded."""
+    import queries.chores
+    import queries.content_pipeline
+    import queries.cost_tracking
+    import queries.cron_health
+    import queries.github_activity
+    import queries.projects
+    import queries.twitter
+    return queries
+
+
+def check_windows(base):
+    """Compare every converted query with its legacy SQL at one pinned instant."""
+    from config import Config
+    import db
+    from queries import timewindow
+    from queries.registry import evaluate
+
+    now = datetime.utcnow().replace(microsecond=0)
+    _boundary_rows(base, now)
+    Config.DB_BASE_PATH = base
+    Config.QUERY_CACHE_BYTES = 0
+    Config.SIDECAR = False
+    timewindow.utcnow = lambda: now
+
+    q = _queries()
+    failures = 0
+    for label, db_name, shape, sql, call in LEGACY_WINDOWS:
+        if shape == "all":
+            legacy = db.query_db(db_name, _at(sql, now))
+        else:
+            legacy = db.query_scalar(db_name, _at(sql, now), default=0.0)
+            if shape == "projection":
+                legacy = round(legacy * 30, 2)
+            elif shape == "round1":
+                legacy = round(legacy, 1)
+        new = call(q)
+        ok = _same(legacy, new)
+        failures += not ok
+        print(f"  {'ok  ' if ok else 'FAIL'} {label} ({len(legacy) if shape == 'all' else legacy})")
+
+    metrics = evaluate(*LEGACY_METRICS)
+    for name, (db_name, sql) in LEGACY_METRICS.items():
+        legacy = db.query_scalar(db_name, _at(sql, now)) or 0
+        ok = _same(legacy, metrics[name])
+        failures += not ok
+        print(f"  {'ok  ' if ok else 'FAIL'} {name} ({legacy})")
+    return failures
+
+
+def _usage_log_db(path, rows, seed=7, now=None):
+    """A usage_tracking.db with ``rows`` calls spread over the year before ``now``."""
+    rnd = random.Random(seed)
+    now = now or datetime.utcnow()
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMAS["usage_tracking"])
+    conn.executemany(
+        "INSERT INTO usage_log (timestamp, model, skill, cost_usd, input_tokens, "
+        "output_tokens) VALUES (?,?,?,?,?,?)",
+        ((_ts(now - timedelta(seconds=rnd.randint(0, 365 * 86400))), rnd.choice(MODELS),
+          rnd.choice(SKILLS), rnd.uniform(0.0001, 0.05), 1000, 500) for _ in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def bench_windows(args):
+    """Check legacy vs. sargable time filters agree, then time them on a big usage_log."""
+    from sidecar import INDEXES
+    from queries import timewindow
+
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, args.scale)
+        print("equivalence")
+        failures = check_windows(base)
+        if failures:
+            sys.exit(f"{failures} time-window queries differ from their legacy SQL")
+
+    now = datetime.utcnow().replace(microsecond=0)
+    timewindow.utcnow = lambda: now
+    month_start, month_end = timewindow.month()
+    today, tomorrow = timewindow.day()
+    pairs = [
+        ("daily spend 30d",
+         LEGACY_WINDOWS[0][3],
+         "SELECT date(timestamp) as day, SUM(cost_usd) as total_cost FROM usage_log "
+         "WHERE timestamp >= ? GROUP BY date(timestamp) ORDER BY day",
+         (timewindow.since_day(30),)),
+        ("model breakdown 30d",
+         LEGACY_WINDOWS[1][3],
+         "SELECT model, SUM(cost_usd) as total_cost, COUNT(*) as call_count FROM usage_log "
+         "WHERE timestamp >= ? GROUP BY model ORDER BY total_cost DESC",
+         (timewindow.since_day(30),)),
+        ("spend this month",
+         LEGACY_WINDOWS[4][3],
+         "SELECT COALESCE(SUM(cost_usd), 0) FROM usage_log WHERE timestamp >= ? AND timestamp < ?",
+         (month_start, month_end)),
+        ("spend today",
+         LEGACY_METRICS["cost.today"][1],
+         "SELECT SUM(cost_usd) FROM usage_log WHERE timestamp >= ? AND timestamp < ?",
+         (today, tomorrow)),
+    ]
+    with tempfile.TemporaryDirectory() as base:
+        path = os.path.join(base, "usage_tracking.db")
+        print(f"usage_log with {args.rows:,} rows over one year")
+        _usage_log_db(path, args.rows)
+        # The sidecar's covering index, which only the sargable form can use
+        conn = sqlite3.connect(path)
+        for index_name, (table, columns) in INDEXES["usage_tracking"].items():
+            conn.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+        conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+        for label, legacy, sargable, params in pairs:
+            print(label)
+            for name, sql, bound in (("date() on column", _at(legacy, now), ()),
+                                     ("half-open bounds", sargable, params)):
+                times = []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    conn.execute(sql, bound).fetchall()
+                    times.append((time.perf_counter() - start) * 1000)
+                report(name, times)
+        conn.close()
+
+
+# Functions that read rollups; each must give what its raw SQL gives
+ROLLUP_CALLS = [
+    ("cost_tracking.daily_spend(30)", lambda q: q.cost_tracking.daily_spend(30)),
+    ("cost_tracking.daily_spend(400)", lambda q: q.cost_tracking.daily_spend(400)),
+    ("cost_tracking.model_breakdown(30)", lambda q: q.cost_tracking.model_breakdown(30)),
+    ("cost_tracking.skill_breakdown(7)", lambda q: q.cost_tracking.skill_breakdown(7)),
+    ("cost_tracking.monthly_projection()", lambda q: q.cost_tracking.monthly_projection()),
+    ("cost_tracking.total_spend_month()", lambda q: q.cost_tracking.total_spend_month()),
+    ("cron_health.all_jobs_summary()", lambda q: q.cron_health.all_jobs_summary()),
+    ("cron_health.stale_jobs(30)", lambda q: q.cron_health.stale_jobs(30)),
+    ("cron_health.total_jobs_count()", lambda q: q.cron_health.total_jobs_count()),
+    ("cron_health.duration_percentiles()", lambda q: q.cron_health.duration_percentiles()),
+    ("cron_health.duration_percentiles('job_3', 1, 3)", lambda q: q.cron_health.duration_percentiles('job_3', 1, 3)),
+    ("cost_tracking.cost_summary(30)", lambda q: q.cost_tracking.cost_summary(30)),
+    ("cost_tracking.cost_summary(90)", lambda q: q.cost_tracking.cost_summary(90)),
+]
+
+
+def _separate_costs(days):
+    """What cost_summary(days) returns, built from the one-chart-per-query functions."""
+    from queries import cost_tracking
+
+    return {
+        "daily": cost_tracking.daily_spend(days),
+        "models": cost_tracking.model_breakdown(days),
+        "skills": cost_tracking.skill_breakdown(days),
+        "month_total": cost_tracking.total_spend_month(),
+        "projection": cost_tracking.monthly_projection(),
+    }
+
+
+def _append_runs(base, now, rows, rnd):
+    """Append usage and cron rows in place and settle half the running jobs."""
+    conn = sqlite3.connect(os.path.join(base, "usage_tracking.db"))
+    conn.executemany(
+        "INSERT INTO usage_log (timestamp, model, skill, cost_usd, input_tokens, "
+        "output_tokens) VALUES (?,?,?,?,?,?)",
+        ((_ts(now - timedelta(seconds=rnd.randint(0, 3 * 86400))), rnd.choice(MODELS),
+          rnd.choice(SKILLS + [None]), rnd.uniform(0.0001, 0.05), 1000, 500)
+         for _ in range(rows)))
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(os.path.join(base, "cron_log.db"))
+    conn.execute("UPDATE cron_runs SET status = 'success', duration_seconds = 3.5 "
+                 "WHERE status = 'running' AND id % 2 = 0")
+    conn.executemany(
+        "INSERT INTO cron_runs (job_name, started_at, status, duration_seconds) VALUES (?,?,?,?)",
+        ((f"job_{rnd.randint(0, 9)}", _ts(now - timedelta(seconds=rnd.randint(0, 8 * 86400))),
+          rnd.choice(["success", "failure", "running"]), rnd.uniform(1, 60))
+         for _ in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def check_rollups(label):
+    """Compare ROLLUP_CALLS answered from synced rollups with their raw SQL."""
+    from config import Config
+    from rollups import ROLLUPS, rollups
+    from watcher import watcher
+
+    q = _queries()
+    watcher.rescan()
+    Config.ROLLUPS = False
+    legacy = [call(q) for _, call in ROLLUP_CALLS]
+    Config.ROLLUPS = True
+    for name in ROLLUPS:
+        rollups.sync(name)  # no-op if the watcher's event already synced it
+    state = rollups.state()
+    read = ", ".join(f"{name} {s['applied']}" for name, s in state.items())
+    print(f"{label} (rows read: {read})")
+    failures = sum(not s["current"] for s in state.values())
+    for (label, call), expected in zip(ROLLUP_CALLS, legacy):
+        got = call(q)
+        ok = _same(expected, got)
+        failures += not ok
+        size = len(expected) if isinstance(expected, (list, dict)) else expected
+        print(f"  {'ok  ' if ok else 'FAIL'} {label} ({size})")
+    for days in (30, 90):
+        ok = _same(_separate_costs(days), q.cost_tracking.cost_summary(days))
+        failures += not ok
+        print(f"  {'ok  ' if ok else 'FAIL'} cost_summary({days}) matches the separate queries")
+    return failures
+
+
+def bench_rollups(args):
+    """Check rollups against raw SQL across syncs, then time full vs. incremental syncs."""
+    from config import Config
+    from queries import cost_tracking, timewindow
+    from rollups import rollups
+    from sidecar import INDEXES
+    from watcher import watcher
+
+    now = datetime.utcnow().replace(microsecond=0)
+    timewindow.utcnow = lambda: now
+    Config.QUERY_CACHE_BYTES = 0
+    Config.SIDECAR = False
+    rnd = random.Random(11)
+    failures = 0
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as store:
+        Config.ROLLUP_DIR = store
+        Config.DB_BASE_PATH = base
+        build_fixture(base, args.scale)
+        _boundary_rows(base, now)
+        failures += check_rollups("full build")
+        _append_runs(base, now, 500, rnd)
+        failures += check_rollups("after appending rows and settling running jobs")
+        conn = sqlite3.connect(os.path.join(base, "usage_tracking.db"))
+        conn.execute("DELETE FROM usage_log WHERE id = (SELECT MAX(id) FROM usage_log)")
+        conn.execute("UPDATE usage_log SET cost_usd = cost_usd * 2 WHERE id % 3 = 0")
+        conn.commit()
+        conn.close()
+        failures += check_rollups("after rewriting rows below the watermark")
+    if failures:
+        sys.exit(f"{failures} rollup answers differ from their raw SQL")
+
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as store:
+        Config.ROLLUP_DIR = store
+        Config.DB_BASE_PATH = base
+        path = os.path.join(base, "usage_tracking.db")
+        print(f"usage_log with {args.rows:,} rows over one year")
+        _usage_log_db(path, args.rows)
+        conn = sqlite3.connect(path)
+        for index_name, (table, columns) in INDEXES["usage_tracking"].items():
+            conn.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+        watcher.rescan()
+
+        start = time.perf_counter()
+        rollups.sync("usage")
+        print(f"  full build                   {(time.perf_counter() - start) * 1000:8.0f} ms")
+        conn = sqlite3.connect(path)
+        conn.executemany(
+            "INSERT INTO usage_log (timestamp, model, skill, cost_usd) VALUES (?,?,?,?)",
+            ((_ts(now - timedelta(seconds=rnd.randint(0, 3600))), rnd.choice(MODELS),
+              rnd.choice(SKILLS), 0.01) for _ in range(args.append)))
+        conn.commit()
+        conn.close()
+        watcher.rescan()
+        start = time.perf_counter()
+        rollups.sync("usage")
+        applied = rollups.state()["usage"]["applied"]
+        print(f"  sync of {applied:,} appended rows   "
+              f"{(time.perf_counter() - start) * 1000:8.0f} ms")
+
+        for name, call in (
+                ("daily_spend(30)", lambda: cost_tracking.daily_spend(30)),
+                ("model_breakdown(30)", lambda: cost_tracking.model_breakdown(30)),
+                ("monthly_projection()", cost_tracking.monthly_projection),
+                ("total_spend_month()", cost_tracking.total_spend_month),
+                ("cost_summary(30)", lambda: cost_tracking.cost_summary(30)),
+                ("_separate_costs(30)", lambda: _separate_costs(30))):
+            print(name)
+            for label, enabled in (("raw usage_log", False), ("rollup", True)):
+                Config.ROLLUPS = enabled
+                times = []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    call()
+                    times.append((time.perf_counter() - start) * 1000)
+                report(label, times)
+
+
+def _cron_history_db(path, jobs, days, interval, now, seed=7):
+    """A cron_log.db where ``jobs`` jobs each ran every ``interval`` seconds for ``days``."""
+    rnd = random.Random(seed)
+    ticks = days * 86400 // interval
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMAS["cron_log"])
+    conn.executemany(
+        "INSERT INTO cron_runs (job_name, started_at, status, duration_seconds) VALUES (?,?,?,?)",
+        ((f"job_{j}", _ts(now - timedelta(seconds=(ticks - t) * interval)),
+          rnd.choices(["success", "failure", "running"], [95, 4, 1])[0], rnd.uniform(1, 60))
+         for t in range(ticks) for j in range(jobs)))
+    conn.commit()
+    conn.close()
+
+
+def bench_cronjobs(args):
+    """all_jobs_summary before and after the rewrite as cron_runs history grows."""
+    from config import Config
+    from queries import cron_health, timewindow
+    from rollups import rollups
+    from sidecar import INDEXES
+    from watcher import watcher
+
+    now = datetime.utcnow().replace(microsecond=0)
+    timewindow.utcnow = lambda: now
+    Config.QUERY_CACHE_BYTES = 0
+    Config.SIDECAR = False
+    legacy = _at(next(w[3] for w in LEGACY_WINDOWS if w[0] == "cron_health.all_jobs_summary"),
+                 now)
+    for days in args.days:
+        with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as store:
+            Config.DB_BASE_PATH = base
+            Config.ROLLUP_DIR = store
+            path = os.path.join(base, "cron_log.db")
+            _cron_history_db(path, args.jobs, days, args.interval, now)
+            # The sidecar's indexes, which the legacy subqueries depend on
+            conn = sqlite3.connect(path)
+            for index_name, (table, columns) in INDEXES["cron_log"].items():
+                conn.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+            conn.execute("ANALYZE")
+            rows = conn.execute("SELECT COUNT(*) FROM cron_runs").fetchone()[0]
+            conn.commit()
+            conn.close()
+            watcher.rescan()
+            start = time.perf_counter()
+            rollups.sync("cron")
+            build = (time.perf_counter() - start) * 1000
+            print(f"{args.jobs} jobs x {days} days every {args.interval}s: {rows:,} runs "
+                  f"(rollup build {build:.0f} ms)")
+
+            conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+            conn.row_factory = sqlite3.Row
+            expected = [dict(r) for r in conn.execute(legacy)]
+            Config.ROLLUPS = False
+            single_pass = cron_health.all_jobs_summary()
+            Config.ROLLUPS = True
+            rolled = cron_health.all_jobs_summary()
+            if not (_same(expected, single_pass) and _same(single_pass, rolled)):
+                sys.exit("all_jobs_summary differs from the correlated-subquery version")
+
+            times = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                conn.execute(legacy).fetchall()
+                times.append((time.perf_counter() - start) * 1000)
+            report("correlated subqueries", times)
+            conn.close()
+            for label, enabled in (("single pass over 7 days", False), ("rollup + latest", True)):
+                Config.ROLLUPS = enabled
+                times = []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    cron_health.all_jobs_summary()
+                    times.append((time.perf_counter() - start) * 1000)
+                report(label, times)
+
+
+def _exact_percentiles(path, recent, baseline):
+    """duration_percentiles() the slow way: every duration fetched and sorted."""
+    from queries.cron_health import PERCENTILES
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    values = {}
+    for job, is_recent, duration in conn.execute(
+            "SELECT job_name, started_at >= ?, duration_seconds FROM cron_runs "
+            "WHERE status = 'success' AND started_at >= ? AND duration_seconds IS NOT NULL",
+            (recent, baseline)):
+        values.setdefault((job, is_recent), []).append(duration)
+    conn.close()
+    exact = {}
+    for key, durations in values.items():
+        durations.sort()
+        exact[key] = {p: durations[int(q * (len(durations) - 1))] for p, q in PERCENTILES.items()}
+    return exact
+
+
+def bench_sketches(args):
+    """Duration percentiles from per-day sketches vs. sorting every run."""
+    import sketches
+    from config import Config
+    from queries import cron_health, timewindow
+    from rollups import rollups
+    from watcher import watcher
+
+    now = datetime.utcnow().replace(microsecond=0)
+    timewindow.utcnow = lambda: now
+    Config.QUERY_CACHE_BYTES = 0
+    Config.SIDECAR = False
+    recent, baseline = timewindow.since_day(7), timewindow.since_day(35)
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as store:
+        Config.DB_BASE_PATH = base
+        Config.ROLLUP_DIR = store
+        path = os.path.join(base, "cron_log.db")
+        _cron_history_db(path, args.jobs, args.days, args.interval, now)
+        watcher.rescan()
+        start = time.perf_counter()
+        rollups.sync("cron")
+        build = (time.perf_counter() - start) * 1000
+        conn = sqlite3.connect(path)
+        rows = conn.execute("SELECT COUNT(*) FROM cron_runs").fetchone()[0]
+        conn.close()
+        print(f"{args.jobs} jobs x {args.days} days every {args.interval}s: {rows:,} runs "
+              f"(rollup build {build:.0f} ms)")
+
+        exact = _exact_percentiles(path, recent, baseline)
+        Config.ROLLUPS = False
+        raw = cron_health.duration_percentiles()
+        Config.ROLLUPS = True
+        rolled = cron_health.duration_percentiles()
+        if not _same(raw, rolled):
+            sys.exit("percentiles from the rollup differ from sketches of the raw runs")
+        worst = 0.0
+        for job, windows in rolled.items():
+            for is_recent, window in ((1, windows["recent"]), (0, windows["baseline"])):
+                for p, value in exact[(job, is_recent)].items():
+                    worst = max(worst, abs(window[p] - value) / value)
+        if worst > sketches.ALPHA:
+            sys.exit(f"relative error {worst:.4f} exceeds ALPHA {sketches.ALPHA}")
+        print(f"  rollup and raw sketches agree; worst relative error vs. exact {worst:.4%} "
+              f"(ALPHA {sketches.ALPHA:.0%})")
+
+        for label, call in (("sort every run", lambda: _exact_percentiles(path, recent, baseline)),
+                            ("sketch of raw runs", None), ("per-day sketches", None)):
+            Config.ROLLUPS = label == "per-day sketches"
+            times = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                (call or cron_health.duration_percentiles)()
+                times.append((time.perf_counter() - start) * 1000)
+            report(label, times)
+
+        conn = sqlite3.connect(path)
+        conn.executemany(
+            "INSERT INTO cron_runs (job_name, started_at, status, duration_seconds) "
+            "VALUES (?, ?, 'success', ?)",
+            ((f"job_{j}", _ts(now - timedelta(seconds=i)), 120.0)
+             for i in range(args.append // args.jobs) for j in range(args.jobs)))
+        conn.commit()
+        conn.close()
+        watcher.rescan()
+        start = time.perf_counter()
+        rollups.sync("cron")
+        print(f"  sync of {rollups.state()['cron']['applied']:,} appended runs "
+              f"{(time.perf_counter() - start) * 1000:8.0f} ms")
+        Config.ROLLUPS = False
+        raw = cron_health.duration_percentiles()
+        Config.ROLLUPS = True
+        if not _same(raw, cron_health.duration_percentiles()):
+            sys.exit("percentiles differ after an incremental sync")
+        flagged = sum(w["regressed"] for w in raw.values())
+        print(f"  incremental sketches match; {flagged} of {len(raw)} jobs flagged as regressed")
+
+
+CUBE_NOW = datetime(2026, 6, 15, 13, 37, 11)
+
+
+def bench_cube(args):
+    """Cube answers from the rollup levels vs. raw usage_log, and day vs. year ranges."""
+    from config import Config
+    from queries import cost_tracking, timewindow
+    from rollups import rollups
+    from sidecar import INDEXES
+    from watcher import watcher
+
+    # A fixed instant, so the data and the random ranges (and any failure)
+    # are the same on every run
+    now = CUBE_NOW
+    timewindow.utcnow = lambda: now
+    Config.QUERY_CACHE_BYTES = 0
+    Config.SIDECAR = False
+    rnd = random.Random(3)
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as store:
+        Config.DB_BASE_PATH = base
+        Config.ROLLUP_DIR = store
+        path = os.path.join(base, "usage_tracking.db")
+        print(f"usage_log with {args.rows:,} rows over the year before {now}")
+        _usage_log_db(path, args.rows, now=now)
+        conn = sqlite3.connect(path)
+        for index_name, (table, columns) in INDEXES["usage_tracking"].items():
+            conn.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+        watcher.rescan()
+        rollups.sync("usage")
+
+        def cube(enabled, *a, **kw):
+            Config.ROLLUPS = enabled
+            return cost_tracking.usage_cube(*a, **kw)
+
+        failures = 0
+        for _ in range(args.checks):
+            start = now - timedelta(seconds=rnd.randint(0, 400 * 86400))
+            end = start + timedelta(seconds=rnd.randint(0, 200 * 86400))
+            granularity = rnd.choice(cost_tracking.GRANULARITIES)
+            if granularity == "hour":
+                end = start + timedelta(hours=rnd.randint(0, 72))
+            kw = rnd.choice([{}, {"model": rnd.choice(MODELS)}, {"skill": rnd.choice(SKILLS)},
+                             {"by": "model"}, {"by": "skill", "model": rnd.choice(MODELS)}])
+            ok = _same(cube(False, start, end, granularity, **kw),
+                       cube(True, start, end, granularity, **kw))
+            failures += not ok
+            if not ok:
+                print(f"  FAIL {granularity} {start} .. {end} {kw}")
+        print(f"  {args.checks - failures}/{args.checks} random ranges match raw usage_log")
+        if failures:
+            sys.exit(f"{failures} cube answers differ from raw usage_log")
+
+        ranges = [
+            ("1 day, hourly", now - timedelta(days=1), now, "hour"),
+            ("1 day, daily", now - timedelta(days=1), now, "day"),
+            ("30 days, daily", now - timedelta(days=30), now, "day"),
+            ("1 year, weekly", now - timedelta(days=365), now, "week"),
+            ("1 year, monthly", now - timedelta(days=365), now, "month"),
+        ]
+        for label, start, end, granularity in ranges:
+            pieces = cost_tracking._cover(
+                cost_tracking._floor("hour", start), cost_tracking._ceil("hour", end),
+                ["hour", "day", granularity][:cost_tracking.GRANULARITIES.index(granularity) + 1])
+            print(f"{label} ({len(pieces)} bucket ranges)")
+            for name, enabled in (("raw usage_log", False), ("cube", True)):
+                times = []
+                for _ in range(args.requests):
+                    t = time.perf_counter()
+                    cube(enabled, start, end, granularity)
+                    times.append((time.perf_counter() - t) * 1000)
+                report(name, times)
+
+
+def bench_forecast(args):
+    """One vectorized forecast fit vs. a fit per series, and spend_forecast cold vs. cached."""
+    import numpy as np
+
+    from config import Config
+    from queries import cost_forecast, timewindow
+    from rollups import rollups
+    from watcher import watcher
+
+    rnd = np.random.default_rng(5)
+    days = cost_forecast.HISTORY_DAYS
+    t = np.arange(days)[:, None]
+    history = np.clip(rnd.gamma(2.0, 1.0, (1, args.series)) * (1 + 0.01 * t)
+                      + 0.5 * (t % 7 >= 5) + rnd.normal(0, 0.3, (days, args.series)), 0, None)
+    print(f"{args.series} series x {days} days, 30-day horizon")
+
+    batch = cost_forecast.fit(history, 0, 30)
+    for i in range(args.series):
+        single = cost_forecast.fit(history[:, i:i + 1], 0, 30)
+        for key, value in single.items():
+            if not np.allclose(value, batch[key][..., i:i + 1] if value.ndim > 1
+                               else batch[key][i:i + 1]):
+                sys.exit(f"series {i}: {key} differs between the batch and single fits")
+    print("  batch fit matches the per-series fits")
+    for name, fn in (("per-series loop", lambda: [cost_forecast.fit(history[:, i:i + 1], 0, 30)
+                                                  for i in range(args.series)]),
+                     ("one vectorized fit", lambda: cost_forecast.fit(history, 0, 30))):
+        times = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - start) * 1000)
+        report(name, times)
+
+    now = datetime.utcnow().replace(microsecond=0)
+    timewindow.utcnow = lambda: now
+    Config.SIDECAR = False
+    with tempfile.TemporaryDirectory() as base, tempfile.TemporaryDirectory() as store:
+        Config.DB_BASE_PATH = base
+        Config.ROLLUP_DIR = store
+        print(f"usage_log with {args.rows:,} rows over one year")
+        _usage_log_db(os.path.join(base, "usage_tracking.db"), args.rows)
+        watcher.rescan()
+        rollups.sync("usage")
+        for by in ("model", "skill"):
+            start = time.perf_counter()
+            result = cost_forecast.spend_forecast(by, 30)
+            cold = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            cost_forecast.spend_forecast(by, 30)
+            cached = (time.perf_counter() - start) * 1000
+            total = result["total"]
+            print(f"  by {by}: {len(result['series'])} series, next 30 days "
+                  f"${total['total']:,.2f} (${total['total_lower']:,.2f}"
+                  f"-${total['total_upper']:,.2f}); {cold:.1f} ms cold, {cached:.2f} ms cached")
+
+
+STREAMED_PAGES = {"/kb": "knowledge_base", "/crm": "crm", "/twitter": "twitter"}
+
+# Run in a fresh interpreter per measurement so one page's peak can't hide
+# another's. "buffered" restores fetchall + render_template for comparison.
+_RSS_PROBE = """
+import sys
+sys.path.insert(0, {root!r})
+from config import Config
+Config.DB_BASE_PATH = {base!r}
+Config.QUERY_CACHE_BYTES = 0
+from app import create_app
+import db, flask, importlib
+
+def kb(status):
+    with open("/proc/self/status") as f:
+        return int(next(l for l in f if l.startswith(status)).split()[1])
+
+if {mode!r} == "buffered":
+    for name in {modules!r}:
+        q = importlib.import_module("queries." + name)
+        q.query_iter = (lambda db_name, sql, params=(), arraysize=500, shape="dict":
+                        db.query_db(db_name, sql, params))
+        importlib.import_module("routes." + name).stream_page = flask.render_template
+client = create_app().test_client()
+client.get("/briefings").close()
+before = kb("VmRSS")
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")  # reset VmHWM to the current RSS
+resp = client.get({path!r}, buffered=False)
+size = sum(len(chunk) for chunk in resp.response)
+resp.close()
+print(kb("VmHWM") - before, size)
+"""
+
+
+def _wide_tables(base, rows, seed=7):
+    """Grow the tables behind the streamed pages to ``rows`` rows each."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(os.path.join(base, "knowledge_base.db"))
+    conn.executemany(
+        "INSERT INTO sources (title, source_type, url, summary, created_at) VALUES (?,?,?,?,?)",
+        ((f"Source {i}", rnd.choice(["article", "video", "paper", "tweet"]),
+          f"https://example.com/{i}", "summary " * 40, _ts(datetime(2025, 1, 1)
+                                                           + timedelta(minutes=i)))
+         for i in range(rows)))
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(os.path.join(base, "crm.db"))
+    offset = conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO contacts (firstname, lastname, company_name, job_title, email) "
+        "VALUES (?,?,?,?,?)",
+        ((f"First{i}", f"Last{i}", f"Company {i % 500}", "VP", f"c{i}@example.com")
+         for i in range(rows)))
+    conn.executemany(
+        "INSERT INTO relationship_scores (contact_id, total_score, engagement, "
+        "strategic_fit, opportunity_potential, network_value, days_since_contact, "
+        "nudge_status) VALUES (?,?,?,?,?,?,?,?)",
+        ((offset + i + 1, rnd.randint(0, 100), rnd.randint(0, 25), rnd.randint(0, 25),
+          rnd.randint(0, 25), rnd.randint(0, 25), rnd.randint(0, 90),
+          rnd.choice(["pending", "sent", None])) for i in range(rows)))
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(os.path.join(base, "twitter_trends.db"))
+    conn.executemany(
+        "INSERT INTO accounts (handle, display_name, category, active, total_tweets_tracked) "
+        "VALUES (?,?,?,?,?)",
+        ((f"wide{i}", f"Wide {i}", rnd.choice(["ai-leaders", "data-mlops"]), i % 9 != 0,
+          rnd.randint(0, 900)) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def bench_streaming(args):
+    """Peak RSS per request for the big table pages: fetchall + render vs. query_iter + stream."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, scale=200)
+        _wide_tables(base, args.rows)
+        print(f"{args.rows:,} extra sources, contacts and accounts")
+        for path, module in STREAMED_PAGES.items():
+            for mode in ("buffered", "streamed"):
+                probe = _RSS_PROBE.format(root=root, base=base, mode=mode, path=path,
+                                          modules=list(STREAMED_PAGES.values()))
+                out = subprocess.run([sys.executable, "-c", probe], capture_output=True,
+                                     text=True, check=True).stdout.split()
+                peak, size = int(out[0]), int(out[1])
+                print(f"  {path:<10} {mode:<9} peak +{peak / 1024:7.1f} MiB   "
+                      f"page {size / 2**20:6.1f} MiB")
+
+
+def bench_shapes(args):
+    """Memory and fetch/render latency of dict rows vs. the compact shapes in rows.py."""
+    import tracemalloc
+
+    import jinja2
+
+    from config import Config
+    from queries import crm, twitter
+    from watcher import watcher
+
+    Config.QUERY_CACHE_BYTES = 0
+    Config.SIDECAR = False
+    queries = [
+        ("crm contacts", "crm", crm._CONTACTS_WITH_SCORES),
+        ("kb sources", "knowledge_base",
+         "SELECT id, title, source_type, url, SUBSTR(summary, 1, 200) as summary_short, "
+         "created_at FROM sources ORDER BY created_at DESC"),
+        ("twitter themes", "twitter_trends", twitter._TRENDING_THEMES),
+    ]
+    with tempfile.TemporaryDirectory() as base:
+        Config.DB_BASE_PATH = base
+        build_fixture(base, scale=200)
+        _wide_tables(base, args.rows)
+        rnd = random.Random(11)
+        conn = sqlite3.connect(os.path.join(base, "twitter_trends.db"))
+        conn.executemany(
+            "INSERT INTO themes (name, description, mention_count, unique_accounts, velocity, "
+            "acceleration, status, first_seen_date, updated_at) VALUES (?,?,?,?,?,?,?,?,?)",
+            ((f"wide theme {i}", f"about {i}", rnd.randint(1, 90), rnd.randint(1, 30),
+              rnd.uniform(0, 9), rnd.uniform(-2, 2),
+              rnd.choice(["trending", "active", "emerging", "stale"]), "2026-01-01",
+              "2026-01-02") for i in range(args.rows)))
+        conn.commit()
+        conn.close()
+        watcher.rescan()
+        from db import query_db
+
+        print(f"~{args.rows:,} rows per query")
+        for label, db_name, sql in queries:
+            reference = query_db.uncached(db_name, sql)
+            columns = list(reference[0])
+            template = jinja2.Environment().from_string(
+                "{% for r in rows %}" + "".join(f"{{{{ r.{c} }}}}" for c in columns)
+                + "{% endfor %}")
+            print(f"{label} ({len(reference):,} rows x {len(columns)} columns)")
+            for shape in ("dict", "record", "tuple", "columns"):
+                result = query_db.uncached(db_name, sql, shape=shape)
+                if [dict(r) for r in result] != reference:
+                    sys.exit(f"{label}: {shape} rows differ from dict rows")
+                del result
+                tracemalloc.start()
+                result = query_db.uncached(db_name, sql, shape=shape)
+                held, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                fetch, render = [], []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    result = query_db.uncached(db_name, sql, shape=shape)
+                    fetch.append((time.perf_counter() - start) * 1000)
+                    start = time.perf_counter()
+                    template.render(rows=result)
+                    render.append((time.perf_counter() - start) * 1000)
+                print(f"  {shape:<8} held {held / 2**20:6.1f} MiB  peak {peak / 2**20:6.1f} MiB  "
+                      f"fetch {statistics.median(fetch):7.1f} ms  "
+                      f"render {statistics.median(render):7.1f} ms")
+
+
+def _add_frequent_job(base, interval, days=14):
+    """Add an 'every_5min' job with a success every ``interval`` seconds; returns the run count."""
+    now = datetime.utcnow()
+    conn = sqlite3.connect(os.path.join(base, "cron_log.db"))
+    runs = days * 86400 // interval
+    conn.executemany(
+        "INSERT INTO cron_runs (job_name, started_at, status, duration_seconds) "
+        "VALUES ('every_5min', ?, 'success', ?)",
+        ((_ts(now - timedelta(seconds=i * interval)), round(random.uniform(1, 90), 3))
+         for i in range(runs)))
+    conn.commit()
+    conn.close()
+    return runs
+
+
+CHART_ENDPOINTS = [
+    "/api/cron/every_5min/duration?points=0",
+    "/api/costs/daily",
+    "/api/costs/models",
+    "/api/costs/skills",
+    "/api/costs/summary?days=90",
+    "/api/costs/cube?granularity=hour&by=model",
+    "/api/costs/forecast?by=skill",
+    "/api/content/pace",
+]
+
+# Decodes with static/js/columnar.js under node and prints the result as JSON
+_NODE_DECODE = """
+const fs = require('fs');
+global.window = {};
+eval(fs.readFileSync(process.argv[1], 'utf8'));
+const buf = fs.readFileSync(0);
+const payload = window.decodeColumnar(buf.buffer.slice(buf.byteOffset, buf.byteOffset + buf.length));
+console.log(JSON.stringify(payload, (k, v) =>
+    ArrayBuffer.isView(v) ? Array.from(v, x => (Number.isNaN(x) ? null : x)) : v));
+"""
+
+
+def bench_columnar(args):
+    """JSON vs. binary columnar chart payloads: equivalence, size and encode time."""
+    import columnar
+    from config import Config
+
+    Config.QUERY_CACHE_BYTES = 0
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    node = shutil.which("node")
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, scale=1000)
+        runs = _add_frequent_job(base, args.interval)
+        client = make_client(base)
+        print(f"every_5min: {runs:,} runs in 14 days")
+        for path in CHART_ENDPOINTS:
+            as_json = client.get(path)
+            binary = client.get(path, headers={"Accept": columnar.MEDIA_TYPE})
+            assert binary.mimetype == columnar.MEDIA_TYPE, (path, binary.mimetype)
+            if columnar.decode(binary.data) != as_json.json:
+                sys.exit(f"{path}: decoded columnar payload differs from JSON")
+            if node:
+                out = subprocess.run(
+                    [node, "-e", _NODE_DECODE, os.path.join(root, "static/js/columnar.js")],
+                    input=binary.data, capture_output=True, check=True).stdout
+                if json.loads(out) != as_json.json:
+                    sys.exit(f"{path}: columnar.js decodes differently from JSON")
+            payload = as_json.json
+            encode_json, encode_binary = [], []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                json.dumps(payload)
+                encode_json.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                columnar.encode(payload)
+                encode_binary.append((time.perf_counter() - start) * 1000)
+            print(f"  {path:<42} json {len(as_json.data):>8,} B  columnar {len(binary.data):>8,} B"
+                  f"  encode {statistics.median(encode_json):5.2f} / "
+                  f"{statistics.median(encode_binary):5.2f} ms")
+        print("  decoded payloads match JSON" + (" (python and columnar.js)" if node else ""))
+
+
+def _reference_lttb(x, y, points):
+    """Textbook LTTB, one point at a time, to check queries.downsample.lttb against."""
+    n = len(x)
+    if points >= n:
+        return list(range(n))
+    bound = lambda i: min(i * (n - 2) // (points - 2) + 1, n)  # noqa: E731
+    kept, a = [0], 0
+    for i in range(points - 2):
+        lo, hi, nhi = bound(i), bound(i + 1), bound(i + 2)
+        ax = sum(x[hi:nhi]) / (nhi - hi)
+        ay = sum(y[hi:nhi]) / (nhi - hi)
+        a = max(range(lo, hi), key=lambda j: abs(
+            (x[a] - ax) * (y[j] - y[a]) - (x[a] - x[j]) * (ay - y[a])))
+        kept.append(a)
+    return kept + [n - 1]
+
+
+# Every time series endpoint and page that downsamples
+DOWNSAMPLED = [
+    "/api/cron/every_5min/duration",
+    "/api/costs/daily",
+    "/api/costs/summary?days=3660",
+    "/twitter",
+    "/github",
+]
+
+
+def bench_downsample(args):
+    """LTTB downsampling of time series: checks against a reference, payload size and time."""
+    import db
+    from queries import downsample
+    from queries.cron_health import job_duration_history
+
+    rnd = random.Random(7)
+    for n, points in ((4032, 500), (100_000, 500), (1000, 999), (37, 5), (10, 3)):
+        x = sorted(rnd.uniform(0, 1e9) for _ in range(n))
+        y = [rnd.gauss(10, 3) + (50 if rnd.random() < 0.01 else 0) for _ in range(n)]
+        index, _ = downsample.lttb(x, y, points)
+        if index.tolist() != _reference_lttb([v - x[0] for v in x], y, points):
+            sys.exit(f"lttb({n}, {points}) differs from the reference")
+        times = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            downsample.lttb(x, y, points)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"  lttb {n:>7,} -> {points:<4} matches the reference  "
+              f"{statistics.median(times):6.2f} ms")
+
+    with tempfile.TemporaryDirectory() as base:
+        build_fixture(base, scale=1000)
+        runs = _add_frequent_job(base, args.interval)
+        client = make_client(base)
+        with client.application.app_context():
+            raw = job_duration_history("every_5min")
+            kept = job_duration_history("every_5min", points=args.points)
+        print(f"every_5min: {runs:,} runs in 14 days, kept {len(kept)}")
+        assert len(kept) == min(args.points, len(raw))
+        assert kept[0]["started_at"] == raw[0]["started_at"]
+        assert kept[-1]["started_at"] == raw[-1]["started_at"]
+        durations = [r["duration_seconds"] for r in raw]
+        assert min(r["duration_seconds_min"] for r in kept) == min(durations)
+        assert max(r["duration_seconds_max"] for r in kept) == max(durations)
+        assert all(r["duration_seconds_min"] <= r["duration_seconds"]
+                   <= r["duration_seconds_max"] for r in kept)
+        print("  kept runs are real runs, first and last kept, envelopes cover every run")
+
+        full = client.get("/api/cron/every_5min/duration?points=0")
+        for path in DOWNSAMPLED:
+            resp = client.get(path)
+            assert resp.status_code == 200, (path, resp.status_code)
+        for path in ("/api/cron/every_5min/duration?points=0", "/api/cron/every_5min/duration"):
+            db._cache.clear()
+            cold = time_page(client, path, 1)[0]
+            resp = client.get(path)
+            warm = time_page(client, path, args.requests)
+            print(f"  {path:<42} {len(resp.json['values']):>5} points {len(resp.data):>8,} B"
+                  f"  first {cold:6.2f} ms, then {statistics.median(warm):6.2f} ms")
+        assert len(full.json["values"]) == runs
+        print("  " + ", ".join(DOWNSAMPLED) + " render with downsampling")
+
+
+# The K8s API calls of one /infra render plus the Pediatrica pods
+K8S_PATHS = [
+    "/apis/longhorn.io/v1beta2/volumes",
+    "/api/v1/persistentvolumeclaims",
+    "/api/v1/pods",
+    "/api/v1/nodes",
+    "/api/v1/services",
+    "/api/v1/namespaces",
+    "/api/v1/namespaces/pediatrica/pods",
+    "/api/v1/namespaces/kube-system/pods",
+]
+
+
+def _legacy_k8s_get(api, token_path, ca_path, path):
+    """The per-call token read, SSL context and connection _k8s_get used to make."""
+    import ssl
+    import urllib.request
+
+    with open(token_path) as f:
+        token = f.read().strip()
+    req = urllib.request.Request(
+        f"{api}{path}", headers={"Authorization": f"Bearer {token}", "Accept": "application/json"})
+    ctx = ssl.create_default_context(cafile=ca_path)
+    with urllib.request.urlopen(req, timeout=5, context=ctx) as resp:
+        return json.loads(resp.read())
+
+
+def _k8s_standin(base, token_path, items, idle_timeout):
+    """A local HTTPS stand-in for the API server; returns ``(server, ca_path)``.
+
+    It answers any GET with a list of ``items`` pods when the bearer token
+    matches ``token_path``'s current contents (401 otherwise), keeps
+    connections alive for ``idle_timeout`` seconds and counts them in
+    ``server.connections``.
+    """
+    import ssl
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    cert, key = os.path.join(base, "ca.crt"), os.path.join(base, "server.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert], check=True, capture_output=True)
+    body = json.dumps({"kind": "PodList", "items": [
+        {"metadata": {"name": f"pod-{i}", "namespace": f"ns-{i % 7}"},
+         "status": {"phase": "Running", "containerStatuses": [
+             {"name": "app", "ready": True, "restartCount": 0, "image": "app:1"}]}}
+        for i in range(items)]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = idle_timeout
+        # Headers and body go out as two writes; without TCP_NODELAY (which the
+        # Go API server sets) a keep-alive client waits out a delayed ACK
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with server.lock:
+                server.connections += 1
+
+        def do_GET(self):
+            with open(token_path) as f:
+                ok = self.headers.get("Authorization") == f"Bearer {f.read().strip()}"
+            payload = body if ok else b'{"kind":"Status","code":401}'
+            self.send_response(200 if ok else 401)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.lock = threading.Lock()
+    ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ctx.load_cert_chain(cert, key)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, cert
+
+
+def bench_k8s(args):
+    """Shared K8s client (cached token, one SSL context, keep-alive) vs. per-call setup."""
+    from queries import infrastructure, k8s
+
+    if not shutil.which("openssl"):
+        sys.exit("the TLS stand-in needs the openssl CLI for its certificate")
+    with tempfile.TemporaryDirectory() as base:
+        token_path = os.path.join(base, "token")
+        with open(token_path, "w") as f:
+            f.write("token-one\n")
+        server, ca_path = _k8s_standin(base, token_path, args.items, idle_timeout=1.0)
+        api = f"https://127.0.0.1:{server.server_address[1]}"
+        shared = k8s.K8sClient(api, token_path, ca_path)
+        k8s._client = shared
+
+        legacy = [_legacy_k8s_get(api, token_path, ca_path, p) for p in K8S_PATHS]
+        if [json.loads(shared.get(p)) for p in K8S_PATHS] != legacy:
+            sys.exit("the shared client's answers differ from the per-call version")
+        if len(infrastructure.get_k8s_pods()) != args.items:
+            sys.exit("get_k8s_pods() did not go through the shared client")
+        print(f"stand-in API server on {api}, {args.items} pods per list, "
+              f"{len(K8S_PATHS)} calls per render")
+
+        for label, call in (
+                ("per call: token, SSL context, TLS connect",
+                 lambda p: _legacy_k8s_get(api, token_path, ca_path, p)),
+                ("shared client, keep-alive pool", lambda p: json.loads(shared.get(p)))):
+            before = server.connections
+            times = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                for p in K8S_PATHS:
+                    call(p)
+                times.append((time.perf_counter() - start) * 1000)
+            report(label, times)
+            print(f"    {server.connections - before} new TLS connections for "
+                  f"{args.requests * len(K8S_PATHS)} calls")
+
+        # Rotation by replacing the file, as the kubelet does
+        with open(token_path + ".new", "w") as f:
+            f.write("token-two\n")
+        os.replace(token_path + ".new", token_path)
+        shared.get(K8S_PATHS[0])
+        # Rotation the stat can't see: same inode, size and mtime
+        st = os.stat(token_path)
+        with open(token_path, "r+") as f:
+            f.write("token-3re\n")
+        os.utime(token_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        shared.get(K8S_PATHS[0])
+        print("  rotated tokens picked up (file replaced; rewritten in place, via the 401)")
+
+        time.sleep(1.5)  # the stand-in drops the idle pooled connections
+        shared.get(K8S_PATHS[0])
+        print("  idle connections closed by the server are replaced transparently")
+        server.shutdown()
+        shared.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("connections", help=bench_connections.__doc__)
+    p.add_argument("--scale", type=int, default=1000)
+    p.add_argument("--requests", type=int, default=200)
+    p.set_defaults(func=bench_connections)
+
+    p = sub.add_parser("cache", help=bench_cache.__doc__)
+    p.add_argument("--scale", type=int, default=1000)
+    p.add_argument("--requests", type=int, default=200)
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser("pages", help=bench_pages.__doc__)
+    p.add_argument("paths", nargs="*")
+    p.add_argument("--scale", type=int, default=1000)
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--no-cache", action="store_true",
+                   help="disable the query result cache so SQL cost is visible")
+    p.set_defaults(func=bench_pages)
+
+    p = sub.add_parser("empty", help=bench_empty.__doc__)
+    p.set_defaults(func=bench_empty)
+
+    p = sub.add_parser("sidecar", help=bench_sidecar.__doc__)
+    p.add_argument("--scale", type=int, default=5000)
+    p.add_argument("--requests", type=int, default=20)
+    p.set_defaults(func=bench_sidecar)
+
+    p = sub.add_parser("windows", help=bench_windows.__doc__)
+    p.add_argument("--scale", type=int, default=500)
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_windows)
+
+    p = sub.add_parser("rollups", help=bench_rollups.__doc__)
+    p.add_argument("--scale", type=int, default=2000)
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--append", type=int, default=1000)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_rollups)
+
+    p = sub.add_parser("cronjobs", help=bench_cronjobs.__doc__)
+    p.add_argument("--jobs", type=int, default=100)
+    p.add_argument("--days", type=int, nargs="+", default=[30, 365])
+    p.add_argument("--interval", type=int, default=300)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_cronjobs)
+
+    p = sub.add_parser("sketches", help=bench_sketches.__doc__)
+    p.add_argument("--jobs", type=int, default=50)
+    p.add_argument("--days", type=int, default=60)
+    p.add_argument("--interval", type=int, default=300)
+    p.add_argument("--append", type=int, default=5000)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_sketches)
+
+    p = sub.add_parser("cube", help=bench_cube.__doc__)
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--checks", type=int, default=200)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_cube)
+
+    p = sub.add_parser("forecast", help=bench_forecast.__doc__)
+    p.add_argument("--series", type=int, default=500)
+    p.add_argument("--rows", type=int, default=200_000)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_forecast)
+
+    p = sub.add_parser("streaming", help=bench_streaming.__doc__)
+    p.add_argument("--rows", type=int, default=100_000)
+    p.set_defaults(func=bench_streaming)
+
+    p = sub.add_parser("shapes", help=bench_shapes.__doc__)
+    p.add_argument("--rows", type=int, default=50_000)
+    p.add_argument("--requests", type=int, default=5)
+    p.set_defaults(func=bench_shapes)
+
+    p = sub.add_parser("columnar", help=bench_columnar.__doc__)
+    p.add_argument("--interval", type=int, default=300)
+    p.add_argument("--requests", type=int, default=20)
+    p.set_defaults(func=bench_columnar)
+
+    p = sub.add_parser("downsample", help=bench_downsample.__doc__)
+    p.add_argument("--interval", type=int, default=300)
+    p.add_argument("--points", type=int, default=500)
+    p.add_argument("--requests", type=int, default=20)
+    p.set_defaults(func=bench_downsample)
+
+    p = sub.add_parser("k8s", help=bench_k8s.__doc__)
+    p.add_argument("--items", type=int, default=50)
+    p.add_argument("--requests", type=int, default=20)
+    p.set_defaults(func=bench_k8s)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Locally indexed copies of the synced databases.
+
+The synced files are opened immutable and the OpenClaw VM that writes them
+doesn't carry the indexes our queries need. For every database listed in
+INDEXES the dashboard keeps a sidecar: a copy on local disk under
+Config.SIDECAR_DIR with those indexes added, named after the snapshot
+version it was built from. Builds run on a background thread whenever the
+watcher reports a new snapshot; until the new sidecar is renamed into place
+queries keep reading the previous one (or the synced file itself), so a
+build never blocks a request. Gunicorn workers share the sidecars and take
+a per-database file lock so each snapshot is built once.
+"""
+
+import fcntl
+import logging
+import os
+import queue
+import sqlite3
+import threading
+
+from config import Config
+from watcher import watcher
+
+log = logging.getLogger(__name__)
+
+# db_name: {index_name: (table, columns)}
+INDEXES = {
+    "usage_tracking": {
+        "ix_usage_log_timestamp": ("usage_log", ("timestamp", "model", "skill", "cost_usd")),
+    },
+    "cron_log": {
+        "ix_cron_runs_job_started": ("cron_runs", ("job_name", "started_at")),
+        "ix_cron_runs_started_status": ("cron_runs", ("started_at", "status")),
+    },
+    "projecthub": {
+        "ix_github_activity_type_date": ("github_activity", ("event_type", "event_date")),
+    },
+    "twitter_trends": {
+        "ix_tweets_flag_created": ("tweets", ("content_flag", "created_at")),
+        "ix_theme_history_date_theme": ("theme_history", ("date", "theme_id")),
+    },
+}
+
+
+def _filename(db_name, version):
+    ino, mtime_ns, size = version
+    return f"{db_name}-{ino}-{mtime_ns}-{size}.db"
+
+
+def _build(db_name, version, target):
+    """Copy the snapshot to ``target`` and add the configured indexes."""
+    tmp = f"{target}.tmp"
+    src = sqlite3.connect(
+        f"file:{Config.db_path(db_name)}?mode=ro&nolock=1&immutable=1", uri=True
+    )
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst)
+        for index_name, (table, columns) in INDEXES[db_name].items():
+            cols = ", ".join(f'"{c}"' for c in columns)
+            try:
+                dst.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table}" ({cols})')
+            except sqlite3.OperationalError as exc:
+                # Table or column not in this snapshot; serve it unindexed
+                log.warning("sidecar %s: skipping %s: %s", db_name, index_name, exc)
+        dst.execute("ANALYZE")
+        dst.commit()
+    finally:
+        src.close()
+        dst.close()
+    os.replace(tmp, target)
+
+
+class SidecarManager:
+    """Tracks which sidecar is ready per database and builds new ones."""
+
+    def __init__(self):
+        self._ready = {}
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+        watcher.subscribe(self._on_change)
+
+    def _on_change(self, db_name, old, new):
+        ready = self._ready.get(db_name)
+        if new is not None and db_name in INDEXES and (ready is None or ready[0] != new):
+            self._request(db_name, new)
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pending.clear()
+                self._queue = queue.Queue()
+                threading.Thread(target=self._loop, name="sidecar-build", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _request(self, db_name, version):
+        self._ensure_thread()
+        with self._lock:
+            if (db_name, version) in self._pending:
+                return
+            self._pending.add((db_name, version))
+        self._queue.put((db_name, version))
+
+    def _loop(self):
+        while True:
+            db_name, version = self._queue.get()
+            try:
+                self._build_shared(db_name, version)
+            except Exception:
+                log.exception("sidecar build for %s failed; serving the synced file", db_name)
+            finally:
+                with self._lock:
+                    self._pending.discard((db_name, version))
+
+    def _build_shared(self, db_name, version):
+        if watcher.version(db_name) != version:
+            return  # superseded while queued
+        directory = Config.SIDECAR_DIR
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, _filename(db_name, version))
+        with open(os.path.join(directory, f"{db_name}.lock"), "w") as lock:
+            # Another worker may be building this snapshot; wait for it
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(target):
+                _build(db_name, version, target)
+                log.info("sidecar %s built for snapshot %s", db_name, version)
+            self._prune(db_name, keep=os.path.basename(target))
+        with self._lock:
+            previous = self._ready.get(db_name)
+            self._ready[db_name] = (version, target)
+        # Readers were held on the previous sidecar; tell caches to move on
+        watcher.publish(db_name, previous[0] if previous else None, version)
+
+    @staticmethod
+    def _prune(db_name, keep):
+        # Open connections keep an unlinked file readable until they reopen
+        for name in os.listdir(Config.SIDECAR_DIR):
+            if name.startswith(f"{db_name}-") and name != keep:
+                try:
+                    os.remove(os.path.join(Config.SIDECAR_DIR, name))
+                except OSError:
+                    pass
+
+    def resolve(self, db_name, version):
+        """Return ``(version, path)`` to read for a synced file at ``version``.
+
+        Once its sidecar is built that is the sidecar. While a newer one is
+        building it is the previous sidecar *and its version*, so result
+        caches and pooled connections stay keyed by the data actually read.
+        Databases without indexes, or not yet built once, read the synced file.
+        """
+        if not Config.SIDECAR or db_name not in INDEXES or version is None:
+            return version, Config.db_path(db_name)
+        ready = self._ready.get(db_name)
+        if ready is None or ready[0] != version:
+            self._request(db_name, version)
+        if ready is not None and os.path.exists(ready[1]):
+            return ready
+        return version, Config.db_path(db_name)
+
+    def file_for(self, db_name, version):
+        """Return the path holding ``db_name`` at a version from resolve()."""
+        ready = self._ready.get(db_name)
+        if ready is not None and ready[0] == version:
+            return ready[1]
+        return Config.db_path(db_name)
+
+
+sidecars = SidecarManager()
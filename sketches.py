@@ -0,0 +1,132 @@
+"""Mergeable quantile sketches (DDSketch) for durations.
+
+A value v > 0 falls in bin ``ceil(log_GAMMA(v))`` with GAMMA = (1 + ALPHA) /
+(1 - ALPHA), and a bin reported as ``2 * GAMMA**i / (GAMMA + 1)`` is within
+ALPHA relative error of every value in it. A sketch is only counts per bin,
+so sketches merge by adding counts: the cron rollup keeps one per job and
+day (``cron_sketch``), and the sum over a window's days is that window's
+sketch, as if built from its runs. Any quantile read from it is within
+ALPHA of the exact one, however many runs went in; the bins needed grow
+with the log of the value range, not the run count.
+
+Values at or below MIN_VALUE, zero included, share ZERO_BIN and read back
+as 0. Stored, a sketch is ``int32 first bin | uint32 count per bin``,
+little-endian; register() adds the SQL functions that build and merge them.
+"""
+
+import math
+import struct
+from collections import Counter
+
+import numpy as np
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+MIN_VALUE = 1e-6
+_LOG_GAMMA = math.log(GAMMA)
+ZERO_BIN = math.ceil(math.log(MIN_VALUE) / _LOG_GAMMA) - 1
+_COUNTS = np.dtype("<u4")
+
+
+def bin_of(value):
+    """The bin ``value`` is counted in, or None for a missing value."""
+    if value is None:
+        return None
+    if value <= MIN_VALUE:
+        return ZERO_BIN
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def value_of(index):
+    """The value a bin reports: within ALPHA of everything counted in it."""
+    if index <= ZERO_BIN:
+        return 0.0
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class Sketch:
+    """Counts per bin for the contiguous bins ``offset .. offset + len(counts) - 1``."""
+
+    __slots__ = ("offset", "counts")
+
+    def __init__(self, offset=0, counts=None):
+        self.offset = offset
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def from_bins(cls, bins):
+        """A sketch of a mapping of bin -> count."""
+        if not bins:
+            return cls()
+        low = min(bins)
+        counts = np.zeros(max(bins) - low + 1, dtype=np.int64)
+        counts[np.fromiter(bins.keys(), dtype=np.int64, count=len(bins)) - low] = list(bins.values())
+        return cls(low, counts)
+
+    @classmethod
+    def from_values(cls, values):
+        """A sketch of ``values``, skipping None."""
+        return cls.from_bins(Counter(b for b in map(bin_of, values) if b is not None))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        (offset,) = struct.unpack_from("<i", blob)
+        return cls(offset, np.frombuffer(blob, dtype=_COUNTS, offset=4).astype(np.int64))
+
+    def to_bytes(self):
+        return struct.pack("<i", self.offset) + self.counts.astype(_COUNTS).tobytes()
+
+    @classmethod
+    def merge(cls, sketches):
+        """One sketch counting everything ``sketches`` count."""
+        sketches = [s for s in sketches if len(s.counts)]
+        if not sketches:
+            return cls()
+        low = min(s.offset for s in sketches)
+        high = max(s.offset + len(s.counts) for s in sketches)
+        counts = np.zeros(high - low, dtype=np.int64)
+        for s in sketches:
+            counts[s.offset - low:s.offset - low + len(s.counts)] += s.counts
+        return cls(low, counts)
+
+    def __len__(self):
+        """How many values were counted."""
+        return int(self.counts.sum())
+
+    def quantiles(self, qs):
+        """Quantiles ``qs`` (0..1), at the lower rank ``q * (n - 1)`` as DDSketch uses.
+
+        None for each quantile of an empty sketch.
+        """
+        cumulative = self.counts.cumsum()
+        if not len(cumulative) or not cumulative[-1]:
+            return [None] * len(qs)
+        ranks = np.asarray(qs, dtype=float) * (cumulative[-1] - 1)
+        found = np.searchsorted(cumulative, ranks, side="right")
+        return [value_of(self.offset + int(i)) for i in found]
+
+
+class _Build:
+    """SQL aggregate ``dd_sketch(value)``: the stored sketch of a group's values."""
+
+    def __init__(self):
+        self.bins = Counter()
+
+    def step(self, value):
+        if value is not None:
+            self.bins[bin_of(value)] += 1
+
+    def finalize(self):
+        return Sketch.from_bins(self.bins).to_bytes() if self.bins else None
+
+
+def _merge(a, b):
+    if a is None or b is None:
+        return a if b is None else b
+    return Sketch.merge([Sketch.from_bytes(a), Sketch.from_bytes(b)]).to_bytes()
+
+
+def register(conn):
+    """Add ``dd_sketch(value)`` and ``dd_merge(a, b)`` to a SQLite connection."""
+    conn.create_aggregate("dd_sketch", 1, _Build)
+    conn.create_function("dd_merge", 2, _merge, deterministic=True)
@@ -0,0 +1,104 @@
+"""Precomputed page data refreshed in the background (stale-while-revalidate).
+
+The databases only change when the NAS sync lands, so a page whose inputs are
+all SQLite can be computed once per snapshot and served from memory. A daemon
+thread per worker rebuilds it when any DB file's snapshot version changes or
+the TTL expires; requests always get the newest finished build and never wait
+on a refresh (except the very first one in a fresh worker).
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from config import Config
+from db import snapshot_version
+from watcher import watcher
+
+log = logging.getLogger(__name__)
+
+Snapshot = namedtuple("Snapshot", "value versions built_at")
+
+
+class SnapshotRefresher:
+    """Keeps ``build()``'s return value current in the background.
+
+    ``db_names`` are the databases whose snapshot versions invalidate the
+    build. ``needs_refresh(value)`` can ask for an early rebuild, e.g. when
+    part of the last build came back stale.
+    """
+
+    def __init__(self, build, db_names=None, ttl=None, poll=None, needs_refresh=None):
+        self.build = build
+        self.db_names = tuple(db_names or Config.DATABASES)
+        self.ttl = ttl if ttl is not None else Config.SNAPSHOT_TTL
+        self.poll = poll if poll is not None else Config.SNAPSHOT_POLL
+        self.needs_refresh = needs_refresh
+        self._snapshot = None
+        self._build_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._changed = threading.Event()
+        watcher.subscribe(self._on_change)
+
+    def _on_change(self, db_name, old, new):
+        if db_name in self.db_names:
+            self._changed.set()
+
+    def _versions(self):
+        return tuple(snapshot_version(name) for name in self.db_names)
+
+    def _due(self, snap):
+        if time.time() - snap.built_at >= self.ttl:
+            return True
+        if self.needs_refresh is not None and self.needs_refresh(snap.value):
+            return True
+        return self._versions() != snap.versions
+
+    def refresh(self, only_if_missing=False):
+        """Rebuild now on the calling thread."""
+        with self._build_lock:
+            if only_if_missing and self._snapshot is not None:
+                return
+            versions = self._versions()
+            value = self.build()
+            self._snapshot = Snapshot(value, versions, time.time())
+
+    def _loop(self):
+        while True:
+            # Woken early by the data watcher when one of our DBs changes
+            self._changed.wait(self.poll)
+            self._changed.clear()
+            if sys.is_finalizing():
+                return
+            try:
+                # Until the cold-start build in current() lands there is nothing to refresh
+                snap = self._snapshot
+                if snap is not None and self._due(snap):
+                    self.refresh()
+            except Exception:
+                log.exception("snapshot refresh failed; keeping the previous one")
+
+    def _ensure_thread(self):
+        # Threads don't survive fork, so each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(
+                    target=self._loop, name="snapshot-refresh", daemon=True
+                )
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def current(self):
+        """Return the latest Snapshot, building synchronously only on a cold start."""
+        self._ensure_thread()
+        if self._snapshot is None:
+            # Concurrent cold requests wait for one build instead of each running it
+            self.refresh(only_if_missing=True)
+        return self._snapshot
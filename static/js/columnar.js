@@ -0,0 +1,68 @@
+/**
+ * Decoder for the binary columnar chart payloads (columnar.py).
+ * fetchChart(url) asks for the columnar format and falls back to JSON;
+ * either way it resolves to the same shape, with numeric lists as typed
+ * arrays (NaN for missing values) when the columnar format was served.
+ */
+
+(function () {
+    'use strict';
+
+    const MEDIA_TYPE = 'application/vnd.clutch.columns';
+
+    function pad(n) {
+        return (n + 7) & ~7;
+    }
+
+    function formatTimestamp(seconds, format) {
+        const iso = new Date(seconds * 1000).toISOString();
+        return format === 'date' ? iso.slice(0, 10) : iso.slice(0, 19).replace('T', ' ');
+    }
+
+    function decode(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== 'CLC1') {
+            throw new Error('not a columnar payload');
+        }
+        const length = view.getUint32(4, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, length)));
+        const base = pad(8 + length);
+        const payload = header.meta;
+
+        for (const col of header.columns) {
+            const offset = base + col.offset;
+            let values;
+            if (col.type === 'f64') {
+                values = new Float64Array(buffer, offset, col.length);
+            } else if (col.type === 'i32') {
+                values = new Int32Array(buffer, offset, col.length);
+            } else if (col.type === 'dict') {
+                const codes = new Int32Array(buffer, offset, col.length);
+                values = Array.from(codes, c => (c < 0 ? null : col.strings[c]));
+            } else if (col.type === 'ts') {
+                const seconds = new Float64Array(buffer, offset, col.length);
+                values = Array.from(seconds, s => formatTimestamp(s, col.format));
+            } else {
+                throw new Error('unknown column type ' + col.type);
+            }
+            let node = payload;
+            for (const key of col.path.slice(0, -1)) {
+                node = node[key];
+            }
+            node[col.path[col.path.length - 1]] = values;
+        }
+        return payload;
+    }
+
+    function fetchChart(url) {
+        return fetch(url, { headers: { Accept: MEDIA_TYPE + ', application/json;q=0.5' } })
+            .then(r => {
+                const type = r.headers.get('Content-Type') || '';
+                return type.startsWith(MEDIA_TYPE) ? r.arrayBuffer().then(decode) : r.json();
+            });
+    }
+
+    window.decodeColumnar = decode;
+    window.fetchChart = fetchChart;
+})();
@@ -0,0 +1,34 @@
+"""Streamed page renders for tables that grow without bound.
+
+stream_template renders while the response is written, so rows from
+db.query_iter are turned into HTML and dropped batch by batch instead of
+the whole result and the whole page sitting in memory. Jinja yields a
+string per template node, tens of thousands for a big table, and writing
+each one through the WSGI server costs more than rendering it; stream_page
+joins them into CHUNK-sized pieces first.
+
+The access log line and Server-Timing header are written when the headers
+go out, before the body renders, so they don't include the template or the
+streamed queries; both still reach the Prometheus metrics.
+"""
+
+from flask import stream_template
+
+CHUNK = 64 * 1024
+
+
+def _coalesce(parts, size):
+    buffered, length = [], 0
+    for part in parts:
+        buffered.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffered)
+            buffered, length = [], 0
+    if buffered:
+        yield "".join(buffered)
+
+
+def stream_page(template_name, **context):
+    """Like render_template, but rendered lazily in ~CHUNK-character pieces."""
+    return _coalesce(stream_template(template_name, **context), CHUNK)
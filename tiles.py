@@ -0,0 +1,119 @@
+"""Concurrent evaluation of independent page tiles with per-tile deadlines.
+
+A page made of independent tiles costs the slowest tile instead of the sum of
+all of them. A tile that misses its deadline keeps running in the background
+and the page renders its last good value (or a placeholder) marked stale.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import Config
+
+log = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"        # missed its deadline or failed; showing the last good value
+PENDING = "pending"    # missed its deadline and has never produced a value
+
+
+class TileResult:
+    """Values, status and timing of one TileRunner.run()."""
+
+    def __init__(self, values, status, timings):
+        self.values = values
+        self.status = status
+        self.timings = timings
+
+    @property
+    def stale(self):
+        """Names of tiles not showing a fresh value."""
+        return {name for name, status in self.status.items() if status != FRESH}
+
+    def server_timing(self, prefix="tile"):
+        """Format the timings as a Server-Timing header value."""
+        return ", ".join(
+            f'{prefix}-{name};dur={ms:.1f};desc="{self.status[name]}"'
+            for name, ms in self.timings.items()
+        )
+
+
+class TileRunner:
+    """Runs a fixed set of tile callables on a bounded thread pool.
+
+    ``tiles`` maps a name to ``(callable, placeholder)``; the placeholder is
+    rendered until the tile has produced its first value. ``deadlines`` maps
+    tile names to seconds and falls back to Config.TILE_DEADLINE.
+    """
+
+    def __init__(self, tiles, deadlines=None, max_workers=None):
+        self.tiles = tiles
+        self.deadlines = deadlines or {}
+        self.max_workers = max_workers or Config.TILE_WORKERS
+        self._executor = None
+        self._shut_down = False
+        self._lock = threading.Lock()
+        self._last_good = {}
+        self._inflight = {}
+
+    def _pool(self):
+        # Created lazily so each gunicorn worker gets its own threads after
+        # fork. Callers hold self._lock.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="tile")
+        return self._executor
+
+    def _submit(self, name, fn):
+        # A tile still running from an earlier request is awaited again rather
+        # than resubmitted, so a hung upstream can't fill the pool.
+        with self._lock:
+            entry = self._inflight.get(name)
+            if entry is not None and entry[0].done():
+                # Finished after an earlier deadline; keep what it produced
+                if entry[0].exception() is None:
+                    self._last_good[name] = entry[0].result()[0]
+                entry = None
+            if entry is None:
+                try:
+                    future = self._pool().submit(self._timed, fn)
+                except RuntimeError as exc:
+                    # The interpreter is exiting and a background snapshot
+                    # refresh got here after the pool shut down
+                    self._shut_down = True
+                    future = Future()
+                    future.set_exception(exc)
+                entry = (future, time.perf_counter())
+                self._inflight[name] = entry
+            return entry
+
+    @staticmethod
+    def _timed(fn):
+        start = time.perf_counter()
+        value = fn()
+        return value, (time.perf_counter() - start) * 1000
+
+    def run(self):
+        submitted = {name: self._submit(name, fn) for name, (fn, _) in self.tiles.items()}
+        values, status, timings = {}, {}, {}
+        order = sorted(submitted, key=lambda n: self.deadlines.get(n, Config.TILE_DEADLINE))
+        for name in order:
+            future, started = submitted[name]
+            deadline = self.deadlines.get(name, Config.TILE_DEADLINE)
+            remaining = max(0.0, started + deadline - time.perf_counter())
+            try:
+                value, ms = future.result(timeout=remaining)
+            except Exception as exc:
+                if future.done() and not self._shut_down:
+                    log.warning("tile %s failed: %s", name, exc)
+                ms = (time.perf_counter() - started) * 1000
+                if name in self._last_good:
+                    values[name], status[name] = self._last_good[name], STALE
+                else:
+                    values[name], status[name] = self.tiles[name][1], PENDING
+            else:
+                self._last_good[name] = value
+                values[name], status[name] = value, FRESH
+            timings[name] = ms
+        return TileResult(values, status, timings)
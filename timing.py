@@ -0,0 +1,75 @@
+"""Per-request wall-time breakdown: Server-Timing header and access log line.
+
+The instrumentation in metrics.py reports every SQLite statement, upstream
+call and template render to attribute(); for a sampled request the time is
+summed per category (``sqlite-<db>``, ``k8s``, ``prometheus``, ``ollama``,
+``gpu``, ``pediatrica``, ``template``) on flask.g. Work done on tile or
+snapshot threads has no request context and is not attributed.
+Config.TIMING_SAMPLE is the fraction of requests that get a breakdown, and
+Config.ACCESS_LOG also writes each one to the ``clutch.access`` logger.
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+
+from flask import g, has_request_context, request
+
+from config import Config
+from memo import memo_stats
+
+access_log = logging.getLogger("clutch.access")
+
+
+def attribute(category, seconds):
+    """Add ``seconds`` to ``category`` for the current request, if sampled."""
+    if not has_request_context():
+        return
+    breakdown = g.get("_timing")
+    if breakdown is not None:
+        breakdown[category] = breakdown.get(category, 0.0) + seconds
+
+
+def _start():
+    if Config.TIMING_SAMPLE >= 1 or random.random() < Config.TIMING_SAMPLE:
+        g._timing = {}
+        g._timing_start = time.perf_counter()
+
+
+def _finish(response):
+    breakdown = g.get("_timing")
+    if breakdown is None:
+        return response
+    total = (time.perf_counter() - g._timing_start) * 1000
+    ms = {name: round(s * 1000, 2) for name, s in sorted(breakdown.items())}
+
+    header = ", ".join(f"{name};dur={dur}" for name, dur in ms.items())
+    header = f"{header}, total;dur={total:.2f}" if header else f"total;dur={total:.2f}"
+    existing = response.headers.get("Server-Timing")
+    response.headers["Server-Timing"] = f"{existing}, {header}" if existing else header
+
+    if not Config.ACCESS_LOG:
+        return response
+    access_log.info(json.dumps({
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "ms": round(total, 2),
+        "breakdown": ms,
+        "memo": memo_stats(),
+    }))
+    return response
+
+
+def init_app(app):
+    """Install the sampling hooks and the access log handler on ``app``."""
+    if not access_log.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        access_log.addHandler(handler)
+        access_log.setLevel(logging.INFO)
+        access_log.propagate = False
+    app.before_request(_start)
+    app.after_request(_finish)
@@ -0,0 +1,225 @@
+"""In-memory view of the data directory, kept current by inotify or polling.
+
+The DB files live on a NAS mount where every stat is a network round trip, so
+instead of stat-ing per query (db.snapshot_version) and listing the directory
+per render (get_data_freshness) each worker keeps one table of
+``filename -> (inode, mtime_ns, size)`` and updates it in the background:
+
+* inotify (via ctypes, Linux only) re-stats a file as soon as the sync
+  closes or renames it;
+* a full rescan every Config.WATCH_POLL seconds is the fallback where
+  inotify is unavailable and the backstop where it is blind (changes made by
+  another NFS/SMB client never raise local events).
+
+Subscribers registered with subscribe() are called as
+``callback(db_name, old_version, new_version)`` whenever a file changes,
+appears or disappears.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+from config import Config
+
+log = logging.getLogger(__name__)
+
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE)
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify_watch(path):
+    """Return an inotify fd watching ``path``, or None where unsupported."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), _WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _read_events(fd):
+    """Return the changed filenames, or None if the kernel queue overflowed."""
+    names = set()
+    try:
+        buf = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    offset = 0
+    while offset + _EVENT.size <= len(buf):
+        _, mask, _, length = _EVENT.unpack_from(buf, offset)
+        offset += _EVENT.size
+        name = buf[offset:offset + length].rstrip(b"\0")
+        offset += length
+        if mask & _IN_Q_OVERFLOW:
+            return None
+        if name:
+            names.add(os.fsdecode(name))
+    return names
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class DataWatcher:
+    """Per-worker table of DB file versions for one directory."""
+
+    def __init__(self, poll=None):
+        self.poll = poll if poll is not None else Config.WATCH_POLL
+        self._files = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._path = None
+        self._pid = None
+        self._fd = None
+        self._names = {}
+
+    @property
+    def backend(self):
+        return "inotify" if self._fd is not None else "poll"
+
+    def subscribe(self, callback):
+        """Call ``callback(db_name, old, new)`` on every version change."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _ensure(self):
+        # (Re)start after fork, or if the data directory was repointed
+        if self._pid == os.getpid() and self._path == Config.DB_BASE_PATH:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._path == Config.DB_BASE_PATH:
+                return
+            self._path = Config.DB_BASE_PATH
+            self._names = {f: name for name, f in Config.DATABASES.items()}
+            self._files = self._scan_files()
+            self._fd = _inotify_watch(self._path) if os.path.isdir(self._path) else None
+            self._pid = os.getpid()
+            thread = threading.Thread(
+                target=self._loop, args=(self._path,), name="data-watcher", daemon=True
+            )
+            thread.start()
+
+    def _scan_files(self):
+        try:
+            entries = os.listdir(self._path)
+        except OSError:
+            return {}
+        files = {}
+        for f in entries:
+            if f.endswith(".db"):
+                version = _stat(os.path.join(self._path, f))
+                if version is not None:
+                    files[f] = version
+        return files
+
+    def _update(self, changes):
+        """Apply ``{filename: version or None}`` and notify subscribers."""
+        events = []
+        with self._lock:
+            for f, new in changes.items():
+                old = self._files.get(f)
+                if old == new:
+                    continue
+                if new is None:
+                    self._files.pop(f, None)
+                else:
+                    self._files[f] = new
+                events.append((self._names.get(f, f[:-3]), old, new))
+        for event in events:
+            self.publish(*event)
+
+    def publish(self, db_name, old, new):
+        """Notify subscribers that ``db_name`` moved from ``old`` to ``new``."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(db_name, old, new)
+            except Exception:
+                log.exception("watcher subscriber failed")
+
+    def rescan(self):
+        """Stat every DB file now."""
+        files = self._scan_files()
+        self._update({f: files.get(f) for f in set(files) | set(self._files)})
+
+    def _loop(self, path):
+        fd = self._fd
+        next_scan = time.monotonic() + self.poll
+        while self._path == path and self._pid == os.getpid():
+            timeout = max(0.0, next_scan - time.monotonic())
+            try:
+                if fd is not None:
+                    readable, _, _ = select.select([fd], [], [], timeout)
+                else:
+                    time.sleep(timeout)
+                    readable = []
+                if readable:
+                    names = _read_events(fd)
+                    if names is None:
+                        self.rescan()
+                    else:
+                        self._update({
+                            f: _stat(os.path.join(path, f))
+                            for f in names if f.endswith(".db")
+                        })
+                if time.monotonic() >= next_scan:
+                    self.rescan()
+                    next_scan = time.monotonic() + self.poll
+            except Exception:
+                log.exception("data watcher iteration failed")
+                time.sleep(self.poll)
+        if fd is not None:
+            os.close(fd)
+
+    def version(self, db_name):
+        """Return (inode, mtime_ns, size) of a DB file, or None if it is missing."""
+        self._ensure()
+        return self._files.get(Config.DATABASES[db_name])
+
+    def state(self):
+        """Return the backend and current version table, for /admin."""
+        self._ensure()
+        return {
+            "backend": self.backend,
+            "path": self._path,
+            "poll": self.poll,
+            "files": {f: list(v) for f, v in sorted(self._files.items())},
+        }
+
+    def newest_mtime(self):
+        """Return the newest DB file mtime in seconds, or None if there are none."""
+        self._ensure()
+        files = self._files
+        if not files:
+            return None
+        return max(v[1] for v in files.values()) / 1e9
+
+
+watcher = DataWatcher()